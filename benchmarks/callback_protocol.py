@@ -0,0 +1,121 @@
+"""Callback driven protocol benchmark.
+
+Runs a centimani server in a child process, serving connections either
+with a ``Connection`` running over streams or with the callback driven
+``Http1Protocol``, and measures the number of tiny JSON responses per
+second sent to keep-alive clients, and the server CPU time spent per
+request. The clients run in several processes, so that the server is
+the bottleneck.
+
+Usage:
+    python -m benchmarks.callback_protocol [processes] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import signal
+import sys
+import time
+
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8185
+
+CONNECTIONS = 4
+
+REQUEST = (
+    b"GET / HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"Accept: application/json\r\n"
+    b"\r\n"
+)
+
+
+class JsonHandler(RequestHandler):
+    static_headers = {"content-type": "application/json"}
+
+    async def get(self):
+        await self.send_response(200, body=b'{"status": "ok"}')
+
+
+def run_server(ready, cpu_time, callback_protocol):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = Server(
+        [(r"^/$", JsonHandler)],
+        callback_protocol=callback_protocol,
+        loop=loop
+    )
+    loop.run_until_complete(server.listen(HOST, PORT))
+    loop.add_signal_handler(signal.SIGTERM, loop.stop)
+    start = time.process_time()
+    ready.set()
+    loop.run_forever()
+    cpu_time.value = time.process_time() - start
+
+
+async def client(deadline):
+    """Sends requests one after the other, returns the response count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    count = 0
+
+    while time.perf_counter() < deadline:
+        writer.write(REQUEST)
+        header = await reader.readuntil(b"\r\n\r\n")
+        start = header.index(b"Content-Length: ") + 16
+        length = int(header[start:header.index(b"\r\n", start)])
+        await reader.readexactly(length)
+        count += 1
+
+    writer.close()
+    return count
+
+
+async def clients(duration):
+    deadline = time.perf_counter() + duration
+    counts = await asyncio.gather(*(
+        client(deadline) for _ in range(CONNECTIONS)
+    ))
+    return sum(counts)
+
+
+def run_clients(duration):
+    return asyncio.run(clients(duration))
+
+
+def bench(callback_protocol, processes, duration):
+    ready = multiprocessing.Event()
+    cpu_time = multiprocessing.Value("d")
+    process = multiprocessing.Process(
+        target=run_server,
+        args=(ready, cpu_time, callback_protocol)
+    )
+    process.start()
+    ready.wait()
+
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            total = sum(pool.map(run_clients, [duration] * processes))
+    finally:
+        process.terminate()
+        process.join()
+
+    return total / duration, cpu_time.value / total
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for name, callback_protocol in (("streams", False), ("callbacks", True)):
+        rate, cpu_time = bench(callback_protocol, processes, duration)
+        print("{:>10} {} clients: {:.0f} requests/s, {:.1f} us/request".format(
+            name, processes * CONNECTIONS, rate, cpu_time * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
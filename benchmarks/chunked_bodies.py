@@ -0,0 +1,134 @@
+"""Chunked bodies throughput benchmark.
+
+Server path: a client uploads large chunked request bodies to a
+centimani server, whose handler reads them with ``ChunkedBodyReader``.
+
+Client path: the centimani client downloads large chunked response
+bodies from a raw asyncio server.
+
+Usage:
+    python -m benchmarks.chunked_bodies [body size in MiB] [chunk size]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from centimani.client import Client
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+SERVER_PORT = 8182
+CLIENT_PORT = 8183
+ROUNDS = 5
+
+
+def chunked_body(body_size, chunk_size):
+    """Returns a chunked encoded body of random binary data."""
+    chunk = os.urandom(chunk_size)
+    header = "{:x}\r\n".format(chunk_size).encode("ascii")
+    encoded_chunk = b"".join((header, chunk, b"\r\n"))
+
+    return encoded_chunk * (body_size // chunk_size) + b"0\r\n\r\n"
+
+
+class UploadHandler(RequestHandler):
+    async def post(self):
+        size = 0
+        async for block in self.body_reader:
+            size += len(block)
+
+        await self.send_response(200, body=str(size))
+
+
+async def server_path(body_size, chunk_size):
+    server = Server([(r"^/$", UploadHandler)])
+    await server.listen(HOST, SERVER_PORT)
+
+    body = chunked_body(body_size, chunk_size)
+    header = (
+        b"POST / HTTP/1.1\r\n"
+        b"Host: localhost\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n"
+    )
+
+    reader, writer = await asyncio.open_connection(HOST, SERVER_PORT)
+    start = time.perf_counter()
+
+    for _ in range(ROUNDS):
+        writer.write(header)
+        writer.write(body)
+        await writer.drain()
+
+        response_header = await reader.readuntil(b"\r\n\r\n")
+        index = response_header.index(b"Content-Length: ") + 16
+        length = int(response_header[index:response_header.index(b"\r", index)])
+        await reader.readexactly(length)
+
+    elapsed = time.perf_counter() - start
+
+    writer.close()
+    server.close()
+    await server.wait_closed()
+
+    return elapsed
+
+
+async def client_path(body_size, chunk_size):
+    body = chunked_body(body_size, chunk_size)
+    header = (
+        b"HTTP/1.1 200 OK\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n"
+    )
+
+    async def respond(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(header)
+                writer.write(body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(respond, HOST, CLIENT_PORT)
+    client = Client()
+    url = "http://{}:{}/".format(HOST, CLIENT_PORT)
+
+    start = time.perf_counter()
+
+    for _ in range(ROUNDS):
+        response = await client.fetch(url)
+        assert len(response.body) == body_size // chunk_size * chunk_size
+
+    elapsed = time.perf_counter() - start
+
+    client.close()
+    # let the server handlers see EOF
+    await asyncio.sleep(0.1)
+    server.close()
+    await server.wait_closed()
+
+    return elapsed
+
+
+def main():
+    body_size = int(sys.argv[1]) << 20 if len(sys.argv) > 1 else 32 << 20
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1 << 16
+
+    async def run():
+        for name, path in (("server", server_path), ("client", client_path)):
+            elapsed = await path(body_size, chunk_size)
+            print("{} path: {:.1f} MiB/s".format(
+                name, ROUNDS * body_size / elapsed / (1 << 20)
+            ))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""HTTP client fan-out benchmark.
+
+Runs a centimani server in a child process, with h2c enabled, and
+measures the number of requests per second sent by a ``Client`` keeping
+``concurrency`` requests in progress to this single endpoint, over
+HTTP/1.1 (one connection per request in progress) and over HTTP/2 (the
+requests are multiplexed on a few connections). The handler waits a few
+milliseconds, as if it queried a backend, before sending a tiny JSON
+body.
+
+Usage:
+    python -m benchmarks.client_fanout [concurrency] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from centimani.client import Client
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8187
+
+URL = "http://{}:{}/".format(HOST, PORT)
+
+BACKEND_DELAY = 0.002
+
+
+class JsonHandler(RequestHandler):
+    static_headers = {"content-type": "application/json"}
+
+    async def get(self):
+        await asyncio.sleep(BACKEND_DELAY)
+        await self.send_response(200, body=b'{"status": "ok"}')
+
+
+def run_server(ready):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = Server([(r"^/$", JsonHandler)], h2c=True, loop=loop)
+    loop.run_until_complete(server.listen(HOST, PORT))
+    ready.set()
+    loop.run_forever()
+
+
+async def fan_out(h2c, concurrency, duration):
+    """Keeps ``concurrency`` requests in progress, returns the response
+    count and the number of connections used."""
+    client = Client(h2c=h2c, loop=asyncio.get_running_loop())
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        count = 0
+
+        while time.perf_counter() < deadline:
+            response = await client.fetch(URL)
+            assert response.status == 200
+            count += 1
+
+        return count
+
+    counts = await asyncio.gather(*(worker() for _ in range(concurrency)))
+    connections = sum(map(len, client._endpoint_connections.values()))
+    client.close()
+
+    return sum(counts), connections
+
+
+def bench(h2c, concurrency, duration):
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=run_server, args=(ready,))
+    process.start()
+    ready.wait()
+
+    try:
+        total, connections = asyncio.run(fan_out(h2c, concurrency, duration))
+    finally:
+        process.terminate()
+        process.join()
+
+    return total / duration, connections
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for name, h2c in (("http/1.1", False), ("h2c", True)):
+        requests, connections = bench(h2c, concurrency, duration)
+        print("{:<8} concurrency {}: {:.0f} requests/s, {} connections".format(
+            name, concurrency, requests, connections
+        ))
+
+
+if __name__ == "__main__":
+    main()
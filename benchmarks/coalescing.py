@@ -0,0 +1,140 @@
+"""Request coalescing benchmark.
+
+Runs a centimani server in a child process, and measures the number of
+requests per second handled when clients fetch the same resource, whose
+handler queries a backend that takes a few milliseconds and serves a
+limited number of queries at once, without then with coalescing. The
+number of backend queries is printed too.
+
+Usage:
+    python -m benchmarks.coalescing [clients] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8190
+
+BACKEND_DELAY = 0.005
+
+# queries served at once by the backend
+BACKEND_CONCURRENCY = 4
+
+REQUEST = (
+    b"GET /popular HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"\r\n"
+)
+
+STATS_REQUEST = (
+    b"GET /stats HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"\r\n"
+)
+
+
+def make_handlers(coalesce):
+    backend = asyncio.Semaphore(BACKEND_CONCURRENCY)
+    stats = {"queries": 0}
+
+    class PopularHandler(RequestHandler):
+        static_headers = {"content-type": "application/json"}
+
+        async def get(self):
+            async with backend:
+                stats["queries"] += 1
+                await asyncio.sleep(BACKEND_DELAY)
+
+            await self.send_response(200, body=b'{"popular": true}')
+
+    PopularHandler.coalesce = coalesce
+
+    class StatsHandler(RequestHandler):
+        async def get(self):
+            body = str(stats["queries"]).encode("ascii")
+            await self.send_response(200, body=body)
+
+    return [(r"^/popular$", PopularHandler), (r"^/stats$", StatsHandler)]
+
+
+def run_server(ready, coalesce):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = Server(make_handlers(coalesce), loop=loop)
+    loop.run_until_complete(server.listen(HOST, PORT))
+    ready.set()
+    loop.run_forever()
+
+
+async def fetch(reader, writer, request):
+    writer.write(request)
+
+    header = await reader.readuntil(b"\r\n\r\n")
+    start = header.index(b"Content-Length: ") + 16
+    length = int(header[start:header.index(b"\r\n", start)])
+    return await reader.readexactly(length)
+
+
+async def client(deadline):
+    """Sends requests one after the other, returns the response
+    count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    count = 0
+
+    while time.perf_counter() < deadline:
+        await fetch(reader, writer, REQUEST)
+        count += 1
+
+    writer.close()
+    return count
+
+
+async def run_clients(clients, duration):
+    deadline = time.perf_counter() + duration
+    counts = await asyncio.gather(*(client(deadline) for _ in range(clients)))
+
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    queries = int(await fetch(reader, writer, STATS_REQUEST))
+    writer.close()
+
+    return sum(counts), queries
+
+
+def bench(coalesce, clients, duration):
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=run_server,
+        args=(ready, coalesce)
+    )
+    process.start()
+    ready.wait()
+
+    try:
+        total, queries = asyncio.run(run_clients(clients, duration))
+    finally:
+        process.terminate()
+        process.join()
+
+    return total / duration, queries
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for coalesce in (False, True):
+        name = "coalescing" if coalesce else "no coalescing"
+        requests, queries = bench(coalesce, clients, duration)
+        print("{:<14} {} clients: {:.0f} requests/s, {} backend queries"
+              .format(name, clients, requests, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Response compression benchmark.
+
+Measures the byte savings and the CPU cost of the server compression
+layer on JSON API responses of various sizes, for each compression
+level.
+
+Usage:
+    python -m benchmarks.compression
+"""
+
+import asyncio
+import json
+import time
+
+from centimani.server import Compression
+
+
+BODY_SIZES = (1 << 10, 1 << 14, 1 << 17, 1 << 20)
+LEVELS = (1, 6, 9)
+ROUNDS = 20
+
+
+def json_body(size):
+    """Returns a JSON document of about ``size`` bytes."""
+    items = []
+    body = b"[]"
+    index = 0
+
+    while len(body) < size:
+        items.extend(
+            {
+                "id": index + i,
+                "name": "item {}".format(index + i),
+                "tags": ["alpha", "beta"] if i % 3 else [],
+                "price": (index + i) * 1.25,
+                "available": bool(i % 2),
+            }
+            for i in range(64)
+        )
+        index += 64
+        body = json.dumps(items).encode("utf-8")
+
+    return body[:size]
+
+
+def main():
+    loop = asyncio.new_event_loop()
+
+    print("{:>9} {:>5} {:>11} {:>8} {:>10} {:>9}".format(
+        "size", "level", "compressed", "savings", "time (ms)", "MiB/s"
+    ))
+
+    for size in BODY_SIZES:
+        body = json_body(size)
+
+        for level in LEVELS:
+            # no executor, in order to measure the compression itself
+            compression = Compression(level=level, executor_threshold=1 << 62)
+
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                compressed = loop.run_until_complete(
+                    compression.compress("gzip", body, loop)
+                )
+            elapsed = (time.perf_counter() - start) / ROUNDS
+
+            print("{:>9} {:>5} {:>11} {:>7.1f}% {:>10.3f} {:>9.1f}".format(
+                len(body), level, len(compressed),
+                100 * (1 - len(compressed) / len(body)),
+                elapsed * 1000,
+                len(body) / elapsed / (1 << 20)
+            ))
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
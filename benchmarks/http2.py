@@ -0,0 +1,171 @@
+"""HTTP/2 multiplexing benchmark.
+
+Runs a centimani server in a child process, with h2c enabled, and
+measures the number of requests per second handled when ``concurrency``
+requests are sent at once, either on as many HTTP/1.1 connections, or
+as many streams of a single HTTP/2 connection. The handler waits a few
+milliseconds, as if it queried a backend, before sending a tiny JSON
+body.
+
+Usage:
+    python -m benchmarks.http2 [concurrency] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import struct
+import sys
+import time
+
+from centimani.hpack import Decoder, Encoder
+from centimani.http2 import DATA, END_HEADERS, END_STREAM, HEADERS, PREFACE
+from centimani.http2 import SETTINGS, WINDOW_UPDATE, encode_frame
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8186
+
+BACKEND_DELAY = 0.002
+
+REQUEST = (
+    b"GET / HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"Accept: application/json\r\n"
+    b"\r\n"
+)
+
+REQUEST_FIELDS = (
+    (":method", "GET"),
+    (":scheme", "http"),
+    (":authority", "localhost"),
+    (":path", "/"),
+    ("accept", "application/json"),
+)
+
+
+class JsonHandler(RequestHandler):
+    static_headers = {"content-type": "application/json"}
+
+    async def get(self):
+        await asyncio.sleep(BACKEND_DELAY)
+        await self.send_response(200, body=b'{"status": "ok"}')
+
+
+def run_server(ready):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = Server([(r"^/$", JsonHandler)], h2c=True, loop=loop)
+    loop.run_until_complete(server.listen(HOST, PORT))
+    ready.set()
+    loop.run_forever()
+
+
+async def http1_client(deadline):
+    """Sends requests one after the other, returns the response
+    count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    count = 0
+
+    while time.perf_counter() < deadline:
+        writer.write(REQUEST)
+
+        header = await reader.readuntil(b"\r\n\r\n")
+        start = header.index(b"Content-Length: ") + 16
+        length = int(header[start:header.index(b"\r\n", start)])
+        await reader.readexactly(length)
+
+        count += 1
+
+    writer.close()
+    return count
+
+
+async def bench_http1(concurrency, duration):
+    deadline = time.perf_counter() + duration
+    counts = await asyncio.gather(*(
+        http1_client(deadline) for _ in range(concurrency)
+    ))
+    return sum(counts)
+
+
+async def bench_http2(concurrency, duration):
+    """Sends batches of ``concurrency`` requests on a single connection,
+    returns the response count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    encoder = Encoder()
+    decoder = Decoder()
+
+    writer.write(PREFACE + encode_frame(SETTINGS, 0, 0))
+    deadline = time.perf_counter() + duration
+    stream_id = 1
+    count = 0
+
+    while time.perf_counter() < deadline:
+        frames = []
+
+        for _ in range(concurrency):
+            frames.append(encode_frame(
+                HEADERS, END_HEADERS | END_STREAM, stream_id,
+                encoder.encode(REQUEST_FIELDS)
+            ))
+            stream_id += 2
+
+        writer.writelines(frames)
+        pending = concurrency
+        received = 0
+
+        while pending:
+            header = await reader.readexactly(9)
+            length = int.from_bytes(header[:3], "big")
+            frame_type, flags = header[3], header[4]
+            payload = await reader.readexactly(length)
+
+            if frame_type == HEADERS:
+                decoder.decode(payload)
+            elif frame_type == DATA:
+                received += length
+
+            if frame_type in (HEADERS, DATA) and flags & END_STREAM:
+                pending -= 1
+
+        # gives back the connection window
+        if received:
+            writer.write(encode_frame(
+                WINDOW_UPDATE, 0, 0, struct.pack("!I", received)
+            ))
+
+        count += concurrency
+
+    writer.close()
+    return count
+
+
+def bench(client, concurrency, duration):
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=run_server, args=(ready,))
+    process.start()
+    ready.wait()
+
+    try:
+        total = asyncio.run(client(concurrency, duration))
+    finally:
+        process.terminate()
+        process.join()
+
+    return total / duration
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for name, client in (("http/1.1", bench_http1), ("h2", bench_http2)):
+        print("{:<8} concurrency {}: {:.0f} requests/s".format(
+            name, concurrency, bench(client, concurrency, duration)
+        ))
+
+
+if __name__ == "__main__":
+    main()
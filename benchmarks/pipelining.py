@@ -0,0 +1,108 @@
+"""HTTP/1.1 pipelining benchmark.
+
+Runs a centimani server in a child process, with and without
+pipelining, and measures the number of requests per second handled
+when the client pipelines batches of requests. The handler waits a few
+milliseconds, as if it queried a backend, before sending a tiny JSON
+body.
+
+Usage:
+    python -m benchmarks.pipelining [depth] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8184
+
+BACKEND_DELAY = 0.002
+
+REQUEST = (
+    b"GET / HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"Accept: application/json\r\n"
+    b"\r\n"
+)
+
+
+class JsonHandler(RequestHandler):
+    static_headers = {"content-type": "application/json"}
+
+    async def get(self):
+        await asyncio.sleep(BACKEND_DELAY)
+        await self.send_response(200, body=b'{"status": "ok"}')
+
+
+def run_server(ready, pipelining):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = Server(
+        [(r"^/$", JsonHandler)],
+        pipelining=pipelining,
+        loop=loop
+    )
+    loop.run_until_complete(server.listen(HOST, PORT))
+    ready.set()
+    loop.run_forever()
+
+
+async def client(depth, duration):
+    """Sends batches of ``depth`` pipelined requests, returns the
+    response count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    deadline = time.perf_counter() + duration
+    batch = REQUEST * depth
+    count = 0
+
+    while time.perf_counter() < deadline:
+        writer.write(batch)
+
+        for _ in range(depth):
+            header = await reader.readuntil(b"\r\n\r\n")
+            start = header.index(b"Content-Length: ") + 16
+            length = int(header[start:header.index(b"\r\n", start)])
+            await reader.readexactly(length)
+
+        count += depth
+
+    writer.close()
+    return count
+
+
+def bench(pipelining, depth, duration):
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=run_server,
+        args=(ready, pipelining)
+    )
+    process.start()
+    ready.wait()
+
+    try:
+        total = asyncio.run(client(depth, duration))
+    finally:
+        process.terminate()
+        process.join()
+
+    return total / duration
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for pipelining in (False, True):
+        print("pipelining={!s:<5} depth {}: {:.0f} requests/s".format(
+            pipelining, depth, bench(pipelining, depth, duration)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Request line parsing microbenchmark.
+
+Compares the former parsing of request lines, matching a regular
+expression then decoding the path and parsing the query, with
+``parse_request_line`` and a ``Request`` decoding them on demand. Only
+the path is accessed, as a router does, for a health-check request and
+for a search request with a query.
+
+Usage:
+    python -m benchmarks.request_line
+"""
+
+import re
+import timeit
+
+from urllib.parse import unquote_plus, parse_qs
+
+from centimani.headers import Headers
+from centimani.server.handlers import Request
+from centimani.server.http1 import parse_request_line
+
+
+NUMBER = 200000
+
+REQUEST_LINES = (
+    ("health check", b"GET /health HTTP/1.1"),
+    ("search", b"GET /search?q=centimani&page=2&sort=date HTTP/1.1"),
+)
+
+_REQUEST_LINE = rb"""
+^
+([A-Z]+)
+[ \t]+
+(\*|/(?:%(segment)b(?:/%(segment)b)*/?)?)(?:\?(%(query)b))?
+[ \t]+
+HTTP/(\d+\.\d+)
+$
+""" % {
+    b"segment": rb"(?:[-._~A-Za-z0-9!$&'()*+,;=:@]|%[0-9A-F]{2})+",
+    b"query": rb"(?:[-._~A-Za-z0-9!$&'()*+,;=:@/?]|%[0-9A-F]{2})*"
+}
+
+REQUEST_LINE_REGEX = re.compile(_REQUEST_LINE, re.VERBOSE)
+
+# the header fields are parsed the same way in both cases
+HEADERS = Headers(host="localhost")
+
+
+def former(request_line):
+    """The parsing used before the lazy request line decoding."""
+    match = REQUEST_LINE_REGEX.match(request_line)
+
+    if not match or b"%2F" in request_line or b"%5C" in request_line:
+        raise ValueError
+
+    tmp = (s.decode("ascii") for s in match.groups(b""))
+    method, path, query, version = tmp
+
+    path = unquote_plus(path)
+
+    if query:
+        try:
+            query = parse_qs(query, strict_parsing=True)
+        except ValueError:
+            query = {}
+    else:
+        query = {}
+
+    return Request(method, path, query, HEADERS).path
+
+
+def lazy(request_line):
+    method, target, version = parse_request_line(request_line)
+    return Request(method, target=target, headers=HEADERS).path
+
+
+def main():
+    for name, request_line in REQUEST_LINES:
+        assert former(request_line) == lazy(request_line)
+
+        for parse in (former, lazy):
+            duration = timeit.timeit(
+                lambda: parse(request_line),
+                number=NUMBER
+            )
+            print("{:>14} {:>8} {:>8.2f} us".format(
+                name, parse.__name__, duration / NUMBER * 1e6
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Response cache benchmark.
+
+Runs a centimani server in a child process, and measures the number of
+requests per second handled when clients fetch a JSON document rendered
+by its handler at each request, without then with a ``ResponseCache``.
+The handler allows the response to be cached for a minute.
+
+Usage:
+    python -m benchmarks.response_cache [clients] [duration]
+"""
+
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+
+from centimani.server import Server, RequestHandler
+from centimani.server.cache import ResponseCache
+
+
+HOST = "127.0.0.1"
+PORT = 8189
+
+REQUEST = (
+    b"GET /items?page=1 HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"\r\n"
+)
+
+ITEMS = [
+    {"id": i, "name": "item {}".format(i), "tags": ["a", "b", "c"]}
+    for i in range(200)
+]
+
+
+class ItemsHandler(RequestHandler):
+    static_headers = {
+        "content-type": "application/json",
+        "cache-control": "public, max-age=60",
+    }
+
+    async def get(self):
+        body = json.dumps({"page": 1, "items": ITEMS}).encode("utf-8")
+        await self.send_response(200, body=body)
+
+
+def run_server(ready, cached):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    cache = ResponseCache() if cached else None
+    server = Server([(r"^/items$", ItemsHandler)], cache=cache, loop=loop)
+    loop.run_until_complete(server.listen(HOST, PORT))
+    ready.set()
+    loop.run_forever()
+
+
+async def client(deadline):
+    """Sends requests one after the other, returns the response
+    count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    count = 0
+
+    while time.perf_counter() < deadline:
+        writer.write(REQUEST)
+
+        header = await reader.readuntil(b"\r\n\r\n")
+        start = header.index(b"Content-Length: ") + 16
+        length = int(header[start:header.index(b"\r\n", start)])
+        await reader.readexactly(length)
+
+        count += 1
+
+    writer.close()
+    return count
+
+
+async def run_clients(clients, duration):
+    deadline = time.perf_counter() + duration
+    counts = await asyncio.gather(*(client(deadline) for _ in range(clients)))
+    return sum(counts)
+
+
+def bench(cached, clients, duration):
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=run_server, args=(ready, cached))
+    process.start()
+    ready.wait()
+
+    try:
+        total = asyncio.run(run_clients(clients, duration))
+    finally:
+        process.terminate()
+        process.join()
+
+    return total / duration
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for cached in (False, True):
+        name = "ResponseCache" if cached else "no cache"
+        print("{:<14} {} clients: {:.0f} requests/s".format(
+            name, clients, bench(cached, clients, duration)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Response header serialization microbenchmark.
+
+Compares the former serialization of response headers, building a
+``Headers`` and formatting each field line, with the precompiled
+serialization of ``Http1Pipeline``, for a tiny JSON response. The
+content type is given either per response or as the handler
+``static_headers``.
+
+Usage:
+    python -m benchmarks.response_headers
+"""
+
+import asyncio
+import timeit
+
+from datetime import datetime
+
+from centimani.headers import Headers
+from centimani.server import Server, RequestHandler
+from centimani.server.http1 import Http1Connection
+from centimani.stream import StreamReader
+from centimani.utils import HTTP_STATUSES
+
+
+NUMBER = 50000
+
+
+class JsonHandler(RequestHandler):
+    static_headers = {"content-type": "application/json"}
+
+
+def former_response_header(status, headers, content_length, server_agent):
+    """The serialization used before the precompiled fast path."""
+    reason = HTTP_STATUSES[status]
+    status_line = "HTTP/1.1 {0} {1}\r\n".format(status, reason)
+
+    response_headers = Headers(
+        date=datetime.utcnow(),
+        server=server_agent,
+        connection="keep-alive"
+    )
+    response_headers.update(headers)
+    response_headers.set("content-length", content_length)
+
+    response_header = bytearray(status_line.encode("ascii"))
+
+    for name, content in response_headers.fields():
+        field_line = "{0}: {1}\r\n".format(name.title(), content)
+        response_header.extend(field_line.encode("ascii"))
+
+    response_header.extend(b"\r\n")
+
+    return response_header
+
+
+def main():
+    loop = asyncio.new_event_loop()
+    server = Server([(r"^/$", JsonHandler)], loop=loop)
+    connection = Http1Connection(
+        server, StreamReader(None, loop=loop), None, ("127.0.0.1", 0)
+    )
+    pipeline = connection._pipeline
+    build = pipeline._build_response_header
+
+    def former():
+        headers = Headers(content_type="application/json")
+        former_response_header(200, headers, 16, server.server_agent)
+
+    def precompiled():
+        headers = Headers(content_type="application/json")
+        build(200, headers, 16)
+
+    def static():
+        build(200, None, 16)
+
+    former_time = timeit.timeit(former, number=NUMBER)
+    precompiled_time = timeit.timeit(precompiled, number=NUMBER)
+
+    pipeline._handler = JsonHandler(pipeline)
+    static_time = timeit.timeit(static, number=NUMBER)
+
+    for name, duration in (
+            ("former", former_time),
+            ("precompiled", precompiled_time),
+            ("static headers", static_time)):
+        print("{:>16} {:>8.2f} us".format(name, duration / NUMBER * 1e6))
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
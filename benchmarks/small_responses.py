@@ -0,0 +1,90 @@
+"""Small responses throughput benchmark.
+
+Runs a centimani server in a child process, answering each request
+with a tiny JSON body, and measures the number of requests per second
+handled over keep-alive connections.
+
+Usage:
+    python -m benchmarks.small_responses [connections] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from centimani.headers import Headers
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8181
+
+REQUEST = (
+    b"GET / HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"Accept: application/json\r\n"
+    b"\r\n"
+)
+
+
+class JsonHandler(RequestHandler):
+    async def get(self):
+        headers = Headers(content_type="application/json")
+        await self.send_response(200, headers, b'{"status": "ok"}')
+
+
+def run_server(ready):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = Server([(r"^/$", JsonHandler)], loop=loop)
+    loop.run_until_complete(server.listen(HOST, PORT))
+    ready.set()
+    loop.run_forever()
+
+
+async def client(duration):
+    """Sends requests one after the other, returns the response count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    deadline = time.perf_counter() + duration
+    count = 0
+
+    while time.perf_counter() < deadline:
+        writer.write(REQUEST)
+        header = await reader.readuntil(b"\r\n\r\n")
+        start = header.index(b"Content-Length: ") + 16
+        length = int(header[start:header.index(b"\r\n", start)])
+        await reader.readexactly(length)
+        count += 1
+
+    writer.close()
+    return count
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=run_server, args=(ready,))
+    process.start()
+    ready.wait()
+
+    async def run():
+        tasks = [client(duration) for _ in range(connections)]
+        return sum(await asyncio.gather(*tasks))
+
+    try:
+        total = asyncio.run(run())
+    finally:
+        process.terminate()
+        process.join()
+
+    print("{} connections, {:.0f} requests/s".format(
+        connections, total / duration
+    ))
+
+
+if __name__ == "__main__":
+    main()
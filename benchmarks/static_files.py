@@ -0,0 +1,121 @@
+"""Static file serving benchmark.
+
+Runs a centimani server in a child process, and measures the number of
+requests per second handled when clients fetch a small file, served by
+a handler reading the whole file at each request, then by a
+``StaticFileHandler`` keeping it in its cache.
+
+Usage:
+    python -m benchmarks.static_files [clients] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from centimani.server import Server, RequestHandler
+from centimani.server.static import StaticFileHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8188
+
+FILE_SIZE = 16 * 1024
+
+REQUEST = (
+    b"GET /static/style.css HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"\r\n"
+)
+
+
+def make_handler(root, static):
+    if static:
+        return StaticFileHandler.configure(root)
+
+    class ReadingHandler(RequestHandler):
+        static_headers = {"content-type": "text/css"}
+
+        async def get(self, path):
+            with open(os.path.join(root, path), "rb") as file:
+                body = file.read()
+            await self.send_response(200, body=body)
+
+    return ReadingHandler
+
+
+def run_server(ready, root, static):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    handler = make_handler(root, static)
+    server = Server([(r"^/static/(.+)$", handler)], loop=loop)
+    loop.run_until_complete(server.listen(HOST, PORT))
+    ready.set()
+    loop.run_forever()
+
+
+async def client(deadline):
+    """Sends requests one after the other, returns the response
+    count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    count = 0
+
+    while time.perf_counter() < deadline:
+        writer.write(REQUEST)
+
+        header = await reader.readuntil(b"\r\n\r\n")
+        start = header.index(b"Content-Length: ") + 16
+        length = int(header[start:header.index(b"\r\n", start)])
+        await reader.readexactly(length)
+
+        count += 1
+
+    writer.close()
+    return count
+
+
+async def run_clients(clients, duration):
+    deadline = time.perf_counter() + duration
+    counts = await asyncio.gather(*(client(deadline) for _ in range(clients)))
+    return sum(counts)
+
+
+def bench(root, static, clients, duration):
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=run_server,
+        args=(ready, root, static)
+    )
+    process.start()
+    ready.wait()
+
+    try:
+        total = asyncio.run(run_clients(clients, duration))
+    finally:
+        process.terminate()
+        process.join()
+
+    return total / duration
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "style.css"), "wb") as file:
+            file.write(b"a" * FILE_SIZE)
+
+        for static in (False, True):
+            name = "StaticFileHandler" if static else "read per request"
+            print("{:<18} {} clients: {:.0f} requests/s".format(
+                name, clients, bench(root, static, clients, duration)
+            ))
+
+
+if __name__ == "__main__":
+    main()
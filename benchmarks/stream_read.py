@@ -0,0 +1,123 @@
+"""Microbenchmark of ``StreamReader`` consumption.
+
+Fills a reader with ``limit`` bytes, then consumes them in small blocks,
+like ``BufferedBodyReader`` does. The front-deleting reader used before
+read cursors were introduced is measured as a reference.
+
+Usage:
+    python -m benchmarks.stream_read
+"""
+
+import asyncio
+import time
+
+from centimani.stream import StreamReader
+
+
+LIMITS = (1 << 14, 1 << 16, 1 << 18, 1 << 20)
+BLOCK_SIZES = (64, 512, 4096)
+ROUNDS = 20
+
+
+class DummyTransport:
+    def pause_reading(self):
+        pass
+
+    def resume_reading(self):
+        pass
+
+
+class FrontDeletingReader:
+    """Reference reader, with the ``read`` implementation used before read
+    cursors: ``del buffer[:n]`` after each read.
+    """
+
+    def __init__(self, limit):
+        self._buffer = bytearray()
+        self._limit = limit
+        self._eof = False
+        self._paused = False
+        self._exception = None
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def feed(self, data):
+        self._buffer.extend(data)
+
+    def _maybe_resume(self):
+        if self._paused and len(self._buffer) < self._limit:
+            self._paused = False
+
+    async def read(self, count):
+        assert isinstance(count, int)
+        assert count >= 0
+
+        if count == 0:
+            return b""
+
+        if self._exception is not None:
+            raise self._exception
+
+        if count > self._limit:
+            raise ValueError("trying to read more bytes than buffer limit")
+
+        if not self._eof and len(self._buffer) < count:
+            raise RuntimeError("no pending reads in this benchmark")
+
+        data = bytes(self._buffer[:count])
+        del self._buffer[:count]
+
+        self._maybe_resume()
+
+        return data
+
+
+def measure(loop, reader_factory, limit, block_size):
+    """Returns the mean time needed to consume ``limit`` bytes."""
+    data = bytes(limit)
+
+    async def consume(reader):
+        while len(reader):
+            await reader.read(block_size)
+
+    elapsed = 0
+
+    for _ in range(ROUNDS):
+        reader = reader_factory(limit)
+        reader.feed(data)
+
+        start = time.perf_counter()
+        loop.run_until_complete(consume(reader))
+        elapsed += time.perf_counter() - start
+
+    return elapsed / ROUNDS
+
+
+def main():
+    loop = asyncio.new_event_loop()
+
+    readers = (
+        ("front-del", FrontDeletingReader),
+        ("cursor", lambda limit: StreamReader(DummyTransport(), limit, loop)),
+    )
+
+    print("{:>9} {:>6} {:>14} {:>14}".format(
+        "limit", "block", *("{} (ms)".format(name) for name, _ in readers)
+    ))
+
+    for limit in LIMITS:
+        for block_size in BLOCK_SIZES:
+            results = (
+                measure(loop, factory, limit, block_size) * 1000
+                for _, factory in readers
+            )
+            print("{:>9} {:>6} {:>14.2f} {:>14.2f}".format(
+                limit, block_size, *results
+            ))
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
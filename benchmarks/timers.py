@@ -0,0 +1,87 @@
+"""Timeouts microbenchmark.
+
+Arms one timeout per connection for 100k mostly-idle keep-alive
+connections, then refreshes each timeout as if every connection had
+some activity, and finally cancels them all. ``loop.call_later``
+handles, that must be cancelled and created again to be refreshed, are
+compared with ``TimerWheel`` timers.
+
+Usage:
+    python -m benchmarks.timers [connections]
+"""
+
+import asyncio
+import sys
+import time
+
+from centimani.timers import TimerWheel
+
+
+TIMEOUT = 60
+
+
+def callback():
+    pass
+
+
+def bench_call_later(loop, count):
+    start = time.perf_counter()
+    handles = [loop.call_later(TIMEOUT, callback) for _ in range(count)]
+    armed = time.perf_counter()
+
+    for i, handle in enumerate(handles):
+        handle.cancel()
+        handles[i] = loop.call_later(TIMEOUT, callback)
+    refreshed = time.perf_counter()
+
+    for handle in handles:
+        handle.cancel()
+    cancelled = time.perf_counter()
+
+    # let the loop drop the cancelled handles
+    loop.run_until_complete(asyncio.sleep(0))
+
+    return armed - start, refreshed - armed, cancelled - refreshed
+
+
+def bench_timer_wheel(loop, count):
+    wheel = TimerWheel(loop)
+
+    start = time.perf_counter()
+    timers = [wheel.call_later(TIMEOUT, callback) for _ in range(count)]
+    armed = time.perf_counter()
+
+    for timer in timers:
+        timer.start(TIMEOUT)
+    refreshed = time.perf_counter()
+
+    for timer in timers:
+        timer.cancel()
+    cancelled = time.perf_counter()
+
+    loop.run_until_complete(asyncio.sleep(wheel.resolution))
+
+    return armed - start, refreshed - armed, cancelled - refreshed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    loop = asyncio.new_event_loop()
+
+    print("{:>12} {:>12} {:>12} {:>12}   ({} timeouts)".format(
+        "", "arm (ms)", "re-arm (ms)", "cancel (ms)", count
+    ))
+
+    for name, bench in (
+            ("call_later", bench_call_later),
+            ("timer wheel", bench_timer_wheel)):
+        arm, rearm, cancel = bench(loop, count)
+        print("{:>12} {:>12.1f} {:>12.1f} {:>12.1f}".format(
+            name, arm * 1e3, rearm * 1e3, cancel * 1e3
+        ))
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Worker processes benchmark.
+
+Runs a centimani server with ``Server.serve`` in a child process, with
+one worker, then with ``workers`` workers, and measures the number of
+requests per second handled when as many client processes, each with
+``clients`` connections, send small requests. The throughput should
+grow with the number of workers, up to the number of CPUs, which must
+be shared by the clients and the workers.
+
+Usage:
+    python -m benchmarks.workers [workers] [clients] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+from centimani.server import Server, RequestHandler
+
+
+HOST = "127.0.0.1"
+PORT = 8191
+
+REQUEST = (
+    b"GET / HTTP/1.1\r\n"
+    b"Host: localhost\r\n"
+    b"\r\n"
+)
+
+
+class JsonHandler(RequestHandler):
+    static_headers = {"content-type": "application/json"}
+
+    async def get(self):
+        await self.send_response(200, body=b'{"status": "ok"}')
+
+
+def run_server(workers):
+    loop = asyncio.new_event_loop()
+    server = Server([(r"^/$", JsonHandler)], loop=loop)
+    server.serve(HOST, PORT, workers=workers)
+
+
+def wait_listening():
+    while True:
+        try:
+            socket.create_connection((HOST, PORT)).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+
+
+async def client(deadline):
+    """Sends requests one after the other, returns the response
+    count."""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    count = 0
+
+    while time.perf_counter() < deadline:
+        writer.write(REQUEST)
+
+        header = await reader.readuntil(b"\r\n\r\n")
+        start = header.index(b"Content-Length: ") + 16
+        length = int(header[start:header.index(b"\r\n", start)])
+        await reader.readexactly(length)
+
+        count += 1
+
+    writer.close()
+    return count
+
+
+async def run_clients(clients, duration):
+    deadline = time.perf_counter() + duration
+    counts = await asyncio.gather(*(client(deadline) for _ in range(clients)))
+    return sum(counts)
+
+
+def client_process(clients, duration, results):
+    results.put(asyncio.run(run_clients(clients, duration)))
+
+
+def bench(workers, processes, clients, duration):
+    server = multiprocessing.Process(target=run_server, args=(workers,))
+    server.start()
+    wait_listening()
+
+    results = multiprocessing.Queue()
+    client_processes = [
+        multiprocessing.Process(
+            target=client_process,
+            args=(clients, duration, results)
+        )
+        for _ in range(processes)
+    ]
+
+    try:
+        for process in client_processes:
+            process.start()
+
+        total = sum(results.get() for _ in client_processes)
+
+        for process in client_processes:
+            process.join()
+    finally:
+        server.terminate()
+        server.join()
+
+    return total / duration
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    for count in sorted({1, workers}):
+        print("{} workers, {} clients: {:.0f} requests/s".format(
+            count, count * clients, bench(count, count, clients, duration)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,6 @@ import asyncio
 import logging
 import urllib.parse as urlparse
 
-from asyncio import coroutine
-
 from centimani.headers import Headers
 
 
@@ -90,7 +88,8 @@ class Connection:
         self._peername = peername
         self._logger = ConnectionLogger(logger, self._peername)
 
-        self._last_activity = self._loop.time()
+        self._last_activity = self._client._clock.time
+        self._idle_timer = None
 
     def __repr__(self):
         return "<{0} {1[0]}:{1[1]} closing={2}>".format(
@@ -113,8 +112,17 @@ class Connection:
         return self._writer.is_closing()
 
     def touch(self):
-        """Change last activity time to now."""
-        self._last_activity = self._loop.time()
+        """Change last activity time to now, as given by the coarse
+        clock of the client, and re-arm the idle timer."""
+        self._last_activity = self._client._clock.time
+
+        if self._idle_timer is not None:
+            self._idle_timer.start(self._client._keep_alive_timeout)
+
+    def set_idle_timer(self, timer):
+        """Set the timer armed by ``touch``, that expires when the
+        connection is idle."""
+        self._idle_timer = timer
 
     def lock(self, semaphore):
         """Locks this connection."""
@@ -127,4 +135,8 @@ class Connection:
     def close(self):
         """Closes this connection."""
         assert not self._writer.is_closing()
+
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+
         self._writer.close()
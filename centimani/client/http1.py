@@ -2,11 +2,9 @@ import asyncio
 import logging
 import time
 
-from asyncio import coroutine
-
 from .errors import ClientConnectionError, ClientTimeoutError
 from .handlers import Connection, Response
-from centimani.headers import Headers
+from centimani.headers import Headers, LazyHeaders
 from centimani.streamutils import BufferedBodyReader, ChunkedBodyReader
 from centimani.errors import HttpError
 
@@ -27,6 +25,7 @@ class Http1Connection(Connection):
         super().__init__(manager, reader, writer, peername, logger=_LOGGER)
         self._semaphore = None
         self._is_locked = False
+        self._request_timer = None
 
     @property
     def protocol(self):
@@ -42,6 +41,11 @@ class Http1Connection(Connection):
         else:
             return False
 
+    @property
+    def is_idle(self):
+        """True if no request is in progress."""
+        return not self._is_locked
+
     def lock(self, semaphore):
         """Lock this connection and link it to the ressource mananged by
         the ``semaphore``.
@@ -65,14 +69,16 @@ class Http1Connection(Connection):
         assert not self._writer.is_closing()
         assert self._is_locked
 
-        try:
-            if request.timeout is not None:
-                response = await asyncio.wait_for(
-                    self._fetch(request),
-                    request.timeout
+        if request.timeout is not None:
+            if self._request_timer is None:
+                self._request_timer = self._client._timers.timer(
+                    self._request_timed_out
                 )
-            else:
-                response = await self._fetch(request)
+
+            self._request_timer.start(request.timeout)
+
+        try:
+            response = await self._fetch(request)
 
         except ConnectionError as error:
             if not self.is_closing():
@@ -89,6 +95,10 @@ class Http1Connection(Connection):
             raise ClientTimeoutError(msg) from error
 
         finally:
+            if request.timeout is not None:
+                self._request_timer.cancel()
+                self._reader.clear_interrupt()
+
             if self._semaphore is not None:
                 self._semaphore.release()
 
@@ -96,6 +106,9 @@ class Http1Connection(Connection):
 
         return response
 
+    def _request_timed_out(self):
+        self._reader.interrupt(asyncio.TimeoutError())
+
     async def _fetch(self, request):
         """Used by ``fetch`` to actually do the request/response transfert."""
         assert not self._writer.is_closing()
@@ -122,10 +135,11 @@ class Http1Connection(Connection):
         )
 
         header = b"".join((request_line, header_fields, b"\r\n"))
-        self._writer.write(header)
 
         if request.body:
-            self._writer.write(request.body)
+            self._writer.writelines((header, request.body))
+        else:
+            self._writer.write(header)
 
         await self._writer.drain()
 
@@ -134,7 +148,7 @@ class Http1Connection(Connection):
         #------------------#
 
         header = await self._reader.read_until(b"\r\n\r\n")
-        status_line, *header_field_lines = header.split(b"\r\n")
+        status_line, _, header_block = header.partition(b"\r\n")
 
         if not status_line:
             if not self.is_closing():
@@ -144,8 +158,9 @@ class Http1Connection(Connection):
 
         version, status, reason = status_line.split(maxsplit=2)
 
-        response = Response(int(status), request=request)
-        response.header_fields.parse_lines(header_field_lines)
+        response = Response(
+            int(status), LazyHeaders(header_block), request=request
+        )
 
         #--------------#
         # Body reading #
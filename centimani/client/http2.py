@@ -0,0 +1,307 @@
+import asyncio
+import logging
+
+from .errors import ClientConnectionError, ClientTimeoutError
+from .handlers import Connection, Response
+from centimani.headers import Headers, UNSPLITTED_FIELD_NAMES
+from centimani.http2 import Http2Error, Http2Session, StreamResetError
+from centimani.http2 import CONNECTION_FIELD_NAMES
+from centimani.http2 import CANCEL, NO_ERROR, PROTOCOL_ERROR, REFUSED_STREAM
+from centimani.http2 import SETTINGS_ENABLE_PUSH
+from centimani.http2 import SETTINGS_MAX_CONCURRENT_STREAMS
+
+
+_LOGGER = logging.getLogger(__name__)
+
+# streams opened at once when the server does not limit them
+DEFAULT_MAX_CONCURRENT_STREAMS = 100
+
+
+class Http2Connection(Connection, Http2Session):
+    """A Connection that implements the HTTP/2 protocol, as defined in
+    RFC 9113.
+
+    Requests are multiplexed: each call to ``fetch`` is sent on its own
+    stream, up to the number of concurrent streams allowed by the
+    server. The connection stays available until then, so ``lock`` may
+    be called for each stream.
+    """
+
+    def __init__(
+            self,
+            manager,
+            reader, writer, peername,
+            loop=None):
+        super().__init__(manager, reader, writer, peername, logger=_LOGGER)
+        self._semaphore = None
+        self._locked_streams = 0
+
+        self._init_session(
+            client=True,
+            timers=manager._timers,
+            settings={SETTINGS_ENABLE_PUSH: 0}
+        )
+        self._send_preface()
+
+        # frames are received by a task of their own, for all the
+        # streams
+        self._listen_task = self._loop.create_task(self._listen())
+
+    @property
+    def protocol(self):
+        return "h2"
+
+    @property
+    def max_concurrent_streams(self):
+        """The number of streams the server allows to open at once."""
+        max_streams = self._remote_settings[SETTINGS_MAX_CONCURRENT_STREAMS]
+
+        if max_streams is None:
+            return DEFAULT_MAX_CONCURRENT_STREAMS
+
+        return max_streams
+
+    @property
+    def is_available(self):
+        """An HTTP/2 connection is available if it is not closing, and
+        another stream may be opened.
+        """
+        if self._writer.is_closing() or self._going_away:
+            return False
+
+        return self._locked_streams < self.max_concurrent_streams
+
+    @property
+    def is_idle(self):
+        """True if no request is in progress."""
+        return not self._locked_streams
+
+    def lock(self, semaphore):
+        """Reserve a stream of this connection, for the next call to
+        ``fetch``, and link it to the ressource managed by the
+        ``semaphore``.
+
+        The semaphore will be released when the ``fetch`` call returns
+        or raises an exception. The semaphores of the locks of a
+        connection are the same, the one of its endpoint.
+        """
+        assert self.is_available
+        self._semaphore = semaphore
+        self._locked_streams += 1
+
+    async def fetch(self, request):
+        """Send the ``request`` to the server, on a new stream, and
+        returns the response.
+
+        When the response is built or an exception is raised, the
+        semaphore passed to ``lock`` is released, and the stream
+        reserved. Errors only reset the stream, unless the connection is
+        lost.
+        """
+        assert self._locked_streams
+
+        stream = None
+        request_timer = None
+
+        try:
+            if self._writer.is_closing() or self._going_away:
+                raise ConnectionResetError("connection closing")
+
+            stream = self._open_stream()
+            stream.handler = self._loop.create_future()
+
+            if request.timeout is not None:
+                request_timer = self._client._timers.timer(
+                    self._request_timed_out, stream
+                )
+                request_timer.start(request.timeout)
+
+            response = await self._fetch(stream, request)
+
+        except StreamResetError as error:
+            if error.code == REFUSED_STREAM:
+                msg = "request {0} refused by the server".format(request)
+            else:
+                msg = "stream reset during handling of {0}".format(request)
+
+            raise ClientConnectionError(msg) from error
+
+        except ConnectionError as error:
+            msg = "connection error during handling of {0}".format(request)
+            raise ClientConnectionError(msg) from error
+
+        except asyncio.TimeoutError as error:
+            msg = "request {0} timeout.".format(request)
+            raise ClientTimeoutError(msg) from error
+
+        finally:
+            if request_timer is not None:
+                request_timer.cancel()
+
+            if stream is not None:
+                if not stream.closed:
+                    # the response was not received completely
+                    self._reset_stream(stream, CANCEL)
+
+                if stream.handler.done():
+                    # the error given to the response header waiter may
+                    # not have been waited for
+                    stream.handler.exception()
+
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+            self._locked_streams -= 1
+
+        return response
+
+    def _request_timed_out(self, stream):
+        self._reset_stream(stream, CANCEL, asyncio.TimeoutError())
+
+    async def _fetch(self, stream, request):
+        """Used by ``fetch`` to actually do the request/response transfert
+        on ``stream``."""
+        start_time = self._loop.time()
+
+        #--------------#
+        # Send request #
+        #--------------#
+
+        host = request.header_fields.get("host", [])
+        authority = host[0] if host else request.authority
+
+        fields = [
+            (":method", request.method),
+            (":scheme", request.scheme),
+            (":authority", authority),
+            (":path", request.relative_url),
+        ]
+
+        for name, value in request.header_fields.fields():
+            name = name.lower()
+
+            if name != "host" and name not in CONNECTION_FIELD_NAMES:
+                fields.append((name, str(value)))
+
+        body = request.body
+
+        if body and "content-length" not in request.header_fields:
+            fields.append(("content-length", str(len(body))))
+
+        self._send_headers(stream, fields, end_stream=not body)
+
+        if body:
+            await self._send_data(stream, body, end_stream=True)
+        else:
+            await self._drain()
+
+        #------------------#
+        # Receive response #
+        #------------------#
+
+        status, header_fields = await stream.handler
+        response = Response(status, header_fields, request=request)
+
+        body = bytearray()
+
+        async for block in stream.body_reader:
+            if request.body_streaming_callback is None:
+                body.extend(block)
+            else:
+                request.body_streaming_callback(block)
+
+        response.body = bytes(body)
+
+        end_time = self._loop.time()
+        delta_time = end_time - start_time
+        self._logger.debug(
+            "response built in %fs:\n%s\n%s",
+            delta_time, request, response
+        )
+
+        return response
+
+    async def _listen(self):
+        """Receive the frames of the connection, until it is closed."""
+        try:
+            await self._run_session()
+        finally:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+
+            if not self._writer.is_closing():
+                self._writer.close()
+
+    def close(self):
+        """Closes this connection, the streams in progress are reset."""
+        assert not self._writer.is_closing()
+
+        self._send_goaway(NO_ERROR)
+        self._flush()
+
+        super().close()
+
+    #---------------#
+    # Session hooks #
+    #---------------#
+
+    def _headers_received(self, stream, fields, end_stream):
+        waiter = stream.handler
+
+        if waiter.done():
+            # trailers
+            if not end_stream:
+                raise Http2Error(
+                    PROTOCOL_ERROR, "trailers expected", stream.id
+                )
+
+            trailers = Headers()
+
+            for name, value in fields:
+                if name.startswith(":"):
+                    raise Http2Error(
+                        PROTOCOL_ERROR, "pseudo header in trailers", stream.id
+                    )
+                trailers.add(name, value)
+
+            self._remote_stream_end(stream, trailers)
+            return
+
+        if not fields or fields[0][0] != ":status" or not (
+                fields[0][1].isdigit() and len(fields[0][1]) == 3):
+            raise Http2Error(PROTOCOL_ERROR, "invalid :status", stream.id)
+
+        status = int(fields[0][1])
+
+        if status < 200:
+            # informational responses are ignored
+            if end_stream:
+                raise Http2Error(
+                    PROTOCOL_ERROR, "informational response ends stream",
+                    stream.id
+                )
+            return
+
+        header_fields = Headers()
+
+        for name, value in fields[1:]:
+            if name.startswith(":"):
+                raise Http2Error(
+                    PROTOCOL_ERROR, "invalid pseudo header", stream.id
+                )
+
+            if name in UNSPLITTED_FIELD_NAMES:
+                header_fields.add(name, value)
+            else:
+                header_fields.add(name, Headers.split_field_content(value))
+
+        waiter.set_result((status, header_fields))
+
+        if end_stream:
+            self._remote_stream_end(stream)
+
+    def _stream_reset(self, stream, exception):
+        waiter = stream.handler
+
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(exception)
@@ -3,13 +3,15 @@ import itertools
 import logging
 import ssl
 
-from asyncio import coroutine
 from collections import defaultdict, namedtuple
 
+from centimani.clock import get_clock
 from centimani.stream import open_connection
+from centimani.timers import get_timer_wheel
 from .errors import ClientConnectionError, ClientTimeoutError
 from .handlers import Request
 from .http1 import Http1Connection
+from .http2 import Http2Connection
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -19,13 +21,27 @@ DEFAULT_PORT = {
     "https": 443,
 }
 
+# HTTP/2 is negotiated when "h2" is added, e.g. ("h2", "http/1.1")
 DEFAULT_ALPN_PROTOCOLS = ("http/1.1",)
 
 DEFAULT_PROTOCOL_MAP = {
     "http/1.1" : Http1Connection,
+    "h2" : Http2Connection,
 }
 
 class Client:
+    """Sends HTTP requests, on connections kept alive and reused per
+    endpoint.
+
+    ``max_endpoint_connections`` limits the requests in progress to an
+    endpoint: each one locks an HTTP/1.1 connection, or a stream of an
+    HTTP/2 connection, that multiplexes the requests of an endpoint up
+    to the concurrent streams allowed by the server.
+
+    HTTP/2 is negotiated with ALPN when "h2" is in ``alpn_protocols``,
+    and used on cleartext connections, with prior knowledge, if ``h2c``
+    is True.
+    """
 
     @staticmethod
     def default_port(scheme):
@@ -44,6 +60,7 @@ class Client:
             max_redirections=5,
             alpn_protocols=DEFAULT_ALPN_PROTOCOLS,
             protocol_map=DEFAULT_PROTOCOL_MAP,
+            h2c=False,
             loop=None):
         self._connection_timeout = connection_timeout
         self._keep_alive_timeout = keep_alive_timeout
@@ -57,124 +74,153 @@ class Client:
             self._ssl_context.set_alpn_protocols(alpn_protocols)
 
         self._protocol_map = protocol_map
+        self._alpn_protocols = alpn_protocols
+        self._h2c = h2c
 
         self._loop = loop or asyncio.get_event_loop()
+        self._clock = get_clock(self._loop)
+        self._timers = get_timer_wheel(self._loop)
 
         self._endpoint_connections = defaultdict(list)
         self._endpoint_semaphores = defaultdict(self._default_semaphore)
 
-        self._permanent_redirects = {}
-
-        self._cleanup_running = False
-        self._cleanup_task = self._loop.create_task(self._cleanup())
-
-    def _default_semaphore(self):
-        assert self.max_endpoint_connections
-
-        return asyncio.BoundedSemaphore(
-            self._max_endpoint_connections,
-            loop=self._loop
-        )
-
-    async def _cleanup(self):
-        """Runs the cleanup task.
+        # futures of the connections being opened, by endpoint, waited
+        # for by the requests that may be multiplexed on them
+        self._opening_connections = {}
 
-        Runs ``_cleanup_endpoint`` for each endpoint and remove endpoints
-        with no connections.
-        """
-        self._cleanup_running = True
-        while self._cleanup_running:
-            _LOGGER.debug("cleanup waked up.")
+        # endpoints that may use HTTP/2, but negotiated HTTP/1.1
+        self._http1_endpoints = set()
 
-            for key in self._endpoint_connections:
-                self._cleanup_endpoint(key)
+        self._permanent_redirects = {}
 
-            no_connection_endpoint = [
-                key for key, endpoint_connections in self._endpoint_connections.items()
-                if not endpoint_connections
-            ]
 
-            for key in no_connection_endpoint:
-                _LOGGER.debug("remove endpoint %s", key)
-                del self._endpoint_connections[key]
-                del self._endpoint_semaphores[key]
+    def _default_semaphore(self):
+        assert self._max_endpoint_connections
 
-            await asyncio.sleep(10)
+        return asyncio.BoundedSemaphore(self._max_endpoint_connections)
 
-    def _cleanup_endpoint(self, key):
-        """Cleanup connections for the endpoint designed by ``key``.
+    def _close_idle_connection(self, key, connection):
+        """Called when the idle timer of ``connection``, to the endpoint
+        designed by ``key``, expires.
 
-        - Closes timed out connections.
-        - Removes closing connections.
+        - Closes the connection if it is not in use.
+        - Removes it from the endpoint connections if it is closing.
+        - Removes the endpoint if it has no more connections.
         """
-        endpoint_connections = self._endpoint_connections[key]
-        now = self._loop.time()
-
-        _LOGGER.debug("connections to %s:\n%s", key, endpoint_connections)
-
-        #------------------------------------------#
-        # Remove closing and timed out connections #
-        #------------------------------------------#
-
-        timed_out_connections = [
-            connection for connection in endpoint_connections
-            if not connection.is_closing()
-            and now - connection.last_activity > self._keep_alive_timeout
-        ]
-
-        if timed_out_connections:
-            _LOGGER.debug("timed out connections\n%s", timed_out_connections)
-
-        # close timed out connections
-        for connection in timed_out_connections:
+        if connection.is_idle and not connection.is_closing():
+            _LOGGER.debug("timed out connection %s", connection)
             connection.close()
 
-        closing_connections = [
-            connection for connection in endpoint_connections
-            if connection.is_closing()
-        ]
+        if not connection.is_closing():
+            return
 
-        if closing_connections:
-            _LOGGER.debug("closing connections\n%s", closing_connections)
+        endpoint_connections = self._endpoint_connections.get(key)
 
-        # remove closing connections
-        for connection in closing_connections:
+        if endpoint_connections and connection in endpoint_connections:
             endpoint_connections.remove(connection)
 
+        if not endpoint_connections:
+            _LOGGER.debug("remove endpoint %s", key)
+            self._endpoint_connections.pop(key, None)
+            self._endpoint_semaphores.pop(key, None)
+
     async def connect(self, request):
         """Get or create a connection in order to send ``request`` on it."""
         key = (request.scheme, request.authority)
 
         if self._max_endpoint_connections is not None:
             semaphore = self._endpoint_semaphores[key]
-            await semaphore.acquire()
+
+            if self._connection_timeout:
+                await asyncio.wait_for(
+                    semaphore.acquire(),
+                    self._connection_timeout
+                )
+            else:
+                await semaphore.acquire()
         else:
             semaphore = None
 
+        try:
+            connection = await self._endpoint_connection(key)
+        except BaseException:
+            # the request is not sent, release the semaphore
+            if semaphore is not None:
+                semaphore.release()
+            raise
+
+        connection.lock(semaphore)
+        connection.touch()
+
+        return connection
+
+    async def _endpoint_connection(self, key):
+        """Returns an available connection to the endpoint designed by
+        ``key``, opened if there is none."""
         connections = self._endpoint_connections[key]
-        available_connections = [c for c in connections if c.is_available]
+        connection = self._available_connection(connections)
 
-        if available_connections:
-            # connections are available, we choose the less active one.
-            available_connections.sort(key=lambda c: c.last_activity)
-            connection = available_connections[0]
-            connection.lock(semaphore)
-        else:
-            # no available connection, open a new connection.
-            try:
+        while connection is None and key in self._opening_connections:
+            # the connection being opened may multiplex requests
+            await asyncio.wait((self._opening_connections[key],))
+            connection = self._available_connection(connections)
+
+        if connection is not None:
+            return connection
+
+        # no available connection, open a new connection.
+        opening = None
+
+        if self._may_multiplex(key):
+            opening = self._loop.create_future()
+            self._opening_connections[key] = opening
+
+        try:
+            if self._connection_timeout:
+                connection = await asyncio.wait_for(
+                    self.open_connection(key),
+                    self._connection_timeout
+                )
+            else:
                 connection = await self.open_connection(key)
-            except ConnectionError as error:
-                # connection aborted, release the semaphore
-                semaphore.release()
-                raise
+        finally:
+            if opening is not None:
+                opening.set_result(None)
 
-            connection.lock(semaphore)
-            connections.append(connection)
+                if self._opening_connections.get(key) is opening:
+                    del self._opening_connections[key]
 
-        connection.touch()
+        if opening is not None and connection.protocol != "h2":
+            # next connections are opened without waiting
+            self._http1_endpoints.add(key)
+
+        connections.append(connection)
 
         return connection
 
+    @staticmethod
+    def _available_connection(connections):
+        """Returns the less active of the available ``connections``, or
+        None."""
+        available_connections = [c for c in connections if c.is_available]
+
+        if not available_connections:
+            return None
+
+        return min(available_connections, key=lambda c: c.last_activity)
+
+    def _may_multiplex(self, key):
+        """True if the connections opened to the endpoint designed by
+        ``key`` may use HTTP/2."""
+        scheme, _ = key
+
+        if key in self._http1_endpoints:
+            return False
+
+        if scheme == "https":
+            return ssl.HAS_ALPN and "h2" in self._alpn_protocols
+        return self._h2c
+
     async def open_connection(self, key):
         """Open a new connection to endpoint defined by ``scheme``
         and ``authority``.
@@ -203,13 +249,21 @@ class Client:
         ssl_object = writer.get_extra_info("ssl_object")
 
         if scheme == "https" and ssl.HAS_ALPN:
-            protocol = ssl_object.selected_alpn_protocol()
+            # None if the server does not support ALPN
+            protocol = ssl_object.selected_alpn_protocol() or "http/1.1"
             _LOGGER.debug("selected ALPN protocol '%s'", protocol)
+        elif scheme == "http" and self._h2c:
+            protocol = "h2"
         else:
             protocol = "http/1.1"
 
         connection_factory = self._protocol_map[protocol]
-        return connection_factory(self, reader, writer, peername)
+        connection = connection_factory(self, reader, writer, peername)
+        connection.set_idle_timer(
+            self._timers.timer(self._close_idle_connection, key, connection)
+        )
+
+        return connection
 
     async def fetch(self, url_or_request, **kwargs):
         """Send an HTTP request and returns the server response.
@@ -226,20 +280,14 @@ class Client:
         key = (request.scheme, request.authority)
 
         try:
-            if self._connection_timeout:
-                connection = await asyncio.wait_for(
-                    self.connect(request),
-                    self._connection_timeout
-                )
-
-            else:
-                connection = await self.connect(request)
+            connection = await self.connect(request)
 
         except asyncio.TimeoutError as error:
             msg = "Connection to {0} timeout.".format(key)
             raise ClientTimeoutError(msg) from error
 
-        except ConnectionError as error:
+        except OSError as error:
+            # ConnectionError, and name resolution errors among others
             msg = "Unable to connect to {0}".format(key)
             raise ClientConnectionError(msg) from error
 
@@ -266,8 +314,6 @@ class Client:
 
     def close(self):
         """Closes all connections."""
-        self._cleanup_task.cancel()
-
         connections = itertools.chain.from_iterable(self._endpoint_connections.values())
 
         connections_to_close = (
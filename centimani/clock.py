@@ -0,0 +1,89 @@
+"""This module defines the ``Clock`` class, a coarse clock shared by the
+server and the client of an event loop.
+
+The clock is refreshed once per second, at the beginning of each second
+of the wall clock. It provides the value of the "date" header field,
+already encoded, and a coarse monotonic time used to track the activity
+of connections, without calling ``datetime.utcnow`` or ``loop.time``
+for each request.
+"""
+
+import time
+import weakref
+
+from datetime import datetime
+
+from centimani.utils import rfc1123_datetime_encode
+
+
+DEFAULT_RESOLUTION = 1.0
+
+_CLOCKS = weakref.WeakKeyDictionary()
+
+
+def get_clock(loop):
+    """Returns the ``Clock`` of ``loop``, creates it if needed."""
+    clock = _CLOCKS.get(loop)
+
+    if clock is None or clock.closed:
+        clock = _CLOCKS[loop] = Clock(loop)
+
+    return clock
+
+
+class Clock:
+    """A clock refreshed every ``resolution`` seconds by the event loop.
+
+    Attributes:
+    :time: The time of the event loop at the last refresh.
+    :date: The RFC1123 date of the last refresh, as bytes.
+    :date_field: The "date" header line of the last refresh, CRLF
+        terminated.
+    """
+
+    __slots__ = (
+        "_loop", "_resolution", "_closed",
+        "time", "date", "date_field",
+        "__weakref__",
+    )
+
+    def __init__(self, loop, resolution=DEFAULT_RESOLUTION):
+        # the loop references the clock through its timer handle, so the
+        # clock only keeps a weak reference to it, and no reference to
+        # the handle, that references the loop.
+        self._loop = weakref.ref(loop)
+        self._resolution = resolution
+        self._closed = False
+        self._tick()
+
+    @property
+    def resolution(self):
+        return self._resolution
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _tick(self):
+        """Refresh the clock, then schedule the next refresh."""
+        loop = self._loop()
+
+        if self._closed or loop is None or loop.is_closed():
+            return
+
+        self.refresh()
+
+        # align the refreshes on the wall clock seconds, so that the
+        # date changes on time
+        delay = self._resolution - time.time() % self._resolution
+        loop.call_later(delay, self._tick)
+
+    def refresh(self):
+        """Refresh the clock now."""
+        self.time = self._loop().time()
+        self.date = rfc1123_datetime_encode(datetime.utcnow()).encode("ascii")
+        self.date_field = b"Date: " + self.date + b"\r\n"
+
+    def close(self):
+        """Stop refreshing the clock."""
+        self._closed = True
@@ -1,11 +1,13 @@
 """This module contain a ``Headers`` class that handle the storage
-of HTTP header fields as defined in RFC7230.
+of HTTP header fields as defined in RFC7230, and a ``LazyHeaders``
+class that decodes the fields of a received header block on access.
 """
 
 import re
 
+from array import array
 from collections import defaultdict
-from collections.abc import Iterable
+from collections.abc import Iterable, MutableMapping
 from datetime import datetime
 
 from centimani.utils import is_rfc1123_datetime, rfc1123_datetime_encode
@@ -14,12 +16,102 @@ from centimani.utils import is_rfc1123_datetime, rfc1123_datetime_encode
 _HEADER_FIELD = rb"^([^\x00-\x20\x7F\"(),/:;<=>?@[\]{}]+):([\t !-~]*)$"
 HEADER_FIELD_REGEX = re.compile(_HEADER_FIELD)
 
+# characters allowed in field names and field values, used to validate
+# fields with ``bytes.translate``
+_TOKEN_CHARS = bytes(
+    c for c in range(0x21, 0x7F) if c not in b"\"(),/:;<=>?@[\\]{}"
+)
+_FIELD_VALUE_CHARS = b"\t" + bytes(range(0x20, 0x7F))
+
+# intern table of common field names, in their usual spellings, mapped
+# to their normalized names.
+COMMON_FIELD_NAMES = (
+    "accept", "accept-charset", "accept-encoding", "accept-language",
+    "accept-ranges", "access-control-request-headers",
+    "access-control-request-method", "age", "allow", "authorization",
+    "cache-control", "connection", "content-disposition",
+    "content-encoding", "content-language", "content-length",
+    "content-location", "content-range", "content-type", "cookie", "date",
+    "dnt", "etag", "expect", "expires", "forwarded", "from", "host",
+    "if-match", "if-modified-since", "if-none-match", "if-range",
+    "if-unmodified-since", "keep-alive", "last-modified", "link",
+    "location", "max-forwards", "origin", "pragma", "priority",
+    "proxy-authorization", "range", "referer", "retry-after",
+    "sec-ch-ua", "sec-ch-ua-mobile", "sec-ch-ua-platform",
+    "sec-fetch-dest", "sec-fetch-mode", "sec-fetch-site", "sec-fetch-user",
+    "server", "set-cookie", "te", "trailer", "transfer-encoding",
+    "upgrade", "upgrade-insecure-requests", "user-agent", "vary", "via",
+    "www-authenticate", "x-forwarded-for", "x-forwarded-host",
+    "x-forwarded-proto", "x-real-ip", "x-request-id", "x-requested-with",
+)
+
+_FIELD_NAMES = {}
+for _name in COMMON_FIELD_NAMES:
+    for _spelling in (_name, _name.title(), _name.upper()):
+        _FIELD_NAMES[_spelling.encode("ascii")] = _name
+
+# pre-encoded, title-cased names of the common fields, used to serialize
+# header fields
+_ENCODED_FIELD_NAMES = {
+    name: name.title().encode("ascii") for name in COMMON_FIELD_NAMES
+}
+
+# fields whose values are never splitted at the commas
+UNSPLITTED_FIELD_NAMES = frozenset((
+    "set-cookie", "date", "expires", "last-modified", "if-modified-since",
+    "if-unmodified-since", "retry-after",
+))
+
 
 class HeaderParseError(Exception):
     """Raised when an header line can't be parsed."""
     pass
 
 
+def _parse_field_name(raw_name):
+    """Returns the normalized name of a raw field name, or None if it
+    is not a valid token."""
+    name = _FIELD_NAMES.get(raw_name)
+
+    if name is None:
+        if not raw_name or raw_name.translate(None, _TOKEN_CHARS):
+            return None
+
+        name = raw_name.decode("ascii").lower()
+
+    return name
+
+
+def _split_field_value(name, raw_value, values):
+    """Decode a raw field value and append it to ``values``, splitted
+    at the commas when the field allows it."""
+    value = raw_value.decode("ascii").strip()
+
+    if "," in value and name not in UNSPLITTED_FIELD_NAMES:
+        if not is_rfc1123_datetime(value):
+            values.extend(s.strip() for s in value.split(","))
+            return
+
+    values.append(value)
+
+
+def encode_fields(fields, buffer):
+    """Serialize the (name, value) pairs ``fields`` as CRLF terminated
+    header lines, at the end of the bytearray ``buffer``."""
+    encoded_names = _ENCODED_FIELD_NAMES
+
+    for name, value in fields:
+        encoded_name = encoded_names.get(name)
+
+        if encoded_name is None:
+            encoded_name = name.title().encode("ascii")
+
+        buffer += encoded_name
+        buffer += b": "
+        buffer += value.encode("ascii")
+        buffer += b"\r\n"
+
+
 class Headers(defaultdict):
     """
     Used to store HTTP headers fields.
@@ -84,6 +176,29 @@ class Headers(defaultdict):
             name, values = self.parse_line(line)
             self.add(name, values)
 
+    def parse_block(self, block):
+        """Parse a whole header block, a bytes-like object containing
+        header lines separated by CRLF, and add them to the headers.
+
+        This method does the same as ``parse_lines``, but validates
+        fields with ``bytes.translate`` instead of a regex per line, and
+        looks up common field names in an intern table.
+        """
+        for line in bytes(block).split(b"\r\n"):
+            if not line:
+                continue
+
+            raw_name, separator, raw_value = line.partition(b":")
+            name = _parse_field_name(raw_name)
+
+            if name is None or not separator:
+                raise HeaderParseError(line)
+
+            if raw_value.translate(None, _FIELD_VALUE_CHARS):
+                raise HeaderParseError(line)
+
+            _split_field_value(name, raw_value, self.__getitem__(name))
+
     def set(self, name, value):
         """Set an header field to an unique value."""
         self.__getitem__(name).clear()
@@ -116,3 +231,171 @@ class Headers(defaultdict):
                     yield (name, value)
             else:
                 yield (name, ", ".join(values))
+
+    def encode(self):
+        """Returns the header fields serialized as CRLF terminated
+        header lines, in a bytearray."""
+        buffer = bytearray()
+        encode_fields(self.fields(), buffer)
+        return buffer
+
+
+_BLOCK_CHARS = _FIELD_VALUE_CHARS + b"\r\n"
+
+
+class LazyHeaders(MutableMapping):
+    """
+    Headers backed by a raw header block, with the same mapping API
+    as ``Headers``.
+
+    The block is validated and indexed when the object is created, but
+    only the positions of the values are stored: a field is decoded and
+    splitted the first time it is accessed. Apart from the fields that
+    have been accessed or modified, the memory used is the size of the
+    block plus 12 bytes per header line and a dict entry per field name.
+
+    Usage:
+    >>> headers = LazyHeaders(b"Host: example.com\\r\\nAccept: a, b")
+    >>> headers["accept"]
+    ['a', 'b']
+    """
+
+    __slots__ = ("_block", "_index", "_spans", "_fields")
+
+    def __init__(self, block=b""):
+        block = bytes(block)
+
+        if (block.translate(None, _BLOCK_CHARS)
+                or block.count(b"\r") != block.count(b"\n")
+                or block.count(b"\r\n") != block.count(b"\n")):
+            raise HeaderParseError(block)
+
+        # the index maps each field name to the first of its spans, the
+        # spans are stored as (start, end, next) triplets, next being
+        # the following span of the same field or 0.
+        field_names = _FIELD_NAMES
+        index = {}
+        last = {}
+        spans = array("I", (0, 0, 0))
+        position = 0
+
+        for line in block.split(b"\r\n"):
+            if line:
+                raw_name, separator, _ = line.partition(b":")
+                name = field_names.get(raw_name)
+
+                if name is None:
+                    name = _parse_field_name(raw_name)
+
+                if name is None or not separator:
+                    raise HeaderParseError(line)
+
+                span = len(spans)
+                spans.extend((
+                    position + len(raw_name) + 1, position + len(line), 0
+                ))
+
+                previous = last.get(name)
+                if previous is None:
+                    index[name] = span
+                else:
+                    spans[previous + 2] = span
+                last[name] = span
+
+            position += len(line) + 2
+
+        self._block = block
+        self._index = index
+        self._spans = spans
+        self._fields = {}
+
+    @property
+    def raw(self):
+        """The raw header block."""
+        return self._block
+
+    def __getitem__(self, name):
+        try:
+            return self._fields[name]
+        except KeyError:
+            pass
+
+        # like ``Headers``, a missing field is created empty
+        values = self._fields[name] = []
+        span = self._index.get(name, 0)
+        block = self._block
+        spans = self._spans
+
+        while span:
+            start, end, span = spans[span:span + 3]
+            _split_field_value(name, block[start:end], values)
+
+        return values
+
+    def __setitem__(self, name, values):
+        self._fields[name] = values
+
+    def __delitem__(self, name):
+        found = self._index.pop(name, None) is not None
+        if self._fields.pop(name, None) is None and not found:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self._fields or name in self._index
+
+    def __iter__(self):
+        yield from self._index
+        for name in self._fields:
+            if name not in self._index:
+                yield name
+
+    def __len__(self):
+        return len(self._index) + sum(
+            1 for name in self._fields if name not in self._index
+        )
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, dict(self.items()))
+
+    def get(self, name, default=None):
+        if name in self:
+            return self.__getitem__(name)
+        return default
+
+    def pop(self, name, *default):
+        if name in self:
+            values = self.__getitem__(name)
+            self.__delitem__(name)
+            return values
+        if default:
+            return default[0]
+        raise KeyError(name)
+
+    set = Headers.set
+    add = Headers.add
+    fields = Headers.fields
+    encode = Headers.encode
+
+
+class CompiledHeaders:
+    """
+    Header fields serialized once, in order to be sent as is with many
+    responses.
+
+    Usage:
+    >>> CompiledHeaders({"content-type": "application/json"}).block
+    b'Content-Type: application/json\\r\\n'
+    """
+
+    __slots__ = ("headers", "block")
+
+    def __init__(self, headers):
+        self.headers = Headers()
+
+        for name, value in headers.items():
+            self.headers.add(name, value)
+
+        self.block = bytes(self.headers.encode())
+
+    def __repr__(self):
+        return "CompiledHeaders({!r})".format(self.block)
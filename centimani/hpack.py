@@ -0,0 +1,642 @@
+"""This module implements HPACK, the header compression format of HTTP/2,
+as defined in RFC 7541.
+
+:Encoder:
+    Serializes header lists into header blocks. Fields sent repeatedly
+    on a connection, like "server" or "content-type", are added to the
+    dynamic table, and sent as a single index afterwards.
+
+:Decoder:
+    Parses header blocks into header lists.
+
+Field names and values are ``str``, mapped to bytes with the "latin-1"
+codec, so that any byte received is preserved.
+"""
+
+from bisect import bisect_right
+from collections import deque
+
+
+# maximum size of the dynamic tables, unless changed by the settings
+DEFAULT_TABLE_SIZE = 4096
+
+# size overhead of each dynamic table entry
+ENTRY_OVERHEAD = 32
+
+STATIC_TABLE = (
+    (":authority", ""),
+    (":method", "GET"),
+    (":method", "POST"),
+    (":path", "/"),
+    (":path", "/index.html"),
+    (":scheme", "http"),
+    (":scheme", "https"),
+    (":status", "200"),
+    (":status", "204"),
+    (":status", "206"),
+    (":status", "304"),
+    (":status", "400"),
+    (":status", "404"),
+    (":status", "500"),
+    ("accept-charset", ""),
+    ("accept-encoding", "gzip, deflate"),
+    ("accept-language", ""),
+    ("accept-ranges", ""),
+    ("accept", ""),
+    ("access-control-allow-origin", ""),
+    ("age", ""),
+    ("allow", ""),
+    ("authorization", ""),
+    ("cache-control", ""),
+    ("content-disposition", ""),
+    ("content-encoding", ""),
+    ("content-language", ""),
+    ("content-length", ""),
+    ("content-location", ""),
+    ("content-range", ""),
+    ("content-type", ""),
+    ("cookie", ""),
+    ("date", ""),
+    ("etag", ""),
+    ("expect", ""),
+    ("expires", ""),
+    ("from", ""),
+    ("host", ""),
+    ("if-match", ""),
+    ("if-modified-since", ""),
+    ("if-none-match", ""),
+    ("if-range", ""),
+    ("if-unmodified-since", ""),
+    ("last-modified", ""),
+    ("link", ""),
+    ("location", ""),
+    ("max-forwards", ""),
+    ("proxy-authenticate", ""),
+    ("proxy-authorization", ""),
+    ("range", ""),
+    ("referer", ""),
+    ("refresh", ""),
+    ("retry-after", ""),
+    ("server", ""),
+    ("set-cookie", ""),
+    ("strict-transport-security", ""),
+    ("transfer-encoding", ""),
+    ("user-agent", ""),
+    ("vary", ""),
+    ("via", ""),
+    ("www-authenticate", ""),
+)
+
+# indexes of the static table fields, and of their names
+_STATIC_FIELDS = {}
+_STATIC_NAMES = {}
+
+for _index, _field in enumerate(STATIC_TABLE, 1):
+    _STATIC_FIELDS.setdefault(_field, _index)
+    _STATIC_NAMES.setdefault(_field[0], _index)
+
+# fields whose values are rarely repeated, never added to the dynamic
+# table by the encoder
+UNINDEXED_FIELD_NAMES = frozenset((
+    ":path", "content-length", "content-range", "etag", "if-modified-since",
+    "if-none-match", "last-modified", "location", "set-cookie",
+))
+
+# fields sent with the never indexed representation, so that
+# intermediaries do not compress them either
+SENSITIVE_FIELD_NAMES = frozenset((
+    "authorization", "proxy-authorization",
+))
+
+
+class HpackError(Exception):
+    """Raised when a header block can't be decoded."""
+    pass
+
+
+#=========#
+# Huffman #
+#=========#
+
+# code lengths of the canonical Huffman code of RFC 7541, Appendix B,
+# for each byte value, and for EOS
+HUFFMAN_CODE_LENGTHS = (
+    13, 23, 28, 28, 28, 28, 28, 28, 28, 24, 30, 28, 28, 30, 28, 28,
+    28, 28, 28, 28, 28, 28, 30, 28, 28, 28, 28, 28, 28, 28, 28, 28,
+    6, 10, 10, 12, 13, 6, 8, 11, 10, 10, 8, 11, 8, 6, 6, 6,
+    5, 5, 5, 6, 6, 6, 6, 6, 6, 6, 7, 8, 15, 6, 12, 10,
+    13, 6, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7,
+    7, 7, 7, 7, 7, 7, 7, 7, 8, 7, 8, 13, 19, 13, 14, 6,
+    15, 5, 6, 5, 6, 5, 6, 6, 6, 5, 7, 7, 6, 6, 6, 5,
+    6, 7, 6, 5, 5, 6, 7, 7, 7, 7, 7, 15, 11, 14, 13, 28,
+    20, 22, 20, 20, 22, 22, 22, 23, 22, 23, 23, 23, 23, 23, 24, 23,
+    24, 24, 22, 23, 24, 23, 23, 23, 23, 21, 22, 23, 22, 23, 23, 24,
+    22, 21, 20, 22, 22, 23, 23, 21, 23, 22, 22, 24, 21, 22, 23, 23,
+    21, 21, 22, 21, 23, 22, 23, 23, 20, 22, 22, 22, 23, 22, 22, 23,
+    26, 26, 20, 19, 22, 23, 22, 25, 26, 26, 26, 27, 27, 26, 24, 25,
+    19, 21, 26, 27, 27, 26, 27, 24, 21, 21, 26, 26, 28, 27, 27, 27,
+    20, 24, 20, 21, 22, 21, 21, 23, 22, 22, 25, 25, 24, 24, 26, 23,
+    26, 27, 26, 26, 27, 27, 27, 27, 27, 28, 27, 27, 27, 27, 27, 26,
+    30,
+)
+
+EOS = 256
+
+_MAX_CODE_LENGTH = 30
+_WINDOW_MASK = (1 << _MAX_CODE_LENGTH) - 1
+
+
+def _build_huffman_code():
+    """Returns the codes of each symbol, and the tables used to decode
+    them.
+
+    The code is canonical: codes of the same length are consecutive
+    integers, in the order of the symbols, so the length of a code is
+    found by comparing a window of the encoded bits with the upper limit
+    of each length.
+    """
+    codes = [0] * len(HUFFMAN_CODE_LENGTHS)
+    symbols = sorted(
+        range(len(HUFFMAN_CODE_LENGTHS)),
+        key=lambda symbol: (HUFFMAN_CODE_LENGTHS[symbol], symbol)
+    )
+
+    # for each code length: upper limit of the codes, left aligned in a
+    # window of the maximum length, first code and its symbol position
+    limits = []
+    lengths = []
+    first_codes = []
+    offsets = []
+
+    code = 0
+    length = 0
+
+    for position, symbol in enumerate(symbols):
+        symbol_length = HUFFMAN_CODE_LENGTHS[symbol]
+
+        if symbol_length != length:
+            if lengths:
+                limits.append(code << (_MAX_CODE_LENGTH - length))
+
+            code <<= symbol_length - length
+            length = symbol_length
+
+            lengths.append(length)
+            first_codes.append(code)
+            offsets.append(position)
+
+        codes[symbol] = code
+        code += 1
+
+    limits.append(code << (_MAX_CODE_LENGTH - length))
+
+    decoding_table = tuple(
+        (limit, length, first_code, offset)
+        for limit, length, first_code, offset
+        in zip(limits, lengths, first_codes, offsets)
+    )
+
+    return tuple(codes), decoding_table, tuple(limits), tuple(symbols)
+
+
+HUFFMAN_CODES, _DECODING_TABLE, _LIMITS, _SYMBOLS = _build_huffman_code()
+
+
+def huffman_length(data):
+    """Returns the size of ``data`` once Huffman encoded."""
+    bits = sum(map(HUFFMAN_CODE_LENGTHS.__getitem__, data))
+    return (bits + 7) >> 3
+
+
+def huffman_encode(data):
+    """Returns the Huffman encoding of the bytes ``data``."""
+    codes = HUFFMAN_CODES
+    lengths = HUFFMAN_CODE_LENGTHS
+    encoded = bytearray()
+    accumulator = 0
+    bits = 0
+
+    for byte in data:
+        accumulator = (accumulator << lengths[byte]) | codes[byte]
+        bits += lengths[byte]
+
+        while bits >= 8:
+            bits -= 8
+            encoded.append(accumulator >> bits)
+            accumulator &= (1 << bits) - 1
+
+    if bits:
+        # padded with the most significant bits of EOS
+        encoded.append((accumulator << (8 - bits)) | (0xff >> bits))
+
+    return bytes(encoded)
+
+
+def huffman_decode(data):
+    """Returns the bytes encoded in ``data``. Raises an ``HpackError``
+    if the encoding is invalid."""
+    table = _DECODING_TABLE
+    limits = _LIMITS
+    symbols = _SYMBOLS
+
+    # a window of 30 bits may start at any bit of the last byte
+    padded = bytes(data) + b"\xff\xff\xff\xff\xff"
+    size = len(data) * 8
+    decoded = bytearray()
+    position = 0
+
+    while position < size:
+        index = position >> 3
+        window = int.from_bytes(padded[index:index + 5], "big")
+        window = (window >> (10 - (position & 7))) & _WINDOW_MASK
+
+        if window == _WINDOW_MASK:
+            # the remaining bits are the padding
+            if size - position > 7:
+                raise HpackError("invalid Huffman padding")
+            break
+
+        limit, length, first_code, offset = table[bisect_right(limits, window)]
+        symbol = symbols[
+            offset + (window >> (_MAX_CODE_LENGTH - length)) - first_code
+        ]
+
+        position += length
+
+        if position > size:
+            # the padding must be made of the most significant bits of EOS
+            raise HpackError("invalid Huffman padding")
+
+        if symbol == EOS:
+            raise HpackError("EOS in Huffman encoded string")
+
+        decoded.append(symbol)
+
+    return bytes(decoded)
+
+
+#========================#
+# Integers and literals #
+#========================#
+
+def encode_integer(value, prefix_bits, flags, buffer):
+    """Append ``value`` encoded with an N-bit prefix to ``buffer``, the
+    first byte is combined with ``flags``."""
+    limit = (1 << prefix_bits) - 1
+
+    if value < limit:
+        buffer.append(flags | value)
+        return
+
+    buffer.append(flags | limit)
+    value -= limit
+
+    while value >= 0x80:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+
+    buffer.append(value)
+
+
+def decode_integer(data, position, prefix_bits):
+    """Returns the integer encoded with an N-bit prefix at ``position``
+    in ``data``, and the position following it."""
+    limit = (1 << prefix_bits) - 1
+
+    try:
+        value = data[position] & limit
+        position += 1
+
+        if value < limit:
+            return value, position
+
+        shift = 0
+
+        while True:
+            byte = data[position]
+            position += 1
+            value += (byte & 0x7f) << shift
+            shift += 7
+
+            if not byte & 0x80:
+                return value, position
+
+            if shift > 28:
+                raise HpackError("integer overflow")
+
+    except IndexError:
+        raise HpackError("truncated integer") from None
+
+
+def encode_string(string, buffer):
+    """Append the string literal of ``string`` to ``buffer``, Huffman
+    encoded if it is shorter."""
+    data = string.encode("latin-1")
+    size = huffman_length(data)
+
+    if size < len(data):
+        encode_integer(size, 7, 0x80, buffer)
+        buffer += huffman_encode(data)
+    else:
+        encode_integer(len(data), 7, 0x00, buffer)
+        buffer += data
+
+
+def decode_string(data, position):
+    """Returns the string literal at ``position`` in ``data``, and the
+    position following it."""
+    if position >= len(data):
+        raise HpackError("truncated string")
+
+    huffman = data[position] & 0x80
+    size, position = decode_integer(data, position, 7)
+    end = position + size
+
+    if end > len(data):
+        raise HpackError("truncated string")
+
+    string = data[position:end]
+
+    if huffman:
+        string = huffman_decode(string)
+
+    return bytes(string).decode("latin-1"), end
+
+
+#================#
+# Dynamic tables #
+#================#
+
+class DynamicTable:
+    """The dynamic table of an encoding or decoding context.
+
+    Entries are counted from the first inserted one, so that the index
+    of an entry is derived from its insertion number.
+    """
+
+    __slots__ = ("_entries", "_size", "_max_size", "_inserted")
+
+    def __init__(self, max_size=DEFAULT_TABLE_SIZE):
+        self._entries = deque()
+        self._size = 0
+        self._max_size = max_size
+        self._inserted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def inserted(self):
+        """The number of entries inserted so far."""
+        return self._inserted
+
+    def resize(self, max_size):
+        """Set the maximum size of the table, evicts entries if needed.
+        Returns the evicted entries."""
+        self._max_size = max_size
+        return self._evict(0)
+
+    def add(self, name, value):
+        """Insert an entry, returns the evicted entries."""
+        entry_size = len(name) + len(value) + ENTRY_OVERHEAD
+
+        if entry_size > self._max_size:
+            # the table is emptied, and the entry is not inserted
+            self._inserted += 1
+            return self._evict(self._max_size + 1)
+
+        evicted = self._evict(entry_size)
+
+        self._entries.appendleft((name, value))
+        self._size += entry_size
+        self._inserted += 1
+
+        return evicted
+
+    def get(self, index):
+        """Returns the entry of the dynamic table ``index``, starting at
+        0 for the most recent entry."""
+        return self._entries[index]
+
+    def _evict(self, entry_size):
+        evicted = []
+        entries = self._entries
+
+        while entries and self._size + entry_size > self._max_size:
+            name, value = entry = entries.pop()
+            self._size -= len(name) + len(value) + ENTRY_OVERHEAD
+            evicted.append(entry)
+
+        return evicted
+
+
+#==========#
+# Encoding #
+#==========#
+
+class Encoder:
+    """Encodes header lists into header blocks, with the dynamic table
+    of the connection direction.
+
+    The ``max_size`` of the table may be lowered by the peer settings,
+    the change is signaled at the beginning of the next header block.
+    """
+
+    def __init__(self, max_size=DEFAULT_TABLE_SIZE):
+        self._table = DynamicTable(max_size)
+        self._pending_sizes = []
+
+        # insertion numbers of the dynamic table entries, by field and
+        # by name
+        self._fields = {}
+        self._names = {}
+
+    @property
+    def max_size(self):
+        return self._table.max_size
+
+    @max_size.setter
+    def max_size(self, max_size):
+        if max_size != self._table.max_size:
+            self._pending_sizes.append(max_size)
+            self._forget(self._table.resize(max_size))
+
+    def _forget(self, evicted):
+        """Remove the evicted entries from the indexes."""
+        # insertion number of the oldest entry still in the table
+        first = self._table.inserted - len(self._table) + 1
+
+        for field in evicted:
+            if self._fields.get(field, first) < first:
+                del self._fields[field]
+            if self._names.get(field[0], first) < first:
+                del self._names[field[0]]
+
+    def _index(self, number):
+        """Returns the index of the dynamic table entry inserted at
+        ``number``."""
+        return len(STATIC_TABLE) + self._table.inserted - number + 1
+
+    def encode(self, fields):
+        """Returns the header block of the (name, value) pairs
+        ``fields``."""
+        buffer = bytearray()
+
+        if self._pending_sizes:
+            # signal the smallest size, then the final one
+            sizes = (min(self._pending_sizes), self._table.max_size)
+            self._pending_sizes.clear()
+
+            for size in sorted(set(sizes)):
+                encode_integer(size, 5, 0x20, buffer)
+
+        for name, value in fields:
+            self._encode_field(name, value, buffer)
+
+        return bytes(buffer)
+
+    def _encode_field(self, name, value, buffer):
+        field = (name, value)
+
+        index = _STATIC_FIELDS.get(field)
+        if index is not None:
+            encode_integer(index, 7, 0x80, buffer)
+            return
+
+        number = self._fields.get(field)
+        if number is not None:
+            encode_integer(self._index(number), 7, 0x80, buffer)
+            return
+
+        name_index = _STATIC_NAMES.get(name)
+        if name_index is None:
+            number = self._names.get(name)
+            if number is not None:
+                name_index = self._index(number)
+
+        if name in SENSITIVE_FIELD_NAMES:
+            # literal never indexed
+            prefix_bits, flags = 4, 0x10
+        elif name in UNINDEXED_FIELD_NAMES or (
+                len(name) + len(value) + ENTRY_OVERHEAD
+                > self._table.max_size // 2):
+            # literal without indexing
+            prefix_bits, flags = 4, 0x00
+        else:
+            # literal with incremental indexing
+            prefix_bits, flags = 6, 0x40
+
+        if name_index is None:
+            buffer.append(flags)
+            encode_string(name, buffer)
+        else:
+            encode_integer(name_index, prefix_bits, flags, buffer)
+
+        encode_string(value, buffer)
+
+        if flags == 0x40:
+            evicted = self._table.add(name, value)
+            number = self._table.inserted
+            self._fields[field] = number
+            self._names[name] = number
+            self._forget(evicted)
+
+
+#==========#
+# Decoding #
+#==========#
+
+class Decoder:
+    """Decodes header blocks into header lists, with the dynamic table
+    of the connection direction.
+
+    ``max_size`` is the table size allowed by the local settings, the
+    peer may use a smaller table.
+    """
+
+    def __init__(self, max_size=DEFAULT_TABLE_SIZE):
+        self._table = DynamicTable(max_size)
+        self._max_size = max_size
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size):
+        self._max_size = max_size
+
+    def _field(self, index):
+        if index == 0:
+            raise HpackError("invalid index 0")
+
+        if index <= len(STATIC_TABLE):
+            return STATIC_TABLE[index - 1]
+
+        try:
+            return self._table.get(index - len(STATIC_TABLE) - 1)
+        except IndexError:
+            raise HpackError("invalid index {}".format(index)) from None
+
+    def decode(self, data):
+        """Returns the list of (name, value) pairs of the header block
+        ``data``. Raises an ``HpackError`` if the block is invalid."""
+        data = memoryview(data).cast("B")
+        fields = []
+        position = 0
+        size = len(data)
+        in_fields = False
+
+        while position < size:
+            byte = data[position]
+
+            if byte & 0x80:
+                # indexed header field
+                index, position = decode_integer(data, position, 7)
+                fields.append(self._field(index))
+                in_fields = True
+                continue
+
+            if byte & 0xe0 == 0x20:
+                # dynamic table size update, only before the fields
+                if in_fields:
+                    raise HpackError("table size update after a field")
+
+                max_size, position = decode_integer(data, position, 5)
+
+                if max_size > self._max_size:
+                    raise HpackError("table size update above the limit")
+
+                self._table.resize(max_size)
+                continue
+
+            if byte & 0x40:
+                # literal with incremental indexing
+                prefix_bits = 6
+            else:
+                # literal without indexing, or never indexed
+                prefix_bits = 4
+
+            index, position = decode_integer(data, position, prefix_bits)
+
+            if index:
+                name = self._field(index)[0]
+            else:
+                name, position = decode_string(data, position)
+
+            value, position = decode_string(data, position)
+            fields.append((name, value))
+            in_fields = True
+
+            if prefix_bits == 6:
+                self._table.add(name, value)
+
+        return fields
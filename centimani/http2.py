@@ -0,0 +1,1107 @@
+"""This module implements the framing layer of HTTP/2, as defined in
+RFC 7540, shared by the server and client connections.
+
+:Http2Session:
+    A mixin for connections speaking HTTP/2. It reads the frames of the
+    connection, applies the settings of the peer, maintains the flow
+    control windows and the HPACK contexts, and sends the frames of the
+    streams. Connections implement hooks called when a stream is opened
+    by the peer, receives a header block, or is reset.
+
+:Http2Stream:
+    The state of a stream: its flow control windows, and the body
+    reader fed by the DATA frames received.
+
+:DataReader:
+    The body reader of a stream, with the same interface as the body
+    readers of ``centimani.streamutils``. Data read is acknowledged to
+    the peer with WINDOW_UPDATE frames.
+"""
+
+import asyncio
+import collections
+import struct
+
+from centimani.hpack import Decoder, Encoder, HpackError
+from centimani.hpack import DEFAULT_TABLE_SIZE
+
+
+PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+FRAME_HEADER_SIZE = 9
+
+_FRAME_HEADER = struct.Struct(">HBBBL")
+_SETTING = struct.Struct(">HL")
+_UINT32 = struct.Struct(">L")
+_GOAWAY = struct.Struct(">LL")
+
+# frame types
+DATA = 0x0
+HEADERS = 0x1
+PRIORITY = 0x2
+RST_STREAM = 0x3
+SETTINGS = 0x4
+PUSH_PROMISE = 0x5
+PING = 0x6
+GOAWAY = 0x7
+WINDOW_UPDATE = 0x8
+CONTINUATION = 0x9
+
+# frame flags
+END_STREAM = 0x1
+ACK = 0x1
+END_HEADERS = 0x4
+PADDED = 0x8
+PRIORITY_FLAG = 0x20
+
+# settings
+SETTINGS_HEADER_TABLE_SIZE = 0x1
+SETTINGS_ENABLE_PUSH = 0x2
+SETTINGS_MAX_CONCURRENT_STREAMS = 0x3
+SETTINGS_INITIAL_WINDOW_SIZE = 0x4
+SETTINGS_MAX_FRAME_SIZE = 0x5
+SETTINGS_MAX_HEADER_LIST_SIZE = 0x6
+
+# error codes
+NO_ERROR = 0x0
+PROTOCOL_ERROR = 0x1
+INTERNAL_ERROR = 0x2
+FLOW_CONTROL_ERROR = 0x3
+SETTINGS_TIMEOUT = 0x4
+STREAM_CLOSED = 0x5
+FRAME_SIZE_ERROR = 0x6
+REFUSED_STREAM = 0x7
+CANCEL = 0x8
+COMPRESSION_ERROR = 0x9
+CONNECT_ERROR = 0xa
+ENHANCE_YOUR_CALM = 0xb
+INADEQUATE_SECURITY = 0xc
+HTTP_1_1_REQUIRED = 0xd
+
+DEFAULT_WINDOW_SIZE = 65535
+MAX_WINDOW_SIZE = (1 << 31) - 1
+
+DEFAULT_MAX_FRAME_SIZE = 1 << 14
+MAX_FRAME_SIZE = (1 << 24) - 1
+
+# receive window of the whole connection, shared by the streams
+DEFAULT_CONNECTION_WINDOW_SIZE = 1 << 20
+
+# maximum size of a header block, including its CONTINUATION frames
+DEFAULT_MAX_HEADER_BLOCK_SIZE = 1 << 16
+
+# corked frames sent before waiting for the writer to be drained, above
+# this size
+DEFAULT_FLUSH_SIZE = 1 << 16
+
+# the initial settings of a connection, as defined by the protocol,
+# None means unlimited
+INITIAL_SETTINGS = {
+    SETTINGS_HEADER_TABLE_SIZE: DEFAULT_TABLE_SIZE,
+    SETTINGS_ENABLE_PUSH: 1,
+    SETTINGS_MAX_CONCURRENT_STREAMS: None,
+    SETTINGS_INITIAL_WINDOW_SIZE: DEFAULT_WINDOW_SIZE,
+    SETTINGS_MAX_FRAME_SIZE: DEFAULT_MAX_FRAME_SIZE,
+    SETTINGS_MAX_HEADER_LIST_SIZE: None,
+}
+
+# header fields specific to HTTP/1 connections, forbidden in HTTP/2
+CONNECTION_FIELD_NAMES = frozenset((
+    "connection", "keep-alive", "proxy-connection", "transfer-encoding",
+    "upgrade",
+))
+
+
+class Http2Error(Exception):
+    """A protocol error, of the connection if ``stream_id`` is 0, else
+    of the stream ``stream_id``."""
+
+    def __init__(self, code, message=None, stream_id=0):
+        super().__init__(message or "HTTP/2 error {:#x}".format(code))
+        self.code = code
+        self.stream_id = stream_id
+
+
+class StreamResetError(ConnectionResetError):
+    """Raised when using a stream reset by a peer, or by the
+    connection."""
+
+    def __init__(self, code=CANCEL, message="stream reset"):
+        super().__init__(message)
+        self.code = code
+
+
+#=========#
+# Framing #
+#=========#
+
+def frame_header(length, frame_type, flags, stream_id):
+    """Returns the 9 bytes header of a frame."""
+    return _FRAME_HEADER.pack(
+        length >> 8, length & 0xff, frame_type, flags, stream_id
+    )
+
+
+def encode_frame(frame_type, flags, stream_id, payload=b""):
+    """Returns a whole frame."""
+    return frame_header(len(payload), frame_type, flags, stream_id) + payload
+
+
+def encode_settings(settings):
+    """Returns the payload of a SETTINGS frame, for a mapping of
+    settings identifiers to values."""
+    return b"".join(
+        _SETTING.pack(identifier, value)
+        for identifier, value in settings.items()
+        if value is not None
+    )
+
+
+def decode_settings(payload):
+    """Returns the (identifier, value) pairs of a SETTINGS frame
+    payload."""
+    if len(payload) % 6:
+        raise Http2Error(FRAME_SIZE_ERROR, "invalid SETTINGS frame size")
+
+    return [
+        _SETTING.unpack_from(payload, offset)
+        for offset in range(0, len(payload), 6)
+    ]
+
+
+def strip_padding(flags, payload):
+    """Returns the payload of a DATA or HEADERS frame without its
+    padding, as a ``memoryview``."""
+    payload = memoryview(payload)
+
+    if not flags & PADDED:
+        return payload
+
+    if not payload or payload[0] >= len(payload):
+        raise Http2Error(PROTOCOL_ERROR, "invalid padding")
+
+    return payload[1:len(payload) - payload[0]]
+
+
+#==============#
+# Flow control #
+#==============#
+
+class FlowControlWindow:
+    """A send window, consumed by the DATA frames sent, and increased by
+    the WINDOW_UPDATE frames received."""
+
+    __slots__ = ("size", "_waiters", "_exception", "_loop")
+
+    def __init__(self, size, loop):
+        self.size = size
+        self._waiters = collections.deque()
+        self._exception = None
+        self._loop = loop
+
+    def consume(self, size):
+        self.size -= size
+
+    def increase(self, increment):
+        """Increase the window, wakes the writers waiting for it."""
+        self.size += increment
+
+        if self.size > MAX_WINDOW_SIZE:
+            raise Http2Error(FLOW_CONTROL_ERROR, "window overflow")
+
+        while self._waiters and self.size > 0:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait(self):
+        """Wait until the window is open."""
+        while self.size <= 0:
+            if self._exception is not None:
+                raise self._exception
+
+            waiter = self._loop.create_future()
+            self._waiters.append(waiter)
+            await waiter
+
+    def close(self, exception):
+        """Wakes the writers waiting for the window with ``exception``."""
+        self._exception = exception
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(exception)
+                # the writer may have been cancelled
+                waiter.exception()
+
+
+#========#
+# Stream #
+#========#
+
+class DataReader:
+    """The body reader of a stream, fed with the DATA frames received.
+
+    It has the interface of ``centimani.streamutils.BufferedBodyReader``.
+    Waiting for data is limited by ``timeout``, using ``timers``.
+
+    Attributes:
+    :headers: The trailer fields, once the body is complete.
+    """
+
+    def __init__(self, stream, timers=None, timeout=None):
+        self._stream = stream
+        self._buffers = collections.deque()
+        self._eof = False
+        self._exception = None
+        self._waiter = None
+        self._bytes_read = 0
+        self._timeout = timeout
+        self._timer = None
+        self.headers = None
+
+        if timers is not None and timeout is not None:
+            self._timer = timers.timer(self._timed_out)
+
+    @property
+    def is_complete(self):
+        return self._eof and not self._buffers
+
+    @property
+    def bytes_read(self):
+        return self._bytes_read
+
+    def feed(self, data):
+        self._buffers.append(data)
+        self._wakeup()
+
+    def feed_eof(self, headers=None):
+        self._eof = True
+        self.headers = headers
+        self._wakeup()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._wakeup()
+
+    def _wakeup(self):
+        waiter = self._waiter
+
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _timed_out(self):
+        waiter = self._waiter
+
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(asyncio.TimeoutError())
+
+    async def _wait(self):
+        """Wait until data is available or EOF is reached."""
+        while not self._buffers and not self._eof:
+            if self._exception is not None:
+                raise self._exception
+
+            self._waiter = self._stream.session._loop.create_future()
+
+            if self._timer is not None:
+                self._timer.start(self._timeout)
+
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+                if self._timer is not None:
+                    self._timer.cancel()
+
+        if self._exception is not None and not self._buffers:
+            raise self._exception
+
+    def _consumed(self, size):
+        self._bytes_read += size
+        self._stream.session._data_consumed(self._stream, size)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """Returns the next received block."""
+        await self._wait()
+
+        if not self._buffers:
+            raise StopAsyncIteration
+
+        block = bytes(self._buffers.popleft())
+        self._consumed(len(block))
+
+        return block
+
+    async def readinto(self, buffer):
+        """Read the next bytes of the body into ``buffer``.
+
+        Returns the number of bytes read, 0 when the body is complete.
+        """
+        target = memoryview(buffer).cast("B")
+
+        if not target:
+            return 0
+
+        await self._wait()
+
+        filled = 0
+        buffers = self._buffers
+
+        while buffers and filled < len(target):
+            data = buffers[0]
+            size = min(len(data), len(target) - filled)
+            target[filled:filled + size] = data[:size]
+            filled += size
+
+            if size < len(data):
+                buffers[0] = data[size:]
+            else:
+                buffers.popleft()
+
+        if filled:
+            self._consumed(filled)
+
+        return filled
+
+    async def discard(self, budget=None):
+        """Discard the received data. The rest of the body is not waited
+        for, the stream is reset by the connection instead.
+
+        Returns True if the body is complete.
+        """
+        size = sum(len(data) for data in self._buffers)
+        self._buffers.clear()
+
+        if size:
+            self._consumed(size)
+
+        return self._eof
+
+
+class Http2Stream:
+    """The state of a stream of an ``Http2Session``.
+
+    Attributes:
+    :id: The stream identifier.
+    :session: The session of the stream.
+    :send_window: The ``FlowControlWindow`` of the DATA sent.
+    :body_reader: The ``DataReader`` of the DATA received.
+    :local_closed: True once END_STREAM is sent.
+    :remote_closed: True once END_STREAM is received.
+    :closed: True once the stream is closed, or reset.
+    :handler: The object handling the stream, set by the connection.
+    """
+
+    __slots__ = (
+        "id", "session", "send_window", "recv_window", "unacknowledged",
+        "body_reader", "local_closed", "remote_closed", "closed", "handler",
+    )
+
+    def __init__(self, session, stream_id, timeout=None):
+        self.id = stream_id
+        self.session = session
+        self.send_window = FlowControlWindow(
+            session._remote_settings[SETTINGS_INITIAL_WINDOW_SIZE],
+            session._loop
+        )
+        self.recv_window = session._local_settings[
+            SETTINGS_INITIAL_WINDOW_SIZE
+        ]
+        self.unacknowledged = 0
+        self.body_reader = DataReader(self, session._timers, timeout)
+        self.local_closed = False
+        self.remote_closed = False
+        self.closed = False
+        self.handler = None
+
+    def __repr__(self):
+        return "<Http2Stream {}>".format(self.id)
+
+
+#=========#
+# Session #
+#=========#
+
+class Http2Session:
+    """A mixin implementing the framing layer of an HTTP/2 connection.
+
+    The connection provides the ``_reader``, ``_writer``, ``_loop`` and
+    ``_logger`` attributes, calls ``_init_session`` when created, and
+    ``_run_session`` once the connection preface is received. It
+    implements the hooks:
+
+    :_stream_opened: Called with the identifier of a stream opened by
+        the peer, its header fields and the END_STREAM flag.
+    :_headers_received: Called when a header block is received on an
+        open stream.
+    :_stream_reset: Called when a stream is reset by the peer, or by the
+        connection.
+    :_stream_closed: Called when a stream is closed.
+    """
+
+    def _init_session(self, *, client, timers, settings=None):
+        self._is_client = client
+        self._timers = timers
+
+        self._local_settings = dict(INITIAL_SETTINGS)
+        self._local_settings.update(settings or {})
+        self._remote_settings = dict(INITIAL_SETTINGS)
+
+        self._encoder = Encoder()
+        self._decoder = Decoder(
+            self._local_settings[SETTINGS_HEADER_TABLE_SIZE]
+        )
+
+        self._streams = {}
+        self._send_window = FlowControlWindow(DEFAULT_WINDOW_SIZE, self._loop)
+        self._recv_window = DEFAULT_WINDOW_SIZE
+        self._unacknowledged = 0
+
+        # highest stream identifier opened by the peer, and next one
+        # opened locally
+        self._last_stream_id = 0
+        self._next_stream_id = 1 if client else 2
+
+        self._continuation = None
+        self._settings_received = False
+        self._going_away = False
+        self._drain_lock = asyncio.Lock()
+
+        # frames written in a loop iteration are sent at once
+        self._flush_scheduled = False
+        self._corked_size = 0
+
+        self._frame_handlers = {
+            DATA: self._data_received,
+            HEADERS: self._headers_frame_received,
+            PRIORITY: self._priority_received,
+            RST_STREAM: self._rst_stream_received,
+            SETTINGS: self._settings_frame_received,
+            PUSH_PROMISE: self._push_promise_received,
+            PING: self._ping_received,
+            GOAWAY: self._goaway_received,
+            WINDOW_UPDATE: self._window_update_received,
+            CONTINUATION: self._continuation_received,
+        }
+
+    @property
+    def going_away(self):
+        """True once a GOAWAY frame is sent or received."""
+        return self._going_away
+
+    #-------#
+    # Hooks #
+    #-------#
+
+    def _stream_opened(self, stream_id, fields, end_stream):
+        raise Http2Error(PROTOCOL_ERROR, "stream opened by the peer")
+
+    def _headers_received(self, stream, fields, end_stream):
+        raise NotImplementedError
+
+    def _stream_reset(self, stream, exception):
+        pass
+
+    def _stream_closed(self, stream):
+        pass
+
+    #---------#
+    # Sending #
+    #---------#
+
+    def _write(self, buffers):
+        """Write the frames in ``buffers``. The writer is corked until
+        the end of the loop iteration, so that the frames of all the
+        streams are sent with a single transport call."""
+        if self._writer.is_closing():
+            raise ConnectionResetError("connection closed")
+
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._writer.cork()
+            self._loop.call_soon(self._flush)
+
+        self._writer.writelines(buffers)
+        self._corked_size += sum(len(buffer) for buffer in buffers)
+
+    def _flush(self):
+        """Send the frames written since the writer was corked."""
+        if self._flush_scheduled:
+            self._flush_scheduled = False
+            self._corked_size = 0
+            self._writer.uncork()
+
+    async def _drain(self):
+        """Wait until the writer is drained, streams may wait at
+        once."""
+        if self._corked_size >= DEFAULT_FLUSH_SIZE:
+            self._flush()
+
+        async with self._drain_lock:
+            if not self._writer.is_closing():
+                await self._writer.drain()
+
+    def _send_preface(self):
+        """Send the connection preface: the preface string for a client,
+        followed by the local settings, and the connection window
+        increase."""
+        buffers = []
+
+        if self._is_client:
+            buffers.append(PREFACE)
+
+        settings = {
+            identifier: value
+            for identifier, value in self._local_settings.items()
+            if value != INITIAL_SETTINGS[identifier]
+        }
+        buffers.append(encode_frame(SETTINGS, 0, 0, encode_settings(settings)))
+
+        increment = DEFAULT_CONNECTION_WINDOW_SIZE - DEFAULT_WINDOW_SIZE
+        buffers.append(encode_frame(
+            WINDOW_UPDATE, 0, 0, _UINT32.pack(increment)
+        ))
+        self._recv_window += increment
+
+        self._write(buffers)
+
+    def _open_stream(self, timeout=None):
+        """Open a new stream, initiated locally, and returns it."""
+        stream_id = self._next_stream_id
+        self._next_stream_id += 2
+
+        stream = Http2Stream(self, stream_id, timeout)
+        self._streams[stream_id] = stream
+
+        return stream
+
+    def _send_headers(self, stream, fields, end_stream=False):
+        """Send a header block on ``stream``, split in HEADERS and
+        CONTINUATION frames."""
+        if stream.closed:
+            raise StreamResetError()
+
+        block = memoryview(self._encoder.encode(fields))
+        max_size = self._remote_settings[SETTINGS_MAX_FRAME_SIZE]
+        frame_type = HEADERS
+        flags = END_STREAM if end_stream else 0
+        buffers = []
+
+        while True:
+            fragment = block[:max_size]
+            block = block[max_size:]
+
+            if not block:
+                flags |= END_HEADERS
+
+            buffers.append(
+                frame_header(len(fragment), frame_type, flags, stream.id)
+            )
+            buffers.append(fragment)
+
+            if not block:
+                break
+
+            frame_type = CONTINUATION
+            flags = 0
+
+        # header blocks are never interleaved with other frames
+        self._write(buffers)
+
+        if end_stream:
+            self._local_stream_end(stream)
+
+    async def _send_data(self, stream, data, end_stream=False):
+        """Send ``data`` on ``stream``, in DATA frames within the flow
+        control windows, then wait until the writer is drained."""
+        view = memoryview(data).cast("B")
+
+        if not view and not end_stream:
+            return
+
+        while True:
+            if stream.closed:
+                raise StreamResetError()
+
+            size = len(view)
+
+            if size:
+                await stream.send_window.wait()
+                await self._send_window.wait()
+
+                if stream.closed:
+                    raise StreamResetError()
+
+                size = min(
+                    size,
+                    stream.send_window.size,
+                    self._send_window.size,
+                    self._remote_settings[SETTINGS_MAX_FRAME_SIZE]
+                )
+
+            chunk = view[:size]
+            view = view[size:]
+            last = end_stream and not view
+
+            stream.send_window.consume(size)
+            self._send_window.consume(size)
+
+            self._write((
+                frame_header(size, DATA, END_STREAM if last else 0, stream.id),
+                chunk,
+            ))
+
+            if last:
+                self._local_stream_end(stream)
+
+            if not view:
+                break
+
+        await self._drain()
+
+    def _reset_stream(self, stream, code=CANCEL, exception=None):
+        """Reset ``stream``, and send a RST_STREAM frame. The waiting
+        readers and writers are given ``exception``, a
+        ``StreamResetError`` by default."""
+        if stream.closed:
+            return
+
+        if not self._writer.is_closing():
+            self._write((encode_frame(
+                RST_STREAM, 0, stream.id, _UINT32.pack(code)
+            ),))
+
+        self._close_stream(stream, exception or StreamResetError(code))
+
+    def _send_goaway(self, code=NO_ERROR, message=b""):
+        """Send a GOAWAY frame, no new stream is accepted afterwards."""
+        self._going_away = True
+
+        if not self._writer.is_closing():
+            payload = _GOAWAY.pack(self._last_stream_id, code) + message
+            self._write((encode_frame(GOAWAY, 0, 0, payload),))
+
+    def _local_stream_end(self, stream):
+        stream.local_closed = True
+
+        if stream.remote_closed:
+            self._close_stream(stream)
+
+    def _close_stream(self, stream, exception=None):
+        """Close ``stream``, the waiting readers and writers are given
+        ``exception``, if the stream is not over."""
+        if stream.closed:
+            return
+
+        stream.closed = True
+        self._streams.pop(stream.id, None)
+
+        if exception is not None:
+            stream.send_window.close(exception)
+
+            if not stream.remote_closed:
+                stream.body_reader.set_exception(exception)
+
+            # data received and not read is acknowledged for the
+            # connection
+            buffers = stream.body_reader._buffers
+            self._acknowledge(None, sum(len(data) for data in buffers))
+            buffers.clear()
+
+            self._stream_reset(stream, exception)
+
+        self._stream_closed(stream)
+
+    #-----------#
+    # Receiving #
+    #-----------#
+
+    async def _read_frame(self):
+        """Returns the type, flags, stream identifier and payload of the
+        next frame."""
+        header = await self._reader.read_exactly(FRAME_HEADER_SIZE)
+        length_high, length_low, frame_type, flags, stream_id = (
+            _FRAME_HEADER.unpack(header)
+        )
+        length = (length_high << 8) | length_low
+        stream_id &= 0x7fffffff
+
+        if length > self._local_settings[SETTINGS_MAX_FRAME_SIZE]:
+            raise Http2Error(FRAME_SIZE_ERROR, "frame too large")
+
+        payload = await self._reader.read_exactly(length)
+
+        return frame_type, flags, stream_id, payload
+
+    async def _run_session(self):
+        """Receive and handle frames until the connection is over."""
+        exception = None
+
+        try:
+            while True:
+                frame_type, flags, stream_id, payload = await self._read_frame()
+
+                if not self._settings_received and frame_type != SETTINGS:
+                    raise Http2Error(PROTOCOL_ERROR, "SETTINGS expected")
+
+                if self._continuation is not None and (
+                        frame_type != CONTINUATION):
+                    raise Http2Error(PROTOCOL_ERROR, "CONTINUATION expected")
+
+                handler = self._frame_handlers.get(frame_type)
+
+                if handler is None:
+                    # unknown frame types are ignored
+                    continue
+
+                try:
+                    handler(flags, stream_id, payload)
+                except Http2Error as error:
+                    if not error.stream_id:
+                        raise
+
+                    self._logger.info("stream error: %s", error)
+                    stream = self._streams.get(error.stream_id)
+
+                    if stream is not None:
+                        self._reset_stream(stream, error.code)
+                    elif not self._writer.is_closing():
+                        self._write((encode_frame(
+                            RST_STREAM, 0, error.stream_id,
+                            _UINT32.pack(error.code)
+                        ),))
+
+        except Http2Error as error:
+            self._logger.info("connection error: %s", error)
+            exception = ConnectionResetError(str(error))
+            self._send_goaway(error.code, str(error).encode("ascii"))
+
+        except (asyncio.IncompleteReadError, ConnectionError) as error:
+            exception = ConnectionResetError("connection lost")
+
+        except asyncio.CancelledError:
+            exception = ConnectionResetError("connection closed")
+            raise
+
+        finally:
+            self._going_away = True
+            self._send_window.close(exception or ConnectionResetError())
+
+            for stream in list(self._streams.values()):
+                self._close_stream(
+                    stream, exception or ConnectionResetError("connection lost")
+                )
+
+    def _data_received(self, flags, stream_id, payload):
+        if stream_id == 0:
+            raise Http2Error(PROTOCOL_ERROR, "DATA on stream 0")
+
+        length = len(payload)
+        self._recv_window -= length
+
+        if self._recv_window < 0:
+            raise Http2Error(FLOW_CONTROL_ERROR, "connection window exceeded")
+
+        stream = self._streams.get(stream_id)
+
+        if stream is None or stream.remote_closed:
+            # acknowledged at once, for the connection window only
+            self._acknowledge(None, length)
+
+            if self._is_idle(stream_id):
+                raise Http2Error(PROTOCOL_ERROR, "DATA on an idle stream")
+
+            if stream is not None:
+                raise Http2Error(
+                    STREAM_CLOSED, "DATA on a closed stream", stream_id
+                )
+
+            # the stream was reset, frames sent in the meantime are
+            # ignored
+            return
+
+        stream.recv_window -= length
+
+        if stream.recv_window < 0:
+            raise Http2Error(
+                FLOW_CONTROL_ERROR, "stream window exceeded", stream_id
+            )
+
+        data = strip_padding(flags, payload)
+
+        if len(data) < length:
+            # padding is acknowledged at once
+            self._acknowledge(stream, length - len(data))
+
+        if data:
+            stream.body_reader.feed(data)
+
+        if flags & END_STREAM:
+            self._remote_stream_end(stream)
+
+    def _remote_stream_end(self, stream, trailers=None):
+        stream.remote_closed = True
+        stream.body_reader.feed_eof(trailers)
+
+        if stream.local_closed:
+            self._close_stream(stream)
+
+    def _data_consumed(self, stream, size):
+        """Called by the body reader of ``stream`` when ``size`` bytes
+        are read."""
+        self._acknowledge(stream, size)
+
+    def _acknowledge(self, stream, size):
+        """Acknowledge ``size`` bytes received on ``stream``, or only on
+        the connection if ``stream`` is None. Windows are increased once
+        half of them is consumed."""
+        if not size:
+            return
+
+        buffers = []
+
+        self._unacknowledged += size
+        window_size = DEFAULT_CONNECTION_WINDOW_SIZE
+
+        if self._unacknowledged >= window_size // 2:
+            buffers.append(encode_frame(
+                WINDOW_UPDATE, 0, 0, _UINT32.pack(self._unacknowledged)
+            ))
+            self._recv_window += self._unacknowledged
+            self._unacknowledged = 0
+
+        if stream is not None and not stream.remote_closed:
+            stream.unacknowledged += size
+            window_size = self._local_settings[SETTINGS_INITIAL_WINDOW_SIZE]
+
+            if stream.unacknowledged >= window_size // 2:
+                buffers.append(encode_frame(
+                    WINDOW_UPDATE, 0, stream.id,
+                    _UINT32.pack(stream.unacknowledged)
+                ))
+                stream.recv_window += stream.unacknowledged
+                stream.unacknowledged = 0
+
+        if buffers and not self._writer.is_closing():
+            self._write(buffers)
+
+    def _is_idle(self, stream_id):
+        """True if ``stream_id`` was never opened."""
+        if (stream_id & 1) == self._is_client:
+            # locally initiated
+            return stream_id >= self._next_stream_id
+        return stream_id > self._last_stream_id
+
+    def _headers_frame_received(self, flags, stream_id, payload):
+        if stream_id == 0:
+            raise Http2Error(PROTOCOL_ERROR, "HEADERS on stream 0")
+
+        fragment = strip_padding(flags, payload)
+
+        if flags & PRIORITY_FLAG:
+            if len(fragment) < 5:
+                raise Http2Error(FRAME_SIZE_ERROR, "invalid HEADERS frame")
+            fragment = fragment[5:]
+
+        if flags & END_HEADERS:
+            self._header_block_received(stream_id, flags, fragment)
+        else:
+            self._continuation = (stream_id, flags, [bytes(fragment)])
+
+    def _continuation_received(self, flags, stream_id, payload):
+        if self._continuation is None or self._continuation[0] != stream_id:
+            raise Http2Error(PROTOCOL_ERROR, "unexpected CONTINUATION")
+
+        _, headers_flags, fragments = self._continuation
+        fragments.append(bytes(payload))
+
+        if sum(map(len, fragments)) > DEFAULT_MAX_HEADER_BLOCK_SIZE:
+            raise Http2Error(ENHANCE_YOUR_CALM, "header block too large")
+
+        if flags & END_HEADERS:
+            self._continuation = None
+            self._header_block_received(
+                stream_id, headers_flags, b"".join(fragments)
+            )
+
+    def _header_block_received(self, stream_id, flags, block):
+        # header blocks are always decoded, to keep the HPACK context
+        # synchronized with the peer
+        try:
+            fields = self._decoder.decode(block)
+        except HpackError as error:
+            raise Http2Error(COMPRESSION_ERROR, str(error)) from error
+
+        end_stream = bool(flags & END_STREAM)
+        stream = self._streams.get(stream_id)
+
+        if stream is not None:
+            if stream.remote_closed:
+                raise Http2Error(
+                    STREAM_CLOSED, "HEADERS on a closed stream", stream_id
+                )
+
+            self._headers_received(stream, fields, end_stream)
+            return
+
+        if not self._is_idle(stream_id):
+            # the stream was reset, frames sent in the meantime are
+            # ignored
+            return
+
+        if (stream_id & 1) == self._is_client:
+            raise Http2Error(PROTOCOL_ERROR, "invalid stream identifier")
+
+        self._last_stream_id = stream_id
+
+        if self._going_away:
+            raise Http2Error(REFUSED_STREAM, "connection closing", stream_id)
+
+        max_streams = self._local_settings[SETTINGS_MAX_CONCURRENT_STREAMS]
+
+        if max_streams is not None and len(self._streams) >= max_streams:
+            raise Http2Error(REFUSED_STREAM, "too many streams", stream_id)
+
+        self._stream_opened(stream_id, fields, end_stream)
+
+    def _priority_received(self, flags, stream_id, payload):
+        if stream_id == 0:
+            raise Http2Error(PROTOCOL_ERROR, "PRIORITY on stream 0")
+
+        if len(payload) != 5:
+            raise Http2Error(
+                FRAME_SIZE_ERROR, "invalid PRIORITY frame", stream_id
+            )
+
+    def _rst_stream_received(self, flags, stream_id, payload):
+        if stream_id == 0:
+            raise Http2Error(PROTOCOL_ERROR, "RST_STREAM on stream 0")
+
+        if len(payload) != 4:
+            raise Http2Error(FRAME_SIZE_ERROR, "invalid RST_STREAM frame")
+
+        if self._is_idle(stream_id):
+            raise Http2Error(PROTOCOL_ERROR, "RST_STREAM on an idle stream")
+
+        stream = self._streams.get(stream_id)
+
+        if stream is not None:
+            code, = _UINT32.unpack(payload)
+            self._logger.info("stream %d reset, error %#x", stream_id, code)
+            self._close_stream(stream, StreamResetError(code))
+
+    def _settings_frame_received(self, flags, stream_id, payload):
+        if stream_id != 0:
+            raise Http2Error(PROTOCOL_ERROR, "SETTINGS on a stream")
+
+        if flags & ACK:
+            if payload:
+                raise Http2Error(FRAME_SIZE_ERROR, "invalid SETTINGS ACK")
+            return
+
+        self._apply_settings(payload)
+        self._settings_received = True
+        self._write((encode_frame(SETTINGS, ACK, 0),))
+
+    def _apply_settings(self, payload):
+        """Apply the remote settings of a SETTINGS frame payload."""
+        settings = self._remote_settings
+
+        for identifier, value in decode_settings(payload):
+            if identifier == SETTINGS_ENABLE_PUSH and value > 1:
+                raise Http2Error(PROTOCOL_ERROR, "invalid ENABLE_PUSH")
+
+            elif identifier == SETTINGS_INITIAL_WINDOW_SIZE:
+                if value > MAX_WINDOW_SIZE:
+                    raise Http2Error(
+                        FLOW_CONTROL_ERROR, "invalid INITIAL_WINDOW_SIZE"
+                    )
+
+                delta = value - settings[SETTINGS_INITIAL_WINDOW_SIZE]
+
+                for stream in self._streams.values():
+                    stream.send_window.increase(delta)
+
+            elif identifier == SETTINGS_MAX_FRAME_SIZE:
+                if not DEFAULT_MAX_FRAME_SIZE <= value <= MAX_FRAME_SIZE:
+                    raise Http2Error(PROTOCOL_ERROR, "invalid MAX_FRAME_SIZE")
+
+            elif identifier == SETTINGS_HEADER_TABLE_SIZE:
+                # the encoder table is never larger than the default
+                self._encoder.max_size = min(value, DEFAULT_TABLE_SIZE)
+
+            elif identifier not in settings:
+                # unknown settings are ignored
+                continue
+
+            settings[identifier] = value
+
+    def _push_promise_received(self, flags, stream_id, payload):
+        # push is disabled by clients, and never sent to servers
+        raise Http2Error(PROTOCOL_ERROR, "unexpected PUSH_PROMISE")
+
+    def _ping_received(self, flags, stream_id, payload):
+        if stream_id != 0:
+            raise Http2Error(PROTOCOL_ERROR, "PING on a stream")
+
+        if len(payload) != 8:
+            raise Http2Error(FRAME_SIZE_ERROR, "invalid PING frame")
+
+        if not flags & ACK:
+            self._write((encode_frame(PING, ACK, 0, bytes(payload)),))
+
+    def _goaway_received(self, flags, stream_id, payload):
+        if stream_id != 0:
+            raise Http2Error(PROTOCOL_ERROR, "GOAWAY on a stream")
+
+        if len(payload) < 8:
+            raise Http2Error(FRAME_SIZE_ERROR, "invalid GOAWAY frame")
+
+        last_stream_id, code = _GOAWAY.unpack_from(payload)
+        last_stream_id &= 0x7fffffff
+        self._going_away = True
+
+        self._logger.info("GOAWAY received, error %#x", code)
+
+        # the streams opened locally after the last one processed by the
+        # peer may be retried on another connection
+        for stream in list(self._streams.values()):
+            if (stream.id & 1) == self._is_client and stream.id > last_stream_id:
+                self._close_stream(stream, StreamResetError(REFUSED_STREAM))
+
+    def _window_update_received(self, flags, stream_id, payload):
+        if len(payload) != 4:
+            raise Http2Error(FRAME_SIZE_ERROR, "invalid WINDOW_UPDATE frame")
+
+        increment = _UINT32.unpack(payload)[0] & 0x7fffffff
+
+        if stream_id == 0:
+            if not increment:
+                raise Http2Error(PROTOCOL_ERROR, "invalid window increment")
+
+            self._send_window.increase(increment)
+            return
+
+        if not increment:
+            raise Http2Error(
+                PROTOCOL_ERROR, "invalid window increment", stream_id
+            )
+
+        stream = self._streams.get(stream_id)
+
+        if stream is None:
+            if self._is_idle(stream_id):
+                raise Http2Error(PROTOCOL_ERROR, "WINDOW_UPDATE on an idle stream")
+            return
+
+        try:
+            stream.send_window.increase(increment)
+        except Http2Error as error:
+            error.stream_id = stream_id
+            raise
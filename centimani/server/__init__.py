@@ -32,7 +32,20 @@ server constructor.
     ssl_context.load_cert_chain(certfile="<name>.crt", keyfile="<name>.key")
 
     server = Server(routes, loop=loop, ssl=ssl_context)
+
+Response bodies are compressed when a ``Compression`` instance is passed
+to the server constructor.
+
+    server = Server(routes, loop=loop, compression=Compression())
+
+Cacheable responses are stored, and sent again without handling the
+requests, when a ``ResponseCache`` instance is passed to the server
+constructor.
+
+    server = Server(routes, loop=loop, cache=ResponseCache())
 """
 
+from .cache import ResponseCache
+from .compression import Compression
 from .manager import Server
 from .handlers import RequestHandler
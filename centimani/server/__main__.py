@@ -0,0 +1,90 @@
+"""Runs a centimani server, in several worker processes.
+
+Usage:
+    python -m centimani.server [options] module:attribute
+
+The attribute of the module is either the routes of the server, or a
+``Server`` instance, in which case the server options are ignored.
+
+Example:
+    python -m centimani.server --port 8080 --workers 4 myapp.web:routes
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+
+from .manager import Server
+
+
+def load_attribute(spec):
+    """Returns the attribute designated by a "module:attribute" string."""
+    module_name, _, attribute = spec.partition(":")
+
+    if not module_name or not attribute:
+        raise ValueError("expected module:attribute, got {0!r}".format(spec))
+
+    value = importlib.import_module(module_name)
+
+    for name in attribute.split("."):
+        value = getattr(value, name)
+
+    return value
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m centimani.server",
+        description="Runs a centimani server."
+    )
+    parser.add_argument(
+        "app",
+        help="the routes of the server, or a Server, as module:attribute"
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="number of worker processes, defaults to the number of CPUs"
+    )
+    parser.add_argument(
+        "--shared-socket", action="store_true",
+        help="workers share a socket, instead of binding their own with "
+             "SO_REUSEPORT"
+    )
+    parser.add_argument("--pipelining", action="store_true")
+    parser.add_argument("--callback-protocol", action="store_true")
+    parser.add_argument("--h2c", action="store_true")
+    parser.add_argument("--log-level", default="INFO")
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    logging.basicConfig(level=args.log_level.upper())
+
+    app = load_attribute(args.app)
+
+    if isinstance(app, Server):
+        server = app
+    else:
+        server = Server(
+            app,
+            pipelining=args.pipelining,
+            callback_protocol=args.callback_protocol,
+            h2c=args.h2c,
+            loop=asyncio.new_event_loop()
+        )
+
+    server.serve(
+        args.host, args.port,
+        workers=args.workers,
+        reuse_port=False if args.shared_socket else None
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""This module defines the response cache of the server.
+
+Caching is enabled by passing a ``ResponseCache`` instance to the
+``Server`` constructor. The cache stands in front of the request
+handlers, like a caching reverse proxy would: the responses to GET
+requests are stored when their cache-control header field allows a
+shared cache to store them, with a max-age or s-maxage directive, and
+sent again without routing the request nor instantiating a handler
+until they expire.
+
+Responses are stored by method and request target, and by the values
+of the request header fields named by their vary header field. Their
+header fields are serialized once, when stored. The cache is bounded by
+the total size of the stored responses, the least recently used ones
+are evicted first.
+
+Only the responses sent at once with ``send_response`` are stored,
+streamed responses and files are not. Request cache directives are
+ignored, and the requests with credentials, conditional requests and
+range requests are always handled.
+"""
+
+import collections
+
+from centimani.headers import encode_fields
+
+
+# total size of the stored responses
+DEFAULT_MAX_SIZE = 1 << 26
+
+# responses larger than this are not stored
+DEFAULT_MAX_RESPONSE_SIZE = 1 << 20
+
+# the size accounted for a stored response, in addition to its header
+# fields and body
+ENTRY_SIZE = 256
+
+CACHEABLE_METHODS = frozenset(("GET",))
+
+# requests with these header fields are handled, as their responses
+# depend on the state of the resource
+BYPASSING_FIELD_NAMES = (
+    "authorization", "range", "if-range", "if-match", "if-none-match",
+    "if-modified-since", "if-unmodified-since",
+)
+
+# statuses of the responses that may be stored, as listed in RFC 9110
+CACHEABLE_STATUSES = frozenset((
+    200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501,
+))
+
+# response directives forbidding a shared cache to reuse the response
+# without validating it
+UNCACHEABLE_DIRECTIVES = frozenset(("no-store", "no-cache", "private"))
+
+# header fields not stored, they are sent by the protocols with each
+# response
+UNSTORED_FIELD_NAMES = frozenset((
+    "date", "age", "content-length", "transfer-encoding",
+    "connection", "keep-alive", "proxy-connection", "upgrade",
+))
+
+
+def _split_values(values):
+    """Returns the comma separated elements of the ``values`` of a
+    header field, as given by a handler."""
+    elements = []
+
+    for value in values:
+        elements.extend(
+            element.strip() for element in value.split(",")
+            if element.strip()
+        )
+
+    return elements
+
+
+def cache_lifetime(headers):
+    """Returns the number of seconds a response with the given header
+    fields may be reused by a shared cache, or None if it may not be
+    stored."""
+    max_age = None
+    s_maxage = None
+
+    for directive in _split_values(headers.get("cache-control", ())):
+        name, _, value = directive.partition("=")
+        name = name.strip().lower()
+
+        if name in UNCACHEABLE_DIRECTIVES:
+            return None
+
+        if name not in ("max-age", "s-maxage"):
+            continue
+
+        value = value.strip().strip('"')
+
+        if not value.isdigit():
+            # a malformed lifetime means the response is stale
+            return None
+
+        if name == "s-maxage":
+            s_maxage = int(value)
+        else:
+            max_age = int(value)
+
+    if s_maxage is not None:
+        return s_maxage or None
+
+    return max_age or None
+
+
+class CachedResponse:
+    """A response stored by a ``ResponseCache``, or shared by coalesced
+    requests.
+
+    Attributes:
+    :key: The (method, target) cache key of the response.
+    :status: The HTTP status of the response.
+    :fields: The (name, value) pairs of the stored header fields.
+    :block: The stored header fields, serialized as CRLF terminated
+        header lines.
+    :has_server: True if a "server" header field is stored.
+    :body: The payload body, as bytes.
+    :stored: The clock time at which the response was stored, None if
+        it is not stored by a cache.
+    :expires: The clock time after which the response is stale.
+    """
+
+    __slots__ = (
+        "key", "status", "fields", "block", "has_server", "body",
+        "stored", "expires", "size",
+    )
+
+    def __init__(self, key, status, headers, body, stored=None,
+                 expires=None):
+        """Initializes the response, with its header fields and its
+        body as sent, the header fields sent with each response are not
+        stored."""
+        fields = []
+
+        if headers:
+            for name, value in headers.fields():
+                name = name.lower()
+
+                if name not in UNSTORED_FIELD_NAMES:
+                    fields.append((name, value))
+
+        block = bytearray()
+        encode_fields(fields, block)
+
+        self.key = key
+        self.status = status
+        self.fields = fields
+        self.block = bytes(block)
+        self.has_server = any(name == "server" for name, _ in fields)
+        self.body = body or b""
+        self.stored = stored
+        self.expires = expires
+        self.size = ENTRY_SIZE + len(self.block) + len(self.body)
+
+    def __repr__(self):
+        return "CachedResponse({0}, {1!r}, {2} bytes)".format(
+            self.status, self.key, len(self.body)
+        )
+
+    def age(self, now):
+        """Returns the value of the age header field sent with the
+        response at the clock time ``now``, or None if it is not stored
+        by a cache."""
+        if self.stored is None:
+            return None
+        return max(int(now - self.stored), 0)
+
+
+class ResponseCache:
+    """A least recently used cache of responses, bounded by their total
+    size.
+
+    Attributes:
+    :max_size: The total size of the stored responses.
+    :max_response_size: Larger responses are not stored.
+    :hits: The number of requests served from the cache.
+    :misses: The number of cacheable requests that were not.
+    """
+
+    def __init__(
+            self,
+            *,
+            max_size=DEFAULT_MAX_SIZE,
+            max_response_size=DEFAULT_MAX_RESPONSE_SIZE):
+        self.max_size = max_size
+        self.max_response_size = max_response_size
+        self.hits = 0
+        self.misses = 0
+        self._responses = collections.OrderedDict()
+        self._size = 0
+
+        # the names of the varying header fields of the responses of
+        # each (method, target), and their number of stored variants
+        self._variants = {}
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._responses)
+
+    @staticmethod
+    def _variant_key(key, request, names):
+        headers = request.headers
+        return (key, tuple(tuple(headers.get(name, ())) for name in names))
+
+    def get(self, request, now):
+        """Returns the cache key of ``request``, and the fresh response
+        stored for it, or None.
+
+        The key is None if the request can not be served from the
+        cache, otherwise it is used to store its response with
+        ``put``.
+        """
+        if request.method not in CACHEABLE_METHODS:
+            return None, None
+
+        headers = request.headers
+
+        if (headers.get("content-length", ["0"]) != ["0"]
+                or "transfer-encoding" in headers):
+            return None, None
+
+        for name in BYPASSING_FIELD_NAMES:
+            if name in headers:
+                return None, None
+
+        key = (request.method, request.target)
+        variants = self._variants.get(key)
+        response = None
+
+        if variants is not None:
+            variant_key = self._variant_key(key, request, variants[0])
+            response = self._responses.get(variant_key)
+
+        if response is not None:
+            if now < response.expires:
+                self._responses.move_to_end(variant_key)
+                self.hits += 1
+                return key, response
+
+            self._discard(variant_key)
+
+        self.misses += 1
+
+        return key, None
+
+    def put(self, key, request, status, headers, body, now):
+        """Stores the response to ``request``, of cache key ``key``, if
+        its status and header fields allow it. Returns the stored
+        ``CachedResponse``, or None."""
+        if status not in CACHEABLE_STATUSES:
+            return None
+
+        if headers is None or "set-cookie" in headers:
+            return None
+
+        lifetime = cache_lifetime(headers)
+
+        if lifetime is None:
+            return None
+
+        names = tuple(
+            name.lower() for name in _split_values(headers.get("vary", ()))
+        )
+
+        if "*" in names:
+            return None
+
+        response = CachedResponse(
+            key, status, headers, body, now, now + lifetime
+        )
+
+        if response.size > min(self.max_response_size, self.max_size):
+            return None
+
+        variants = self._variants.get(key)
+
+        if variants is not None and variants[0] != names:
+            # the varying header fields changed, the other variants
+            # are not reachable anymore
+            self.invalidate(*key)
+
+        variant_key = self._variant_key(key, request, names)
+        self._discard(variant_key)
+
+        while self._size + response.size > self.max_size:
+            self._discard(next(iter(self._responses)))
+
+        self._responses[variant_key] = response
+        self._variants.setdefault(key, [names, 0])[1] += 1
+        self._size += response.size
+
+        return response
+
+    def _discard(self, variant_key):
+        response = self._responses.pop(variant_key, None)
+
+        if response is None:
+            return
+
+        self._size -= response.size
+        variants = self._variants[response.key]
+        variants[1] -= 1
+
+        if not variants[1]:
+            del self._variants[response.key]
+
+    def invalidate(self, method, target):
+        """Discards the responses stored for ``method`` and the raw
+        request ``target``, given as bytes."""
+        key = (method, target)
+
+        for variant_key in [k for k in self._responses if k[0] == key]:
+            self._discard(variant_key)
+
+    def clear(self):
+        self._responses.clear()
+        self._variants.clear()
+        self._size = 0
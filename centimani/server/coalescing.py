@@ -0,0 +1,122 @@
+"""This module defines the coalescing of identical concurrent requests.
+
+Coalescing is enabled per route, by setting the ``coalesce`` attribute
+of a request handler class to True. While a request is handled, the
+identical requests routed to the same handler class wait for its
+response, and are sent a copy of it, instead of being handled:
+
+    class ItemsHandler(RequestHandler):
+        coalesce = True
+
+        async def get(self):
+            ...
+
+Requests are identical if they have the same method, GET or HEAD, the
+same target, no body, and the same values of the header fields named by
+the ``coalesced_fields`` attribute of the handler, by default the ones
+the response may depend on.
+
+The handler of the first request leads the flight, the outcome of the
+flight for the waiting requests is:
+- The response sent at once with ``send_response`` is shared, whatever
+  its status, it is sent without age header field, as it is not cached.
+- If the handler raises an ``HttpError``, the same error is sent. If it
+  raises any other exception, a 500 error is sent.
+- If the handler sends a streamed response or a file, that can not be
+  shared, each waiting request is handled by its own handler.
+- If the processing of the request is interrupted before a response is
+  sent, e.g. because the client connection was lost, one of the waiting
+  requests leads a new flight.
+
+A request waiting for longer than the ``coalescing_timeout`` of the
+handler is handled by its own handler, without joining any other
+flight.
+"""
+
+# header fields the response to a request usually depends on
+DEFAULT_COALESCED_FIELDS = ("accept-encoding", "authorization", "cookie")
+
+# seconds a request waits for the response of the leading request
+DEFAULT_COALESCING_TIMEOUT = 10.0
+
+COALESCED_METHODS = frozenset(("GET", "HEAD"))
+
+
+def flight_key(handler_class, request):
+    """Returns the key identifying the requests coalesced with
+    ``request``, routed to ``handler_class``, or None if it can not be
+    coalesced."""
+    if request.method not in COALESCED_METHODS:
+        return None
+
+    headers = request.headers
+
+    if (headers.get("content-length", ["0"]) != ["0"]
+            or "transfer-encoding" in headers):
+        return None
+
+    return (handler_class, request.method, request.target, tuple(
+        tuple(headers.get(name, ())) for name in handler_class.coalesced_fields
+    ))
+
+
+class Flight:
+    """The handling of a request, whose response is awaited by the
+    identical requests.
+
+    Attributes:
+    :key: The key of the coalesced requests.
+    :response: The shared ``CachedResponse``, if any.
+    :error: The exception raised by the handler, if any.
+    :shared: False if the response sent can not be shared.
+    :landed: True if the handling of the request is over.
+    """
+
+    __slots__ = ("key", "response", "error", "shared", "landed", "_waiters")
+
+    def __init__(self, key):
+        self.key = key
+        self.response = None
+        self.error = None
+        self.shared = True
+        self.landed = False
+        self._waiters = []
+
+    def __repr__(self):
+        return "Flight({0!r}, {1} waiters)".format(
+            self.key, len(self._waiters)
+        )
+
+    @property
+    def has_waiters(self):
+        return bool(self._waiters)
+
+    async def wait(self, loop, timers, timeout):
+        """Waits until the flight lands, returns False if it did not
+        within ``timeout`` seconds."""
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = timers.call_later(timeout, self._timed_out, waiter)
+
+        try:
+            return await waiter
+        finally:
+            timer.cancel()
+
+            if not self.landed:
+                self._waiters.remove(waiter)
+
+    @staticmethod
+    def _timed_out(waiter):
+        if not waiter.done():
+            waiter.set_result(False)
+
+    def land(self):
+        """Ends the flight, and wakes up the waiting requests."""
+        self.landed = True
+
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(True)
+
+        self._waiters.clear()
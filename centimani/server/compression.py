@@ -0,0 +1,208 @@
+"""This module defines the response compression layer of the server.
+
+Compression is enabled by passing a ``Compression`` instance to the
+``Server`` constructor. The content encoding is negotiated with the
+accept-encoding request header field, and bodies are compressed
+incrementally with ``zlib`` compression objects. Large bodies are
+compressed in an executor, in order not to block the event loop.
+"""
+
+import zlib
+
+
+# bodies smaller than this are not worth compressing
+DEFAULT_MIN_SIZE = 1024
+
+# bodies or blocks larger than this are compressed in an executor
+DEFAULT_EXECUTOR_THRESHOLD = 1 << 17
+
+# content types that are already compressed
+COMPRESSED_CONTENT_TYPES = frozenset((
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/pdf",
+    "application/octet-stream",
+    "application/wasm",
+    "font/woff",
+    "font/woff2",
+))
+
+COMPRESSED_CONTENT_TYPE_PREFIXES = ("image/", "audio/", "video/")
+
+# window bits used by zlib for each supported content coding
+CONTENT_CODINGS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+
+
+class Compression:
+    """Response compression settings.
+
+    Attributes:
+    :level: The zlib compression level, from 1 to 9.
+    :min_size: Bodies smaller than this size are sent uncompressed.
+    :executor_threshold: Bodies, or streamed blocks, larger than this
+        size are compressed in ``executor``.
+    :executor: The executor used to compress large bodies, the event
+        loop default executor if None.
+    """
+
+    def __init__(
+            self,
+            *,
+            level=6,
+            min_size=DEFAULT_MIN_SIZE,
+            executor_threshold=DEFAULT_EXECUTOR_THRESHOLD,
+            executor=None,
+            excluded_types=COMPRESSED_CONTENT_TYPES):
+        """Initializes the compression settings.
+
+        Arguments:
+        :excluded_types: Content types never compressed, in addition to
+            images, audio and video.
+        """
+        self.level = level
+        self.min_size = min_size
+        self.executor_threshold = executor_threshold
+        self.executor = executor
+        self._excluded_types = frozenset(excluded_types)
+
+    def is_compressible(self, headers):
+        """Checks if a response with the given header fields may be
+        compressed.
+        """
+        if headers is None:
+            return True
+
+        if headers.get("content-encoding"):
+            return False
+
+        # partial content is sent as is, ranges refer to the identity
+        if headers.get("content-range"):
+            return False
+
+        content_type = headers.get("content-type")
+
+        if content_type:
+            media_type = content_type[0].partition(";")[0].strip().lower()
+
+            if media_type in self._excluded_types:
+                return False
+
+            if media_type == "multipart/byteranges":
+                return False
+
+            if media_type.startswith(COMPRESSED_CONTENT_TYPE_PREFIXES):
+                return False
+
+        return True
+
+    def negotiate(self, request_headers, headers, body_size=None):
+        """Returns the content coding to use for a response, or None if
+        the response should not be compressed.
+
+        Arguments:
+        :request_headers: The request header fields.
+        :headers: The response header fields given by the handler.
+        :body_size: The body size, if known.
+        """
+        if body_size is not None and body_size < self.min_size:
+            return None
+
+        accept_encoding = request_headers.get("accept-encoding")
+
+        if not accept_encoding or not self.is_compressible(headers):
+            return None
+
+        best_coding = None
+        best_quality = 0
+
+        for value in accept_encoding:
+            coding, _, parameters = value.partition(";")
+            coding = coding.strip().lower()
+
+            quality = 1.0
+            name, _, quality_value = parameters.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(quality_value)
+                except ValueError:
+                    continue
+
+            if coding == "*":
+                coding = "gzip"
+
+            if coding in CONTENT_CODINGS and quality > best_quality:
+                best_coding = coding
+                best_quality = quality
+
+        return best_coding
+
+    def compressobj(self, coding):
+        """Returns a new zlib compression object for ``coding``."""
+        return zlib.compressobj(
+            self.level,
+            zlib.DEFLATED,
+            CONTENT_CODINGS[coding]
+        )
+
+    async def compress(self, coding, body, loop):
+        """Returns ``body`` compressed with ``coding``."""
+        compressobj = self.compressobj(coding)
+
+        def compress():
+            return compressobj.compress(body) + compressobj.flush()
+
+        if len(body) >= self.executor_threshold:
+            return await loop.run_in_executor(self.executor, compress)
+        else:
+            return compress()
+
+
+class CompressedBodyWriter:
+    """A body writer wrapper that compresses written data, then sends it
+    with the wrapped body writer.
+    """
+
+    def __init__(self, body_writer, compression, coding, loop):
+        self._body_writer = body_writer
+        self._compression = compression
+        self._compressobj = compression.compressobj(coding)
+        self._loop = loop
+
+    @property
+    def is_complete(self):
+        return self._body_writer.is_complete
+
+    @property
+    def body_size(self):
+        return self._body_writer.body_size
+
+    async def _run(self, function, data):
+        if len(data) >= self._compression.executor_threshold:
+            executor = self._compression.executor
+            return await self._loop.run_in_executor(executor, function, data)
+        else:
+            return function(data)
+
+    async def write(self, data):
+        """Compress ``data`` then send the compressed data, if any."""
+        compressed = await self._run(self._compressobj.compress, data)
+
+        if compressed:
+            await self._body_writer.write(compressed)
+
+    async def close(self, headers=None):
+        """Send the remaining compressed data, then ends the body."""
+        compressed = self._compressobj.flush()
+
+        if compressed:
+            await self._body_writer.write(compressed)
+
+        await self._body_writer.close(headers)
@@ -1,7 +1,17 @@
 import asyncio
+import io
 import logging
+import tempfile
 
-from centimani.headers import Headers
+from collections.abc import Iterable
+from urllib.parse import unquote_plus, parse_qs
+
+from centimani.errors import HttpError
+from centimani.headers import CompiledHeaders, Headers, LazyHeaders
+from .cache import CachedResponse
+from .coalescing import DEFAULT_COALESCED_FIELDS, DEFAULT_COALESCING_TIMEOUT
+from .coalescing import Flight, flight_key
+from .router import RoutingError
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -10,44 +20,117 @@ REQUEST_METHODS = frozenset(
     {"GET", "HEAD", "POST", "OPTIONS", "PUT", "PATCH", "DELETE"}
 )
 
+# request bodies larger than this are spooled to a temporary file
+DEFAULT_MAX_BODY_MEMORY = 1 << 16
+
+# request bodies larger than this are rejected
+DEFAULT_MAX_BODY_SIZE = 1 << 24
+
 
 #======================================#
 # HTTP Response and Request Structures #
 #======================================#
 
 class Request:
-    """Structure used to store server requests."""
+    """Structure used to store server requests.
+
+    The request may be given the raw request ``target``, in which case
+    the decoded ``path`` and the parsed ``query`` are computed on their
+    first access.
+    """
 
-    __slots__ = ("method", "path", "query", "headers")
+    __slots__ = ("method", "target", "headers", "_path", "_query")
 
-    def __init__(self, method="GET", path="/", query=None, headers=None):
+    def __init__(self, method="GET", path="/", query=None, headers=None,
+                 target=None):
         self.method = method
-        self.path = path
-        self.query = query or {}
+        self.target = target
         self.headers = headers or Headers()
 
+        if target is None:
+            self._path = path
+            self._query = query or {}
+        else:
+            self._path = None
+            self._query = None
+
+    @property
+    def path(self):
+        if self._path is None:
+            path, _, _ = self.target.partition(b"?")
+            path = path.decode("ascii")
+
+            if "%" in path or "+" in path:
+                path = unquote_plus(path)
+
+            self._path = path
+        return self._path
+
+    @path.setter
+    def path(self, path):
+        self._path = path
+
+    @property
+    def query(self):
+        if self._query is None:
+            _, _, query = self.target.partition(b"?")
+            self._query = {}
+
+            if query:
+                try:
+                    self._query = parse_qs(
+                        query.decode("ascii"),
+                        strict_parsing=True
+                    )
+                except ValueError:
+                    # malformed - ignore the query
+                    _LOGGER.info("malformed query")
+        return self._query
+
+    @query.setter
+    def query(self, query):
+        self._query = query
+
     def __repr__(self):
         fields = (
             "{0}: {1!r}".format(name, getattr(self, name))
-            for name in self.__slots__
+            for name in ("method", "path", "query", "headers")
         )
         return "".join(("Request(", ", ".join(fields), ")"))
 
 
 class Response:
-    """Structure used to store server responses."""
+    """Structure used to store server responses.
+
+    The header fields may be given as ``headers``, or as the serialized
+    response ``header``, that will be parsed on the first access to the
+    ``headers`` attribute.
+    """
 
-    __slots__ = ("status", "headers")
+    __slots__ = ("status", "_headers", "_header")
 
-    def __init__(self, status, headers=None):
+    def __init__(self, status, headers=None, header=None):
         self.status = status
-        self.headers = Headers()
-        self.headers.update(headers)
+        self._header = header
+
+        if header is None:
+            self._headers = Headers()
+            self._headers.update(headers or {})
+        else:
+            self._headers = None
+
+    @property
+    def headers(self):
+        if self._headers is None:
+            # skip the status line and the trailing blank line
+            _, _, block = bytes(self._header).partition(b"\r\n")
+            self._headers = LazyHeaders(block[:-4])
+        return self._headers
 
     def __repr__(self):
         fields = (
             "{0}: {1!r}".format(name, getattr(self, name))
-            for name in self.__slots__
+            for name in ("status", "headers")
         )
         return "".join(("Response(", ", ".join(fields), ")"))
 
@@ -150,6 +233,8 @@ class ProtocolHandler:
         self._handler = None
         self._response = None
         self._error = None
+        self._cache_key = None
+        self._flight = None
 
     @property
     def request(self):
@@ -199,6 +284,297 @@ class ProtocolHandler:
     def _peername(self):
         return self._connection._peername
 
+    #---------------------------------------#
+    # Request processing, for all protocols #
+    #---------------------------------------#
+
+    @staticmethod
+    def _fixed_body(body):
+        """Returns ``body`` as a bytes-like object of unsigned bytes, if
+        it is sent at once, or None if it is an iterable or asynchronous
+        iterable streamed with ``start_response``.
+
+        Raises a ``TypeError`` if ``body`` is neither.
+        """
+        if body is None:
+            return b""
+
+        if isinstance(body, bytes):
+            return body
+
+        if isinstance(body, (bytearray, memoryview)):
+            # the length of a byte view is its size in bytes
+            return memoryview(body).cast("B")
+
+        if isinstance(body, str):
+            raise TypeError("body must be bytes, not str")
+
+        if hasattr(body, "__aiter__") or isinstance(body, Iterable):
+            return None
+
+        raise TypeError("body must be bytes, an iterable or None")
+
+    def _omits_body(self):
+        """Returns True if the response body is not sent, as the request
+        method is HEAD. The header fields are the ones of a GET request.
+        """
+        return self._request is not None and self._request.method == "HEAD"
+
+    def _negotiate_compression(self, headers, body_size=None):
+        """Returns the content coding used to compress the response body,
+        and the response header fields to send, updated accordingly.
+
+        The vary header field is added to every response that may be
+        compressed, so that caches do not send a response negotiated for
+        a client to the others, even if it is not compressed.
+        """
+        compression = self._server.compression
+
+        if compression is None or self._request is None:
+            return None, headers
+
+        if not compression.is_compressible(headers):
+            return None, headers
+
+        request_headers = self._request.headers
+        coding = compression.negotiate(request_headers, headers, body_size)
+
+        negotiated_headers = Headers()
+
+        if headers is not None:
+            for name, values in headers.items():
+                if coding is None or name != "content-length":
+                    negotiated_headers.add(name, values)
+
+        if coding is not None:
+            negotiated_headers.set("content-encoding", coding)
+
+        vary = negotiated_headers.get("vary", ())
+
+        if not any(
+                field.strip().lower() in ("accept-encoding", "*")
+                for value in vary for field in value.split(",")):
+            negotiated_headers.add("vary", "accept-encoding")
+
+        return coding, negotiated_headers
+
+    def _store_response(self, status, headers, body):
+        """Stores the response sent by the handler in the server response
+        cache, if the request and the response are cacheable, and shares
+        it with the requests coalesced with the current one, if any.
+        ``headers`` and ``body`` are the ones sent, after compression.
+        """
+        if self._handler is None or self._error is not None or status < 200:
+            return
+
+        flight = self._flight
+
+        if flight is not None and not flight.has_waiters:
+            flight = None
+
+        if self._cache_key is None and flight is None:
+            return
+
+        # the body may be a view of a buffer reused by the handler
+        if not isinstance(body, bytes):
+            body = bytes(body)
+
+        static_headers = self._handler.compiled_headers()
+
+        if static_headers is not None:
+            # given header fields take precedence
+            merged_headers = Headers()
+            merged_headers.update(static_headers.headers)
+            merged_headers.update(headers or {})
+            headers = merged_headers
+
+        response = None
+
+        if self._cache_key is not None:
+            response = self._server.cache.put(
+                self._cache_key, self._request, status, headers, body,
+                self._server.clock.time
+            )
+
+        if flight is not None:
+            if response is None:
+                response = CachedResponse(None, status, headers, body)
+
+            flight.response = response
+
+    async def _coalesce(self, key, timeout):
+        """Waits for the response of the identical request in flight, if
+        any, and returns it.
+
+        Returns None if the request must be handled by its own handler,
+        in which case ``self._flight`` is set if it leads a new flight.
+        Raises an ``HttpError`` if the handler of the leading request
+        failed.
+        """
+        flights = self._server.flights
+        deadline = self._loop.time() + timeout
+
+        while True:
+            flight = flights.get(key)
+
+            if flight is None:
+                self._flight = flights[key] = Flight(key)
+                return None
+
+            landed = await flight.wait(
+                self._loop,
+                self._server.timers,
+                deadline - self._loop.time()
+            )
+
+            if not landed:
+                self._logger.info("coalesced request timeout")
+                return None
+
+            if flight.response is not None:
+                return flight.response
+
+            if flight.error is not None:
+                if isinstance(flight.error, HttpError):
+                    raise HttpError(flight.error.code, flight.error.headers)
+                raise HttpError(500)
+
+            if not flight.shared:
+                return None
+
+            # the leading request was interrupted
+
+    def _land_flight(self, flight):
+        """Ends the flight led by the current request."""
+        flights = self._server.flights
+
+        if flights.get(flight.key) is flight:
+            del flights[flight.key]
+
+        if flight.response is None and flight.error is None:
+            # a streamed response or a file was sent
+            flight.shared = self._response is None
+
+        flight.land()
+
+    async def _handle_request(self):
+        """This coroutine, called by ``process_request``, will route the
+        request to the associated  request handler.
+
+        If the server has a response cache, the fresh responses stored
+        are sent without routing the request.
+        """
+        #----------------#
+        # Response cache #
+        #----------------#
+
+        cache = self._server.cache
+        self._cache_key = None
+        self._flight = None
+
+        if cache is not None:
+            self._cache_key, cached_response = cache.get(
+                self._request, self._server.clock.time
+            )
+
+            if cached_response is not None:
+                await self._send_cached_response(cached_response)
+                return
+
+        #-----------------#
+        # Request routing #
+        #-----------------#
+
+        method = self._request.method
+
+        try:
+            tmp = self._server.router.find_route(self._request.path)
+            request_handler_factory, args, kwargs = tmp
+        except RoutingError as error:
+            # No route finded, send 404 not find error
+            self._logger.info("route not find")
+            raise HttpError(404) from error
+
+        allowed_methods = request_handler_factory.allowed_methods()
+        if method not in allowed_methods:
+            # Method not implemented, send error 405 not implemented
+            self._logger.info("method not implemented")
+            error_headers = Headers(allowed=allowed_methods)
+            raise HttpError(405, error_headers)
+
+        #--------------------#
+        # Request coalescing #
+        #--------------------#
+
+        if request_handler_factory.coalesce:
+            key = flight_key(request_handler_factory, self._request)
+
+            if key is not None:
+                shared_response = await self._coalesce(
+                    key, request_handler_factory.coalescing_timeout
+                )
+
+                if shared_response is not None:
+                    await self._send_cached_response(shared_response)
+                    return
+
+        #-------------------------#
+        # Request handler calling #
+        #-------------------------#
+
+        flight = self._flight
+
+        try:
+            self._handler = request_handler_factory(self)
+            method_handler = getattr(self._handler, method.lower())
+
+            can_continue = await self.handler.can_continue()
+
+            if not can_continue:
+                if "100-continue" in self._request.headers.get("except", []):
+                    if not self._response:
+                        # if the can_continue method does not send an
+                        # error, send a 417 error.
+                        self._logger.info("expectation failed")
+                        raise HttpError(417)
+
+            if "100-continue" in self._request.headers.get("except", []):
+                await self._handler.send_response(100)
+
+            await method_handler(*args, **kwargs)
+
+        except ConnectionError:
+            # the waiting requests are handled again
+            raise
+
+        except Exception as error:
+            if flight is not None:
+                flight.error = error
+            raise
+
+        finally:
+            if flight is not None:
+                self._land_flight(flight)
+
+    async def _send_streaming_response(self, status, headers, body):
+        """Send the blocks of the iterable or asynchronous iterable
+        ``body`` with a body writer.
+        """
+        body_writer = await self.start_response(status, headers)
+
+        if hasattr(body, "__aiter__"):
+            async for data in body:
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                await body_writer.write(data)
+        else:
+            for data in body:
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                await body_writer.write(data)
+
+        await body_writer.close()
+
     #------------------#
     # Abstract methods #
     #------------------#
@@ -209,10 +585,43 @@ class ProtocolHandler:
         Arguments:
         :status: The HTTP status of the response.
         :headers: A collection of header fields sent in the response.
-        :body: the response payload body.
+        :body: the response payload body, as bytes, or as an iterable
+            or an asynchronous iterable of bytes for a streamed body.
+        """
+        raise NotImplementedError
+
+    async def start_response(self, status, headers=None):
+        """Send the response header, and returns a body writer used to
+        send the payload body incrementally.
+
+        The body writer has a ``write`` coroutine, that waits until data
+        is sent, and a ``close`` coroutine that ends the body.
+
+        Arguments:
+        :status: The HTTP status of the response.
+        :headers: A collection of header fields sent in the response.
+        """
+        raise NotImplementedError
+
+    async def send_file(self, status, headers, file, offset=0, count=None):
+        """Send an HTTP response whose payload body is the content of a
+        file.
+
+        Arguments:
+        :status: The HTTP status of the response.
+        :headers: A collection of header fields sent in the response.
+        :file: A regular file object, opened in binary mode.
+        :offset: The position in the file where the body starts.
+        :count: The body size, defaults to the rest of the file.
         """
         raise NotImplementedError
 
+    async def _send_cached_response(self, cached_response):
+        """Send a ``CachedResponse`` of the server response cache, or
+        shared by coalesced requests, with its serialized header
+        fields."""
+        raise NotImplementedError
+
     async def send_error(self, code, headers=None, **kwargs):
         """Shortcut used to send HTTP errors to the client."""
         assert 400 <= code < 600
@@ -250,8 +659,24 @@ class RequestHandler:
 
     Each method defined in a sublass of this class that have the same
     name as an HTTP method will be called to handle this HTTP method.
+
+    The header fields of ``static_headers``, a mapping of field names to
+    values, are sent with every response of the handler. They are
+    serialized once per handler class.
+
+    If ``coalesce`` is True, identical concurrent requests are coalesced,
+    they share the response of the first one, see
+    ``centimani.server.coalescing``. They are identical if they have the
+    same values of the ``coalesced_fields`` header fields, and wait for
+    the response at most ``coalescing_timeout`` seconds.
     """
 
+    static_headers = None
+
+    coalesce = False
+    coalesced_fields = DEFAULT_COALESCED_FIELDS
+    coalescing_timeout = DEFAULT_COALESCING_TIMEOUT
+
     @classmethod
     def allowed_methods(cls):
         return frozenset(
@@ -259,6 +684,18 @@ class RequestHandler:
             if hasattr(cls, method.lower())
         )
 
+    @classmethod
+    def compiled_headers(cls):
+        """Returns the ``static_headers`` as ``CompiledHeaders``, or None
+        if the handler have no static header fields."""
+        compiled_headers = cls.__dict__.get("_compiled_headers")
+
+        if compiled_headers is None and cls.static_headers:
+            compiled_headers = CompiledHeaders(cls.static_headers)
+            cls._compiled_headers = compiled_headers
+
+        return compiled_headers
+
     def __init__(self, protocol):
         self._protocol = protocol
         self.request = protocol.request
@@ -273,11 +710,64 @@ class RequestHandler:
 
         return self._protocol.send_response(status, headers, body)
 
+    def start_response(self, status, headers=None):
+        """A shortcut to the protocol ``start_response`` method."""
+        assert self.request is self._protocol.request
+        return self._protocol.start_response(status, headers)
+
+    def send_file(self, status, headers, file, offset=0, count=None):
+        """A shortcut to the protocol ``send_file`` method."""
+        assert self.request is self._protocol.request
+        return self._protocol.send_file(status, headers, file, offset, count)
+
     def send_error(self, status, headers=None, **kwargs):
         """A shortcut to the protocol ``send_response`` method."""
         assert self.request is self._protocol.request
         return self._protocol.send_error(status, headers, **kwargs)
 
+    async def read_body(
+            self,
+            max_memory=DEFAULT_MAX_BODY_MEMORY,
+            max_size=DEFAULT_MAX_BODY_SIZE):
+        """Read the whole request payload body, and returns it as a file
+        object positioned at its beginning.
+
+        The body is kept in memory up to ``max_memory`` bytes, and spooled
+        to a temporary file beyond. A body larger than ``max_size`` bytes
+        raises a 413 ``HttpError``, and the connection is closed.
+        """
+        content_length = self.request.headers.get("content-length")
+
+        if max_size is not None and content_length:
+            if int(content_length[0]) > max_size:
+                raise HttpError(413, Headers(connection="close"))
+
+        body = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        buffer = memoryview(bytearray(io.DEFAULT_BUFFER_SIZE))
+        body_size = 0
+
+        try:
+            while True:
+                count = await self.body_reader.readinto(buffer)
+
+                if not count:
+                    break
+
+                body_size += count
+
+                if max_size is not None and body_size > max_size:
+                    raise HttpError(413, Headers(connection="close"))
+
+                body.write(buffer[:count])
+
+        except BaseException:
+            body.close()
+            raise
+
+        body.seek(0)
+
+        return body
+
     async def can_continue(self):
         """Checks if the validity of the request may be asserted before
         reading the payload body.
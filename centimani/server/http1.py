@@ -1,76 +1,443 @@
 import asyncio
+import base64
+import binascii
+import collections
 import logging
 import os
 import re
 
-from datetime import datetime
-from urllib.parse import unquote_plus, parse_qs
-
 from centimani.errors import HttpError
-from centimani.headers import Headers, HeaderParseError
+from centimani.headers import Headers, HeaderParseError, LazyHeaders
+from centimani.headers import encode_fields
 from centimani.streamutils import BufferedBodyReader, ChunkedBodyReader
+from centimani.streamutils import ChunkedBodyWriter, IdentityBodyWriter
+from centimani.streamutils import DiscardedBodyWriter
+from centimani.streamutils import InvalidChunkError
 from centimani.utils import HTTP_STATUSES, SUPPORTED_METHODS
-from .router import RoutingError
+from .compression import CompressedBodyWriter
 from .handlers import Request, Response
 from .handlers import Connection, ProtocolHandler
 
 
 _LOGGER = logging.getLogger(__name__)
 
-_REQUEST_LINE = rb"""
-^
-([A-Z]+)
-[ \t]+
-(\*|/(?:%(segment)b(?:/%(segment)b)*/?)?)(?:\?(%(query)b))?
-[ \t]+
-HTTP/(\d+\.\d+)
-$
-""" % {
-    b"segment": rb"(?:[-._~A-Za-z0-9!$&'()*+,;=:@]|%[0-9A-F]{2})+",
-    b"query": rb"(?:[-._~A-Za-z0-9!$&'()*+,;=:@/?]|%[0-9A-F]{2})*"
+# characters allowed in a request target, as defined in RFC 3986, the
+# percent encoded values are checked separately
+TARGET_CHARS = (
+    b"-._~ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    b"!$&'()*+,;=:@/?%"
+)
+
+# a "%" not followed by two uppercase hexadecimal digits
+INVALID_PERCENT_REGEX = re.compile(rb"%(?![0-9A-F]{2})")
+
+SEPARATOR_REGEX = re.compile(rb"[ \t]+")
+
+# responses sent without content-length, as they never have a body
+NO_BODY_STATUSES = frozenset((204, 304))
+
+# methods of the requests handled concurrently by pipelining connections
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+# maximum number of requests handled at once by a pipelining connection
+DEFAULT_PIPELINE_DEPTH = 16
+
+# response data buffered by a pipelined request before waiting for the
+# previous responses to be sent
+DEFAULT_SLOT_BUFFER_SIZE = 1 << 16
+
+# response sent to the requests upgraded to cleartext HTTP/2
+SWITCHING_PROTOCOLS = (
+    b"HTTP/1.1 101 Switching Protocols\r\n"
+    b"Connection: Upgrade\r\n"
+    b"Upgrade: h2c\r\n"
+    b"\r\n"
+)
+
+# a switch to cleartext HTTP/2, with the upgraded request and the
+# HTTP2-Settings payload it was sent with, both None if the connection
+# preface was sent with prior knowledge
+H2cUpgrade = collections.namedtuple("H2cUpgrade", ("request", "settings"))
+
+# encoded "server" header lines, by server agent
+_SERVER_FIELDS = {}
+
+# pre-encoded status lines of all the known HTTP statuses
+STATUS_LINES = {
+    status: "HTTP/1.1 {0} {1}\r\n".format(status, reason).encode("ascii")
+    for status, reason in HTTP_STATUSES.items()
 }
 
-REQUEST_LINE_REGEX = re.compile(_REQUEST_LINE, re.VERBOSE)
+
+def encode_server_field(server_agent):
+    """Returns the "server" header line sent with responses."""
+    server_field = _SERVER_FIELDS.get(server_agent)
+
+    if server_field is None:
+        buffer = bytearray()
+        encode_fields((("server", server_agent),), buffer)
+        server_field = _SERVER_FIELDS[server_agent] = bytes(buffer)
+
+    return server_field
+
+
+def parse_request_line(request_line):
+    """Returns the method, the raw target and the version of
+    ``request_line``, or None if it is malformed.
+
+    A request line is well formed if and only if:
+    - the method is made of uppercase letters
+    - the target is "*", or an absolute path and an optional query
+      matching the format defined in RFC 3986
+    - the version string is in the form "HTTP/1.1"
+    - for security reasons, the percent encoded values for "/" and
+      "\\", respectively %2F and %5C, are not present in the target.
+    """
+    parts = request_line.split(b" ")
+
+    if len(parts) != 3 or b"\t" in request_line:
+        # the parts may be separated by several spaces or tabs
+        parts = SEPARATOR_REGEX.split(request_line)
+
+        if len(parts) != 3:
+            return None
+
+    method, target, version = parts
+
+    if not (method.isalpha() and method.isupper()):
+        return None
+
+    if version[:5] != b"HTTP/":
+        return None
+
+    major, _, minor = version[5:].partition(b".")
+
+    if not (major.isdigit() and minor.isdigit()):
+        return None
+
+    if target != b"*" and not is_target_valid(target):
+        return None
+
+    return method.decode("ascii"), target, version[5:].decode("ascii")
+
+
+def is_target_valid(target):
+    """Returns True if ``target`` is an absolute path and an optional
+    query, matching the format defined in RFC 3986, without the percent
+    encoded values of "/" and "\\"."""
+    if target[:1] != b"/" or target.translate(None, TARGET_CHARS):
+        return False
+
+    path, _, _ = target.partition(b"?")
+
+    if b"//" in path:
+        return False
+
+    if b"%" in target and (
+            INVALID_PERCENT_REGEX.search(target)
+            or b"%2F" in target
+            or b"%5C" in target):
+        return False
+
+    return True
 
 
 class Http1Connection(Connection):
-    """Handles HTTP/1.x connections."""
+    """Handles HTTP/1.x connections.
+
+    If the server enables pipelining, requests already sent by the
+    client are received while the previous ones are handled, see
+    ``_listen_pipelined``.
+
+    If the server enables h2c, the connection is handed over to the
+    "h2" connection of the server protocol map when the client switches
+    to HTTP/2.
+    """
 
     def __init__(self, server, reader, writer, peername):
         super().__init__(server, reader, writer, peername, _LOGGER)
+
+        self._server_field = encode_server_field(server.server_agent)
         self._pipeline = Http1Pipeline(self)
 
+        # limits the time waiting for data while reading request bodies
+        reader.set_read_timeout(server.timers, self._pipeline.timeout)
+
     async def listen(self):
         """Start listening to requests, using a pipeline."""
 
         self._logger.info("connection ready")
 
-        while self._pipeline.keep_alive:
-            try:
-                await self._pipeline.process_request()
-            except ConnectionError:
-                break
+        if self._server.pipelining:
+            await self._listen_pipelined()
+        else:
+            while self._pipeline.keep_alive:
+                try:
+                    await self._pipeline.process_request()
+                except (ConnectionError, asyncio.TimeoutError):
+                    break
+
+        self._pipeline.cancel_timers()
+        upgrade = self._pipeline.upgrade
+
+        if upgrade is not None:
+            connection_factory = self._server.protocol_map["h2"]
+            connection = connection_factory(
+                self._server, self._reader, self._writer, self._peername
+            )
+            await connection.listen(upgrade)
+            return
 
         self._logger.info("connection closing")
+        self._reader.set_read_timeout(None, None)
+
         if not self._writer.is_closing():
             self.close()
 
+    async def _listen_pipelined(self):
+        """Listen to requests, each one processed by its own pipeline.
+
+        The next request is received as soon as the previous one is,
+        when it has a safe method and no body, so that the requests
+        pipelined by the client are handled concurrently, up to
+        ``DEFAULT_PIPELINE_DEPTH``. Other requests are handled after the
+        previous ones are over. Responses are sent in the order of the
+        requests, through a ``_ResponseSlot`` per request.
+        """
+        tasks = collections.deque()
+        previous = None
+
+        while True:
+            while tasks and tasks[0].done():
+                tasks.popleft()
+
+            if len(tasks) >= DEFAULT_PIPELINE_DEPTH:
+                await asyncio.wait((tasks[0],))
+                continue
+
+            slot = _ResponseSlot(self._writer, previous, self._loop)
+            pipeline = Http1Pipeline(self, slot=slot)
+            task = self._loop.create_task(pipeline.process_request())
+            tasks.append(task)
+            previous = slot
+
+            # wait until the request is received, or its processing over
+            await slot.received
+
+            if not slot.concurrent:
+                await asyncio.wait((task,))
+
+            if not pipeline.keep_alive or slot.closed:
+                break
+
+        if tasks:
+            await asyncio.wait(tasks)
+
+        for task in tasks:
+            if not task.cancelled() and task.exception() is not None:
+                error = task.exception()
+                if not isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+                    self._logger.error(
+                        "pipelined request failed", exc_info=error
+                    )
+
+
+class _ResponseSlot:
+    """The writer of a pipelined request, that buffers its response until
+    the responses of the previous requests are sent.
+
+    The slot at the head of the queue writes through. When it is over,
+    the buffered responses of the following slots are sent at once,
+    with the writer corked, up to the first slot still in progress,
+    that becomes the head.
+    """
+
+    __slots__ = (
+        "_writer", "_buffers", "_size", "_head", "_next",
+        "_finished", "_released", "_keep_alive",
+        "received", "concurrent", "closed",
+    )
+
+    def __init__(self, writer, previous, loop):
+        self._writer = writer
+        self._buffers = []
+        self._size = 0
+        self._head = loop.create_future()
+        self._next = None
+        self._finished = False
+        self._released = False
+        self._keep_alive = True
+        self.received = loop.create_future()
+        self.concurrent = False
+        self.closed = False
+
+        if previous is None or previous._released:
+            self._promote()
+        elif previous.closed:
+            self._close()
+        else:
+            previous._next = self
+
+    def is_closing(self):
+        return self.closed or self._writer.is_closing()
+
+    def write(self, data):
+        if self._buffers is None:
+            if not self.is_closing():
+                self._writer.write(data)
+        elif not self.closed:
+            self._buffers.append(bytes(data))
+            self._size += len(data)
+
+    def writelines(self, buffers):
+        if self._buffers is None:
+            if not self.is_closing():
+                self._writer.writelines(buffers)
+        else:
+            for data in buffers:
+                self.write(data)
+
+    async def drain(self):
+        """Wait for the response to be sent if too much data is
+        buffered."""
+        if self._buffers is not None:
+            if self._size < DEFAULT_SLOT_BUFFER_SIZE:
+                return
+            await self._head
+
+        await self._writer.drain()
+
+    async def sendfile(self, file, offset=0, count=None):
+        """Send the file once the previous responses are sent."""
+        await self._head
+        await self._writer.sendfile(file, offset, count)
+
+    async def start(self, concurrent):
+        """Called once the request is received. A request that is not
+        handled concurrently waits for the previous ones to be over."""
+        self.concurrent = concurrent
+
+        if not self.received.done():
+            self.received.set_result(None)
+
+        if not concurrent:
+            await self._head
+
+    def finish(self, keep_alive):
+        """Called once the request processing is over."""
+        self._finished = True
+        self._keep_alive = keep_alive
+
+        if not self.received.done():
+            self.received.set_result(None)
+
+        if self._head.done() and not self.closed:
+            self._release()
+
+    def _promote(self):
+        """Make this slot the head, and send the buffered responses."""
+        writer = self._writer
+        writer.cork()
+
+        try:
+            slot = self
+
+            while slot is not None:
+                buffers, slot._buffers = slot._buffers, None
+
+                if buffers and not writer.is_closing():
+                    writer.writelines(buffers)
+
+                slot._head.set_result(None)
+
+                if not slot._finished:
+                    break
+
+                slot = slot._release(promote=False)
+        finally:
+            writer.uncork()
+
+    def _release(self, promote=True):
+        """Release this finished head slot, returns the next slot, or
+        promotes it if ``promote`` is True."""
+        next_slot = self._next
+        self._released = True
+
+        if not self._keep_alive:
+            # no response can follow, close the following slots
+            while next_slot is not None:
+                next_slot._close()
+                next_slot = next_slot._next
+            return None
+
+        if next_slot is not None and promote:
+            next_slot._promote()
+
+        return next_slot
+
+    def _close(self):
+        self.closed = True
+        self._buffers = None
+
+        if not self._head.done():
+            self._head.set_exception(
+                ConnectionResetError("pipelined response cancelled")
+            )
+            # the exception may never be retrieved
+            self._head.exception()
+
 
 class Http1Pipeline(ProtocolHandler):
     """This transport implements functions for receiving HTTP requests
     and send HTTP responses.
+
+    A pipeline processes the requests of its connection one after the
+    other, unless it is given a ``_ResponseSlot`` by a pipelining
+    connection, for a single request.
     """
 
-    def __init__(self, connection, timeout=60):
+    def __init__(self, connection, timeout=60, slot=None):
         super().__init__(connection)
         self._timeout = timeout
         self._keep_alive = True
         self._client_version = "1.0"
+        self._body_writer = None
+        self._slot = slot
+        self._upgrade = None
+
+        # cleartext HTTP/2 is not supported by pipelined requests, nor
+        # by the callback driven protocol
+        self._h2c = (
+            self._server.h2c and slot is None
+            and isinstance(connection, Http1Connection)
+        )
+
+        self._clock = self._server.clock
+        self._server_field = connection._server_field
+
+        # the header timer is armed while waiting for a request header,
+        # including between requests
+        self._reading_header = False
+        self._header_timer = self._server.timers.timer(self._header_timed_out)
+
+    @property
+    def _writer(self):
+        if self._slot is not None:
+            return self._slot
+        return self._connection._writer
 
     @property
     def timeout(self):
         return self._timeout
 
+    def cancel_timers(self):
+        """Cancel the timeouts of the pipeline."""
+        self._header_timer.cancel()
+
+    def _header_timed_out(self):
+        if self._reading_header:
+            self._reader.interrupt(asyncio.TimeoutError())
+
     @property
     def keep_alive(self):
         return self._keep_alive
@@ -79,6 +446,59 @@ class Http1Pipeline(ProtocolHandler):
     def client_version(self):
         return self._client_version
 
+    @property
+    def upgrade(self):
+        """The ``H2cUpgrade`` of the connection once the client switched
+        to cleartext HTTP/2, or None."""
+        return self._upgrade
+
+    def _h2c_settings(self):
+        """Returns the decoded HTTP2-Settings of the current request if
+        it is upgraded to cleartext HTTP/2, or None.
+
+        Requests with a body are not upgraded.
+        """
+        headers = self._request.headers
+
+        if "h2c" not in headers.get("upgrade", ()):
+            return None
+
+        settings = headers.get("http2-settings", ())
+        connection = {token.lower() for token in headers.get("connection", ())}
+
+        if (len(settings) != 1 or "upgrade" not in connection
+                or "http2-settings" not in connection
+                or headers.get("content-length") != ["0"]):
+            return None
+
+        value = settings[0]
+
+        try:
+            # base64url encoded, without padding
+            payload = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        except (binascii.Error, ValueError):
+            return None
+
+        if len(payload) % 6:
+            return None
+
+        return payload
+
+    async def _switch_to_h2c(self, settings):
+        """Accept the upgrade of the current request to cleartext
+        HTTP/2."""
+        self._logger.info("switching to h2c")
+        self._keep_alive = False
+
+        headers = self._request.headers
+        for name in ("connection", "upgrade", "http2-settings"):
+            del headers[name]
+
+        self._upgrade = H2cUpgrade(self._request, settings)
+
+        self._writer.write(SWITCHING_PROTOCOLS)
+        await self._writer.drain()
+
     def _create_body_reader(self):
         """Create the current request body reader, based on its header
         fields informations.
@@ -89,7 +509,7 @@ class Http1Pipeline(ProtocolHandler):
         """
         headers = self._request.headers
 
-        transfert_encoding = headers.get("transfert-encoding", [])
+        transfert_encoding = headers.get("transfer-encoding", [])
         content_length = headers.get("content-length", [])
 
         assert "chunked" in transfert_encoding or content_length
@@ -106,67 +526,260 @@ class Http1Pipeline(ProtocolHandler):
             if transfert_encoding[:-1]:
                 raise NotImplementedError
 
-            body_reader = ChunkedBodyReader(self.reader)
+            body_reader = ChunkedBodyReader(self._reader)
 
         return body_reader
 
+    def _build_response_header(
+            self,
+            status,
+            headers,
+            content_length=None,
+            transfer_encoding=None):
+        """Returns the serialized response header.
+
+        This function will add the date, server, connection and
+        content-length or transfer-encoding header fields to the given
+        header fields, and the static header fields of the request
+        handler, if any.
+        """
+        response_header = bytearray(STATUS_LINES[status])
+
+        # User defined "connection" header for closing connection
+        # after response.
+        if headers:
+            if self._keep_alive and "close" in headers.pop("connection", []):
+                self._keep_alive = False
+
+        if not headers or "date" not in headers:
+            response_header += self._clock.date_field
+
+        if not headers or "server" not in headers:
+            response_header += self._server_field
+
+        if self._keep_alive:
+            response_header += b"Connection: keep-alive\r\n"
+        else:
+            response_header += b"Connection: close\r\n"
+
+        static_headers = None
+        if self._handler is not None and self._error is None:
+            static_headers = self._handler.compiled_headers()
+
+        if static_headers is not None:
+            if headers and not static_headers.headers.keys().isdisjoint(
+                    headers):
+                # given header fields take precedence
+                merged_headers = Headers()
+                merged_headers.update(static_headers.headers)
+                merged_headers.update(headers)
+                headers = merged_headers
+            else:
+                response_header += static_headers.block
+
+        if headers:
+            if content_length is not None or transfer_encoding is not None:
+                if "content-length" in headers or (
+                        "transfer-encoding" in headers):
+                    filtered_headers = Headers()
+                    for name, values in headers.items():
+                        if name not in ("content-length", "transfer-encoding"):
+                            filtered_headers[name] = values
+                    headers = filtered_headers
+
+            encode_fields(headers.fields(), response_header)
+
+        if content_length is not None and status not in NO_BODY_STATUSES:
+            response_header += b"Content-Length: %d\r\n" % content_length
+        elif transfer_encoding is not None:
+            response_header += b"Transfer-Encoding: "
+            response_header += transfer_encoding.encode("ascii")
+            response_header += b"\r\n"
+
+        # HTTP header trailing blank line
+        response_header += b"\r\n"
+
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(response_header.decode("ascii"))
+
+        return response_header
+
     async def send_response(self, status, headers=None, body=None):
         """Send an HTTP response.
 
         This function will add the date, server and connection header
         fields to the given hedaer fields.
+
+        ``body`` may be a bytes-like object, or an iterable or
+        asynchronous iterable of ``bytes``, that will be sent with
+        ``start_response``.
         """
         assert self._response is None
 
-        reason = HTTP_STATUSES[status]
-        status_line = "HTTP/1.1 {0} {1}\r\n".format(status, reason)
+        fixed_body = self._fixed_body(body)
 
-        # User defined "connection" header for closing connection
-        # after response.
-        if headers:
-            if self._keep_alive and "close" in headers.pop("connection", []):
-                self._keep_alive = False
+        if fixed_body is None:
+            await self._send_streaming_response(status, headers, body)
+            return
+
+        body = fixed_body
+        content_length = len(body)
+
+        if body:
+            coding, headers = self._negotiate_compression(headers, len(body))
+
+            if coding is not None:
+                compression = self._server.compression
+                body = await compression.compress(coding, body, self._loop)
+                content_length = len(body)
 
-        response_headers = Headers(
-            date=datetime.utcnow(),
-            server=self._server.server_agent,
-            connection="keep-alive" if self._keep_alive else "close"
+        if self._cache_key is not None or self._flight is not None:
+            self._store_response(status, headers, body)
+
+        response_header = self._build_response_header(
+            status, headers, content_length
         )
 
-        if headers is not None:
-            response_headers.update(headers)
+        if body and not self._omits_body():
+            self._writer.writelines((response_header, body))
+        else:
+            self._writer.write(response_header)
+
+        await self._writer.drain()
+
+        if status >= 200:
+            self._response = Response(status, header=response_header)
+
+    async def _send_cached_response(self, cached_response):
+        """Send a response of the server response cache, or the shared
+        response of coalesced requests.
+
+        The date, server, connection, age and content-length header
+        fields are added to its serialized header fields.
+        """
+        assert self._response is None
+
+        status = cached_response.status
+        body = cached_response.body
 
-        if body is None:
-            response_headers.set("content-length", 0)
-        elif isinstance(body, bytes):
-            response_headers.set("content-length", len(body))
+        response_header = bytearray(STATUS_LINES[status])
+        response_header += self._clock.date_field
+
+        if not cached_response.has_server:
+            response_header += self._server_field
+
+        if self._keep_alive:
+            response_header += b"Connection: keep-alive\r\n"
         else:
-            raise Exception("body must be bytes or None")
+            response_header += b"Connection: close\r\n"
 
-        response_header = bytearray(status_line.encode("ascii"))
+        response_header += cached_response.block
 
-        for name, content in response_headers.fields():
-            field_line = "{0}: {1}\r\n".format(name.title(), content)
-            response_header.extend(field_line.encode("ascii"))
+        age = cached_response.age(self._clock.time)
+        if age is not None:
+            response_header += b"Age: %d\r\n" % age
 
-        # HTTP header trailing blank line
-        response_header.extend(b"\r\n")
+        if status not in NO_BODY_STATUSES:
+            response_header += b"Content-Length: %d\r\n" % len(body)
 
-        self._logger.debug(response_header.decode("ascii"))
+        response_header += b"\r\n"
 
-        self._writer.write(response_header)
+        if body and not self._omits_body():
+            self._writer.writelines((response_header, body))
+        else:
+            self._writer.write(response_header)
+
+        await self._writer.drain()
 
-        if body is not None:
-            self._writer.write(body)
+        self._response = Response(status, header=response_header)
 
+    async def start_response(self, status, headers=None):
+        """Send the response header, and returns a body writer used to
+        send the payload body incrementally.
+
+        The body is sent with the chunked transfer encoding, unless a
+        content-length header field is given. HTTP/1.0 clients receive
+        the body as is, and the connection is closed after it. The body
+        of a response to a HEAD request is discarded.
+        """
+        assert self._response is None
+
+        body_size = None
+        if headers and headers.get("content-length"):
+            body_size = int(headers["content-length"][0])
+
+        coding, headers = self._negotiate_compression(headers, body_size)
+
+        content_length = headers.get("content-length") if headers else None
+
+        if self._omits_body():
+            # the header ends the response, without transfer-encoding
+            body_writer = DiscardedBodyWriter()
+            transfer_encoding = None
+            coding = None
+        elif content_length:
+            body_writer = IdentityBodyWriter(self._writer)
+            transfer_encoding = None
+        elif self._client_version >= "1.1":
+            body_writer = ChunkedBodyWriter(self._writer)
+            transfer_encoding = "chunked"
+        else:
+            # body delimited by the end of the connection
+            self._keep_alive = False
+            body_writer = IdentityBodyWriter(self._writer)
+            transfer_encoding = None
+
+        response_header = self._build_response_header(
+            status, headers, transfer_encoding=transfer_encoding
+        )
+
+        self._writer.write(response_header)
         await self._writer.drain()
 
+        if coding is not None:
+            body_writer = CompressedBodyWriter(
+                body_writer,
+                self._server.compression,
+                coding,
+                self._loop
+            )
+
+        self._response = Response(status, header=response_header)
+        self._body_writer = body_writer
+
+        return body_writer
+
+    async def send_file(self, status, headers, file, offset=0, count=None):
+        """Send an HTTP response, with the content of ``file`` as body.
+
+        The file is sent with ``StreamWriter.sendfile``, without being
+        read in memory when possible.
+        """
+        assert self._response is None
+
+        if count is None:
+            count = os.fstat(file.fileno()).st_size - offset
+
+        response_header = self._build_response_header(
+            status, headers, count
+        )
+
+        self._writer.write(response_header)
+
+        if self._omits_body():
+            await self._writer.drain()
+        else:
+            await self._writer.sendfile(file, offset, count)
+
         if status >= 200:
-            self._response = Response(status, response_headers)
+            self._response = Response(status, header=response_header)
 
-    async def process_request(self):
+    async def process_request(self, header=None):
         """Receive a request, then send an appropriate response.
 
+        The request header may be given as ``header``, if it was already
+        received, without its trailing blank line.
+
         This coroutine will returns when the request processing is
         over.
         """
@@ -174,46 +787,109 @@ class Http1Pipeline(ProtocolHandler):
         self._body_reader = None
         self._handler = None
         self._response = None
+        self._body_writer = None
         self._error = None
 
         try:
-            self._request = await self._receive_request()
+            self._request = await self._receive_request(header)
             self._body_reader = self._create_body_reader()
+
+            if self._h2c:
+                settings = self._h2c_settings()
+
+                if settings is not None:
+                    await self._switch_to_h2c(settings)
+                    return
+
+            if self._slot is not None:
+                self._header_timer.cancel()
+                await self._slot.start(
+                    self._keep_alive
+                    and self._request.method in SAFE_METHODS
+                    and self._request.headers.get("content-length") == ["0"]
+                )
+
             await self._handle_request()
 
+            # ends a streamed body left open by the handler
+            if self._body_writer and not self._body_writer.is_complete:
+                await self._body_writer.close()
+
         except EOFError:
             self._keep_alive = False
 
         except HttpError as error:
             self._error = error
-            await self.send_response(error.code, error.headers)
+
+            if self._body_writer is None:
+                await self.send_response(error.code, error.headers)
+            else:
+                # response already started, the connection is closed
+                self._keep_alive = False
 
         except ConnectionError:
             self._logger.exception("connection error occurred")
             raise
 
+        except asyncio.TimeoutError:
+            # request body not received in time
+            self._logger.info("request body timeout")
+            self._error = HttpError(408)
+            self._keep_alive = False
+
+            if self._body_writer is None and self._response is None:
+                await self.send_error(408)
+
+        except InvalidChunkError:
+            # the end of the request body can not be found
+            self._logger.info("malformed chunked request body")
+            self._error = HttpError(400)
+            self._keep_alive = False
+
+            if self._body_writer is None and self._response is None:
+                await self.send_error(400)
+
         except Exception:
             self._logger.exception("unexpected error occurred")
             self._error = HttpError(500)
-            await self.send_error(500)
 
-        finally:
-            if self._keep_alive:
-                await self.cleanup()
+            if self._body_writer is None:
+                await self.send_error(500)
+            else:
+                self._keep_alive = False
 
-    async def _receive_request(self):
-        """Coroutine called by ``run`` in order the receive and parse
-        a new request.
-        """
-        tmp = self._reader.read_until(b"\r\n\r\n")
+        finally:
+            try:
+                if self._keep_alive:
+                    await self.cleanup()
+            finally:
+                if self._slot is not None:
+                    self._header_timer.cancel()
+                    self._slot.finish(self._keep_alive)
+
+    async def _receive_header(self):
+        """Receive a request header, within the pipeline timeout."""
+        self._reading_header = True
+        self._header_timer.start(self._timeout)
 
         try:
-            header = await asyncio.wait_for(tmp, self._timeout)
+            return await self._reader.read_until(b"\r\n\r\n")
         except asyncio.TimeoutError as error:
             self._keep_alive = False
             raise HttpError(408) from error
+        finally:
+            self._reading_header = False
+            # the timer may have expired after the header was received
+            self._reader.clear_interrupt()
+
+    async def _receive_request(self, header=None):
+        """Coroutine called by ``run`` in order the receive and parse
+        a new request, or only parse it if ``header`` is given.
+        """
+        if header is None:
+            header = await self._receive_header()
 
-        request_line, *headers_lines = header.split(b"\r\n")
+        request_line, _, header_block = header.partition(b"\r\n")
 
         if not request_line:
             # No request line = EOF, so we close the connection
@@ -226,70 +902,53 @@ class Http1Pipeline(ProtocolHandler):
         # Request line parsing #
         #----------------------#
 
-        match = REQUEST_LINE_REGEX.match(request_line)
-
-        # A request is well formed if and only if:
-        # - the version string is in the form "HTTP/1.1"
-        # - the url match the format defined in RFC 3986
-        # - for security reasons, the percent encoded values for "/" and
-        #  "\", respectively %2F and %5C cannot be present in the url.
-        is_malformed = (
-            not match
-            or (b"%2F" in request_line or b"%5C" in request_line)
-        )
+        request_line = parse_request_line(request_line)
 
-        if is_malformed:
+        if request_line is None:
             # Bad request
             self._logger.info("request line malformed")
             raise HttpError(400)
 
-        self._logger.debug(match.groups(b""))
+        method, target, version = request_line
 
-        tmp = (s.decode("ascii") for s in match.groups(b""))
-        method, path, query, version = tmp
-
-        path = unquote_plus(path)
-
-        if query:
-            try:
-                query = parse_qs(query, strict_parsing=True)
-            except ValueError:
-                # malformed - ignore the query
-                self.logger.info("malformed query")
-                query = {}
-        else:
-            query = {}
+        if self._h2c and request_line == ("PRI", b"*", "2.0"):
+            # start of the HTTP/2 connection preface, sent with prior
+            # knowledge, there is no more HTTP/1 request
+            self._logger.info("switching to h2c with prior knowledge")
+            self._upgrade = H2cUpgrade(None, None)
+            raise EOFError
 
         # upgrade client_version if needed
         if self._client_version < version:
             self._client_version = version
             self._logger.info("client version set to %s", version)
 
-        request = Request(method, path, query)
-
         #-----------------------#
         # Header fields parsing #
         #-----------------------#
 
         try:
-            request.headers.parse_lines(headers_lines)
+            headers = LazyHeaders(header_block)
         except HeaderParseError as error:
             # Bad request
             self._logger.info("malformed header field")
             raise HttpError(400)
 
+        # the path and the query are decoded on demand
+        request = Request(method, target=target, headers=headers)
+
         self._logger.debug(request.headers)
 
         #-------------------------------------#
         # Body length and encoding validation #
         #-------------------------------------#
 
-        transfert_encoding = request.headers.get("transfert-encoding", [])
+        transfert_encoding = request.headers.get("transfer-encoding", [])
         content_length = request.headers.get("content-length", [])
 
         if transfert_encoding:
             if content_length:
-                msg = "transfert-encoding and content-length headers present"
+                msg = "transfer-encoding and content-length headers present"
                 self._logger.info(msg)
                 del request.headers["content-length"]
 
@@ -326,60 +985,23 @@ class Http1Pipeline(ProtocolHandler):
 
         return request
 
-    async def _handle_request(self):
-        """This coroutine, called by ``run``, will route the request
-        to the associated  request handler.
-        """
-        #-----------------#
-        # Request routing #
-        #-----------------#
-
-        method = self._request.method
-
-        try:
-            tmp = self._server.router.find_route(self._request.path)
-            request_handler_factory, args, kwargs = tmp
-        except RoutingError as error:
-            # No route finded, send 404 not find error
-            self._logger.info("route not find")
-            raise HttpError(404) from error
-
-        allowed_methods = request_handler_factory.allowed_methods()
-        if method not in allowed_methods:
-            # Method not implemented, send error 405 not implemented
-            self._logger.info("method not implemented")
-            error_headers = Headers(allowed=allowed_methods)
-            raise HttpError(405, error_headers)
-
-        #-------------------------#
-        # Request handler calling #
-        #-------------------------#
-
-        self._handler = request_handler_factory(self)
-        method_handler = getattr(self._handler, method.lower())
-
-        can_continue = await self.handler.can_continue()
-
-        if not can_continue:
-            if "100-continue" in self._request.headers.get("except", []):
-                if not self._response:
-                    # if the can_continue method does not send an error,
-                    # send a 417 error.
-                    self._logger.info("expectation failed")
-                    raise HttpError(417)
-
-        if "100-continue" in self._request.headers.get("except", []):
-            await self._handler.send_response(100)
-
-        tmp = method_handler(*args, **kwargs)
-        await self._loop.create_task(tmp)
-
     async def cleanup(self):
         """Cleanup the transport after each exchange.
 
-        Request body not completely read will be read into devnull.
+        Request body not completely read will be discarded, if it is not
+        larger than the server drain budget. Otherwise, the connection is
+        closed.
         """
         if self._body_reader and not self._body_reader.is_complete:
-            with open(os.devnull, "wb") as null:
-                async for data in self._body_reader:
-                    null.write(data)
+            budget = self._server.drain_budget
+
+            try:
+                is_complete = await self._body_reader.discard(budget)
+            except (EOFError, asyncio.IncompleteReadError, InvalidChunkError):
+                self._logger.info("request body could not be drained")
+                self._keep_alive = False
+                return
+
+            if not is_complete:
+                self._logger.info("request body too large to be drained")
+                self._keep_alive = False
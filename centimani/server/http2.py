@@ -0,0 +1,619 @@
+"""This module defines ``Http2Connection``, the HTTP/2 connections of the
+server.
+
+HTTP/2 is negotiated with ALPN over TLS ("h2"), or used in cleartext
+("h2c") when the server enables it: the client either upgrades an
+HTTP/1.1 request, or sends the connection preface with prior knowledge.
+Both cases are detected by ``Http1Connection``, that hands over its
+streams to an ``Http2Connection``.
+
+Each stream is handled by an ``Http2StreamHandler``, the
+``ProtocolHandler`` of a single request, in its own task, so that the
+requests of a connection are processed concurrently.
+"""
+
+import asyncio
+import logging
+import os
+import re
+
+from centimani.errors import HttpError
+from centimani.headers import Headers, UNSPLITTED_FIELD_NAMES
+from centimani.http2 import Http2Error, Http2Session, Http2Stream
+from centimani.http2 import CONNECTION_FIELD_NAMES, PREFACE
+from centimani.http2 import INTERNAL_ERROR, NO_ERROR, PROTOCOL_ERROR
+from centimani.http2 import SETTINGS_MAX_CONCURRENT_STREAMS
+from centimani.streamutils import DiscardedBodyWriter
+from .compression import CompressedBodyWriter
+from .handlers import Connection, ProtocolHandler, Request, Response
+from .http1 import NO_BODY_STATUSES, is_target_valid
+
+
+_LOGGER = logging.getLogger(__name__)
+
+# maximum number of streams opened at once by a client
+DEFAULT_MAX_CONCURRENT_STREAMS = 100
+
+# size of the DATA sent at once by ``send_file``
+DEFAULT_FILE_CHUNK_SIZE = 1 << 16
+
+REQUEST_PSEUDO_HEADERS = frozenset((
+    ":method", ":scheme", ":authority", ":path",
+))
+
+# characters forbidden in field names, that must be lowercase tokens,
+# and in field values
+INVALID_NAME_REGEX = re.compile(r"[^-a-z0-9!#$%&'*+.^_`|~]")
+INVALID_VALUE_REGEX = re.compile(r"[\r\n\x00]")
+
+_STATUS_VALUES = {}
+
+
+class Http2Connection(Connection, Http2Session):
+    """Handles HTTP/2 connections.
+
+    The connection is closed after ``timeout`` seconds without any open
+    stream, and the streams wait at most ``timeout`` seconds for the
+    data of their request bodies.
+    """
+
+    def __init__(self, server, reader, writer, peername, timeout=60):
+        super().__init__(server, reader, writer, peername, _LOGGER)
+
+        self._init_session(
+            client=False,
+            timers=server.timers,
+            settings={
+                SETTINGS_MAX_CONCURRENT_STREAMS: DEFAULT_MAX_CONCURRENT_STREAMS,
+            }
+        )
+
+        self._timeout = timeout
+        self._tasks = set()
+        self._idle_timer = server.timers.timer(self._idle_timed_out)
+
+        # frames are waited for without timeout, the connection is
+        # closed by the idle timer instead
+        reader.set_read_timeout(None, None)
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def close(self):
+        """Send the pending frames, then close the connection."""
+        self._flush()
+        super().close()
+
+    async def listen(self, upgrade=None):
+        """Receive the connection preface, then handle the frames of
+        the connection.
+
+        ``upgrade`` is given by an ``Http1Connection`` switching to
+        HTTP/2, it holds the request sent with the upgrade, if any.
+        """
+        self._logger.info("connection ready")
+        self._idle_timer.start(self._timeout)
+
+        if upgrade is not None and upgrade.request is None:
+            # the request line of the preface was already received
+            expected_preface = PREFACE[len(b"PRI * HTTP/2.0\r\n\r\n"):]
+        else:
+            expected_preface = PREFACE
+
+        try:
+            preface = await self._reader.read_exactly(len(expected_preface))
+
+            if preface != expected_preface:
+                self._logger.info("invalid connection preface")
+                return
+
+            self._send_preface()
+
+            if upgrade is not None and upgrade.request is not None:
+                self._upgrade_stream(upgrade)
+
+            await self._run_session()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+        finally:
+            self._logger.info("connection closing")
+            self._idle_timer.cancel()
+
+            if not self._writer.is_closing():
+                self.close()
+
+            if self._tasks:
+                await asyncio.wait(self._tasks)
+
+    def _upgrade_stream(self, upgrade):
+        """Open the stream 1, whose request is the upgraded HTTP/1.1
+        request, with the settings it was sent with."""
+        self._apply_settings(upgrade.settings)
+
+        stream = Http2Stream(self, 1, self._timeout)
+        self._streams[1] = stream
+        self._last_stream_id = 1
+        self._remote_stream_end(stream)
+
+        self._start_stream(stream, upgrade.request)
+
+    def _idle_timed_out(self):
+        if not self._streams and not self._writer.is_closing():
+            self._logger.info("idle connection timeout")
+            self._send_goaway(NO_ERROR)
+            self.close()
+
+    def _start_stream(self, stream, request, error=None):
+        handler = Http2StreamHandler(self, stream, request, error)
+        stream.handler = handler
+
+        task = self._loop.create_task(handler.process_request())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        self._idle_timer.cancel()
+
+    def _stream_done(self, stream):
+        """Called when the processing of the request of ``stream`` is
+        over."""
+        if stream.closed:
+            return
+
+        if not stream.local_closed:
+            # the response is incomplete
+            self._reset_stream(stream, INTERNAL_ERROR)
+        elif not stream.remote_closed:
+            # the rest of the request body is not needed
+            self._reset_stream(stream, NO_ERROR)
+
+    #---------------#
+    # Session hooks #
+    #---------------#
+
+    def _stream_opened(self, stream_id, fields, end_stream):
+        request, error = self._create_request(stream_id, fields, end_stream)
+
+        stream = Http2Stream(self, stream_id, self._timeout)
+        self._streams[stream_id] = stream
+
+        if end_stream:
+            self._remote_stream_end(stream)
+
+        self._start_stream(stream, request, error)
+
+    def _headers_received(self, stream, fields, end_stream):
+        if not end_stream:
+            raise Http2Error(PROTOCOL_ERROR, "trailers expected", stream.id)
+
+        trailers = Headers()
+
+        for name, value in fields:
+            if name.startswith(":"):
+                raise Http2Error(
+                    PROTOCOL_ERROR, "pseudo header in trailers", stream.id
+                )
+            trailers.add(name, value)
+
+        self._remote_stream_end(stream, trailers)
+
+    def _stream_closed(self, stream):
+        if not self._streams and not self._going_away:
+            self._idle_timer.start(self._timeout)
+
+    def _create_request(self, stream_id, fields, end_stream):
+        """Returns the request of the header fields of a new stream, and
+        the ``HttpError`` sent in response if it is invalid. Raises an
+        ``Http2Error`` if the header fields are malformed."""
+        pseudo_headers = {}
+        headers = Headers()
+        cookies = []
+
+        for name, value in fields:
+            if INVALID_VALUE_REGEX.search(value):
+                raise Http2Error(PROTOCOL_ERROR, "invalid field value", stream_id)
+
+            if name.startswith(":"):
+                if (headers or cookies or name in pseudo_headers
+                        or name not in REQUEST_PSEUDO_HEADERS):
+                    raise Http2Error(
+                        PROTOCOL_ERROR, "invalid pseudo header", stream_id
+                    )
+
+                pseudo_headers[name] = value
+                continue
+
+            if INVALID_NAME_REGEX.search(name) or not name:
+                raise Http2Error(PROTOCOL_ERROR, "invalid field name", stream_id)
+
+            if name in CONNECTION_FIELD_NAMES or (
+                    name == "te" and value != "trailers"):
+                raise Http2Error(
+                    PROTOCOL_ERROR, "connection specific field", stream_id
+                )
+
+            if name == "cookie":
+                # cookies may be split in several fields
+                cookies.append(value)
+            elif name in UNSPLITTED_FIELD_NAMES:
+                headers.add(name, value)
+            else:
+                headers.add(name, Headers.split_field_content(value))
+
+        method = pseudo_headers.get(":method")
+        path = pseudo_headers.get(":path")
+
+        if not method or not path or ":scheme" not in pseudo_headers:
+            raise Http2Error(
+                PROTOCOL_ERROR, "missing pseudo header", stream_id
+            )
+
+        if cookies:
+            headers.set("cookie", "; ".join(cookies))
+
+        authority = pseudo_headers.get(":authority")
+        if authority and "host" not in headers:
+            headers.set("host", authority)
+
+        if end_stream and "content-length" not in headers:
+            headers.set("content-length", 0)
+
+        target = path.encode("latin-1")
+        request = Request(method, target=target, headers=headers)
+
+        if target != b"*" and not is_target_valid(target):
+            self._logger.info("request target malformed")
+            return request, HttpError(400)
+
+        content_length = headers.get("content-length")
+
+        if content_length and (len(content_length) > 1
+                or not content_length[0].isdigit()):
+            self._logger.info("malformed content-length value")
+            return request, HttpError(400)
+
+        return request, None
+
+
+class Http2BodyWriter:
+    """Sends the body of a response in DATA frames, waiting for the
+    flow control windows."""
+
+    def __init__(self, connection, stream):
+        self._connection = connection
+        self._stream = stream
+        self._body_size = 0
+        self._is_complete = False
+
+    @property
+    def is_complete(self):
+        return self._is_complete
+
+    @property
+    def body_size(self):
+        return self._body_size
+
+    async def write(self, data):
+        """Send ``data``, then wait until the writer is drained."""
+        assert not self._is_complete
+
+        if not data:
+            return
+
+        await self._connection._send_data(self._stream, data)
+        self._body_size += len(data)
+
+    async def close(self, headers=None):
+        """Ends the body, with the trailing ``headers`` if any."""
+        assert not self._is_complete
+
+        self._is_complete = True
+
+        if headers:
+            self._connection._send_headers(
+                self._stream,
+                [(name.lower(), value) for name, value in headers.fields()],
+                end_stream=True
+            )
+            await self._connection._drain()
+        else:
+            await self._connection._send_data(self._stream, b"", True)
+
+
+class Http2StreamHandler(ProtocolHandler):
+    """Receives the request of a stream, and sends its response.
+
+    The request is received by the connection, and given with the
+    ``HttpError`` to send in response if it is invalid.
+    """
+
+    def __init__(self, connection, stream, request, error=None):
+        super().__init__(connection)
+        self._stream = stream
+        self._request = request
+        self._request_error = error
+        self._body_reader = stream.body_reader
+        self._body_writer = None
+
+        self._clock = self._server.clock
+
+    @property
+    def stream(self):
+        return self._stream
+
+    def _build_response_fields(self, status, headers, content_length=None):
+        """Returns the (name, value) pairs of the response header block.
+
+        The date and server header fields are added to the given header
+        fields, and the static header fields of the request handler, if
+        any. The connection specific fields are removed.
+        """
+        status_value = _STATUS_VALUES.get(status)
+        if status_value is None:
+            status_value = _STATUS_VALUES[status] = str(status)
+
+        fields = [(":status", status_value)]
+
+        if not headers or "date" not in headers:
+            fields.append(("date", self._clock.date.decode("ascii")))
+
+        if not headers or "server" not in headers:
+            fields.append(("server", self._server.server_agent))
+
+        static_headers = None
+        if self._handler is not None and self._error is None:
+            static_headers = self._handler.compiled_headers()
+
+        if static_headers is not None:
+            if headers and not static_headers.headers.keys().isdisjoint(
+                    headers):
+                # given header fields take precedence
+                merged_headers = Headers()
+                merged_headers.update(static_headers.headers)
+                merged_headers.update(headers)
+                headers = merged_headers
+            else:
+                fields.extend(static_headers.headers.fields())
+
+        if headers:
+            for name, value in headers.fields():
+                name = name.lower()
+
+                if name in CONNECTION_FIELD_NAMES:
+                    continue
+
+                if content_length is not None and name == "content-length":
+                    continue
+
+                fields.append((name, value))
+
+        if content_length is not None and status not in NO_BODY_STATUSES:
+            fields.append(("content-length", str(content_length)))
+
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(fields)
+
+        return fields
+
+    async def send_response(self, status, headers=None, body=None):
+        """Send an HTTP response.
+
+        ``body`` may be a bytes-like object, or an iterable or
+        asynchronous iterable of ``bytes``, that will be sent with
+        ``start_response``.
+        """
+        assert self._response is None
+
+        fixed_body = self._fixed_body(body)
+
+        if fixed_body is None:
+            await self._send_streaming_response(status, headers, body)
+            return
+
+        body = fixed_body
+        content_length = len(body)
+
+        connection = self._connection
+
+        if status < 200:
+            # informational responses precede the final one
+            fields = self._build_response_fields(status, headers)
+            connection._send_headers(self._stream, fields)
+            await connection._drain()
+            return
+
+        if body:
+            coding, headers = self._negotiate_compression(headers, len(body))
+
+            if coding is not None:
+                compression = self._server.compression
+                body = await compression.compress(coding, body, self._loop)
+                content_length = len(body)
+
+        if self._cache_key is not None or self._flight is not None:
+            self._store_response(status, headers, body)
+
+        fields = self._build_response_fields(status, headers, content_length)
+        self._response = Response(status, headers)
+
+        if self._omits_body():
+            body = None
+
+        connection._send_headers(self._stream, fields, end_stream=not body)
+
+        if body:
+            await connection._send_data(self._stream, body, end_stream=True)
+        else:
+            await connection._drain()
+
+    async def _send_cached_response(self, cached_response):
+        """Send a response of the server response cache, or the shared
+        response of coalesced requests.
+
+        The date, server, age and content-length header fields are added
+        to its stored header fields.
+        """
+        assert self._response is None
+
+        status = cached_response.status
+        body = cached_response.body
+        connection = self._connection
+
+        status_value = _STATUS_VALUES.get(status)
+        if status_value is None:
+            status_value = _STATUS_VALUES[status] = str(status)
+
+        fields = [
+            (":status", status_value),
+            ("date", self._clock.date.decode("ascii")),
+        ]
+
+        if not cached_response.has_server:
+            fields.append(("server", self._server.server_agent))
+
+        fields.extend(cached_response.fields)
+
+        age = cached_response.age(self._clock.time)
+        if age is not None:
+            fields.append(("age", str(age)))
+
+        if status not in NO_BODY_STATUSES:
+            fields.append(("content-length", str(len(body))))
+
+        self._response = Response(status)
+
+        if self._omits_body():
+            body = None
+
+        connection._send_headers(self._stream, fields, end_stream=not body)
+
+        if body:
+            await connection._send_data(self._stream, body, end_stream=True)
+        else:
+            await connection._drain()
+
+    async def start_response(self, status, headers=None):
+        """Send the response header, and returns a body writer used to
+        send the payload body incrementally."""
+        assert self._response is None
+
+        body_size = None
+        if headers and headers.get("content-length"):
+            body_size = int(headers["content-length"][0])
+
+        coding, headers = self._negotiate_compression(headers, body_size)
+
+        fields = self._build_response_fields(status, headers)
+        self._response = Response(status, headers)
+
+        if self._omits_body():
+            # the header ends the stream, the body is discarded
+            self._connection._send_headers(
+                self._stream, fields, end_stream=True
+            )
+            await self._connection._drain()
+
+            self._body_writer = DiscardedBodyWriter()
+            return self._body_writer
+
+        self._connection._send_headers(self._stream, fields)
+        await self._connection._drain()
+
+        body_writer = Http2BodyWriter(self._connection, self._stream)
+
+        if coding is not None:
+            body_writer = CompressedBodyWriter(
+                body_writer,
+                self._server.compression,
+                coding,
+                self._loop
+            )
+
+        self._body_writer = body_writer
+
+        return body_writer
+
+    async def send_file(self, status, headers, file, offset=0, count=None):
+        """Send an HTTP response, with the content of ``file`` as body.
+
+        The file is read in chunks, sent in DATA frames.
+        """
+        assert self._response is None
+
+        if count is None:
+            count = os.fstat(file.fileno()).st_size - offset
+
+        fields = self._build_response_fields(status, headers, count)
+        self._response = Response(status, headers)
+
+        if self._omits_body():
+            count = 0
+
+        connection = self._connection
+        connection._send_headers(self._stream, fields, end_stream=not count)
+
+        file.seek(offset)
+        remaining = count
+
+        while remaining:
+            chunk = file.read(min(remaining, DEFAULT_FILE_CHUNK_SIZE))
+
+            if not chunk:
+                # the file was truncated, the stream is reset
+                raise EOFError("file truncated")
+
+            remaining -= len(chunk)
+
+            await connection._send_data(
+                self._stream, chunk, end_stream=not remaining
+            )
+
+        if not count:
+            await connection._drain()
+
+    async def process_request(self):
+        """Handle the request of the stream, then returns."""
+        try:
+            if self._request_error is not None:
+                raise self._request_error
+
+            await self._handle_request()
+
+            # ends a streamed body left open by the handler
+            if self._body_writer and not self._body_writer.is_complete:
+                await self._body_writer.close()
+
+        except HttpError as error:
+            self._error = error
+            await self._send_error_response(error.code, error.headers)
+
+        except ConnectionError:
+            # the stream, or the connection, was reset
+            self._logger.debug("stream %d reset", self._stream.id)
+
+        except asyncio.TimeoutError:
+            # request body not received in time
+            self._logger.info("request body timeout")
+            self._error = HttpError(408)
+            await self._send_error_response(408)
+
+        except Exception:
+            self._logger.exception("unexpected error occurred")
+            self._error = HttpError(500)
+            await self._send_error_response(500)
+
+        finally:
+            self._connection._stream_done(self._stream)
+
+    async def _send_error_response(self, status, headers=None):
+        """Send an error response, unless a response was already
+        started, in which case the stream will be reset."""
+        if self._response is not None:
+            return
+
+        try:
+            await self.send_response(status, headers)
+        except ConnectionError:
+            pass
@@ -8,22 +8,33 @@ import logging
 import ssl
 
 from centimani import __version__
+from centimani.clock import get_clock
 from centimani.stream import start_server
+from centimani.timers import get_timer_wheel
 from .handlers import RequestHandler
 from .http1 import Http1Connection
+from .http2 import Http2Connection
+from .protocol import BufferedHttp1Protocol, Http1Protocol
 from .router import Router
+from .workers import Supervisor, run_server
 
 
 _LOGGER = logging.getLogger(__name__)
 
+# HTTP/2 is negotiated when "h2" is added, e.g. ("h2", "http/1.1")
 DEFAULT_ALPN_PROTOCOLS = ("http/1.1",)
 
 DEFAULT_PROTOCOL_MAP = {
     "http/1.1" : Http1Connection,
+    "h2" : Http2Connection,
 }
 
 DEFAULT_SERVER_AGENT = "Centimani/{0}".format(__version__)
 
+# maximum number of unread request body bytes discarded in order to keep
+# a connection alive
+DEFAULT_DRAIN_BUDGET = 1 << 20
+
 
 class Server:
     """This class listen to client connections and send them to
@@ -31,6 +42,8 @@ class Server:
 
     Attributes:
     :loop: The manager event loop.
+    :clock: The coarse ``Clock`` of the event loop.
+    :timers: The ``TimerWheel`` of the event loop, used for timeouts.
     :router: The ``Router`` instance used to associate request handlers
         to requests.
     :server_agent: The name of this server as sended by the "server"
@@ -45,6 +58,13 @@ class Server:
             alpn_protocols=DEFAULT_ALPN_PROTOCOLS,
             protocol_map=DEFAULT_PROTOCOL_MAP,
             server_agent=DEFAULT_SERVER_AGENT,
+            buffered=False,
+            compression=None,
+            cache=None,
+            drain_budget=DEFAULT_DRAIN_BUDGET,
+            pipelining=False,
+            callback_protocol=False,
+            h2c=False,
             loop=None):
         """Initializes the manager.
 
@@ -57,13 +77,43 @@ class Server:
         :protocol_map: A mapping linking ALPN protocol names to a
             corresponding ``AbstractConnection`` subclass.
         :server_agent: The manager server_agent.
+        :buffered: If True, connections data is received directly into
+            the readers buffers (see ``centimani.stream``).
+        :compression: A ``Compression`` instance, used to compress
+            response bodies. Responses are not compressed if None.
+        :cache: A ``ResponseCache`` instance, used to store the cacheable
+            responses and send them again without handling the requests.
+            Responses are not cached if None.
+        :drain_budget: The maximum number of bytes of a request body,
+            not read by its handler, discarded in order to reuse the
+            connection. The connection is closed above it. No limit if
+            None.
+        :pipelining: If True, the requests pipelined by HTTP/1.1 clients
+            are received while the previous ones are handled, and those
+            with a safe method and no body are handled concurrently.
+            Responses are still sent in order.
+        :callback_protocol: If True, connections are served by the
+            callback driven ``Http1Protocol``, that only speaks HTTP/1.x
+            and does not support pipelining, instead of a ``Connection``
+            running over streams.
+        :h2c: If True, HTTP/1.1 connections are switched to cleartext
+            HTTP/2 when requested with an upgrade, or when the client
+            sends the HTTP/2 connection preface with prior knowledge.
         :loop: The server event loop.
         """
-        self._loop = loop or asyncio.get_event_loop()
+        self._attach_loop(loop or asyncio.get_event_loop())
         self._router = Router(routes)
         self._protocol_map = protocol_map
         self._server_agent = server_agent
+        self._buffered = buffered
+        self._compression = compression
+        self._cache = cache
+        self._drain_budget = drain_budget
+        self._pipelining = pipelining
+        self._callback_protocol = callback_protocol
+        self._h2c = h2c
         self._connections = {}
+        self._flights = {}
         self._server = None
 
         if ssl_context:
@@ -80,6 +130,14 @@ class Server:
     def loop(self):
         return self._loop
 
+    @property
+    def clock(self):
+        return self._clock
+
+    @property
+    def timers(self):
+        return self._timers
+
     @property
     def router(self):
         return self._router
@@ -88,6 +146,40 @@ class Server:
     def server_agent(self):
         return self._server_agent
 
+    @property
+    def compression(self):
+        return self._compression
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def flights(self):
+        """The requests of the coalescing handlers in progress, by
+        coalescing key."""
+        return self._flights
+
+    @property
+    def drain_budget(self):
+        return self._drain_budget
+
+    @property
+    def pipelining(self):
+        return self._pipelining
+
+    @property
+    def callback_protocol(self):
+        return self._callback_protocol
+
+    @property
+    def h2c(self):
+        return self._h2c
+
+    @property
+    def protocol_map(self):
+        return self._protocol_map
+
     async def create_connection(self, reader, writer):
         """Create a connection instance and run it.
 
@@ -98,7 +190,8 @@ class Server:
         ssl_object = writer.get_extra_info("ssl_object")
 
         if ssl_object and ssl.HAS_ALPN:
-            protocol = ssl_object.selected_alpn_protocol()
+            # None if the client does not support ALPN
+            protocol = ssl_object.selected_alpn_protocol() or "http/1.1"
             _LOGGER.debug("%s protocol chosen with ALPN.", protocol)
         else:
             protocol = "http/1.1"
@@ -115,22 +208,91 @@ class Server:
 
         del self._connections[peername]
 
-    async def listen(self, host="localhost", port=8080):
+    def _attach_loop(self, loop):
+        """Run the server in ``loop``, e.g. the loop of a worker
+        process."""
+        self._loop = loop
+        self._clock = get_clock(loop)
+        self._timers = get_timer_wheel(loop)
+
+    async def listen(self, host="localhost", port=8080, *, sock=None,
+                     reuse_port=None):
         """Start the dispatcher from listening on given port,
         binded to given host.
+
+        Arguments:
+        :sock: A socket already bound, listened instead of ``host`` and
+            ``port``.
+        :reuse_port: If True, the socket is bound with ``SO_REUSEPORT``,
+            so that other processes may listen on the same port.
         """
+        if sock is not None:
+            address = sock.getsockname()[:2]
+            kwargs = {"sock": sock}
+        else:
+            address = (host, port)
+            kwargs = {"host": host, "port": port, "reuse_port": reuse_port}
+
+        if self._callback_protocol:
+            if self._buffered and BufferedHttp1Protocol is not None:
+                protocol_class = BufferedHttp1Protocol
+            else:
+                protocol_class = Http1Protocol
+
+            self._server = await self.loop.create_server(
+                lambda: protocol_class(self),
+                ssl = self._ssl_context,
+                **kwargs
+            )
+
+            _LOGGER.info("server listening on %s:%d", *address)
+            return
+
         self._server = await start_server(
             self.create_connection,
-            host = host,
-            port = port,
             ssl = self._ssl_context,
-            loop = self.loop
+            buffered = self._buffered,
+            loop = self.loop,
+            **kwargs
         )
 
-        _LOGGER.info("server listening on %s:%d", host, port)
+        _LOGGER.info("server listening on %s:%d", *address)
+
+    def serve(self, host="localhost", port=8080, *, workers=1,
+              reuse_port=None):
+        """Listen on given port, binded to given host, and run the server
+        until it receives SIGINT or SIGTERM.
+
+        With several ``workers``, the server is run in as many forked
+        processes, each with its own event loop, supervised by the
+        current process, see ``centimani.server.workers``.
+
+        Arguments:
+        :workers: The number of processes running the server.
+        :reuse_port: If True, each worker listens with its own socket,
+            bound with ``SO_REUSEPORT``, and the kernel balances the
+            connections between them. Otherwise, the workers share a
+            single socket. Defaults to True on Linux.
+        """
+        if workers > 1:
+            Supervisor(self, host, port, workers, reuse_port).run()
+        else:
+            run_server(self, self._loop, host=host, port=port)
 
     def close(self):
         self._server.close()
 
+    def close_connections(self):
+        """Close the connections in progress."""
+        for connection, _ in list(self._connections.values()):
+            connection.close()
+
     async def wait_closed(self):
         await self._server.wait_closed()
+
+    async def wait_connections_closed(self):
+        """Wait until the connections in progress are over."""
+        waiters = [waiter for _, waiter in self._connections.values()]
+
+        if waiters:
+            await asyncio.wait(waiters)
@@ -0,0 +1,257 @@
+"""This module defines ``Http1Protocol``, a callback driven implementation
+of HTTP/1.x connections.
+
+Unlike ``Http1Connection``, there is no coroutine reading the requests of
+a connection: request headers are searched for in ``data_received``, and
+a task is created only when a whole request header is received, in order
+to run its handler with an ``Http1Pipeline``. On Python 3.12 and above,
+this task is started eagerly, so that a handler that never waits is run
+to completion without going through the event loop.
+
+Requests are processed one after the other, without pipelining.
+"""
+
+import asyncio
+import logging
+import sys
+
+from centimani.stream import StreamReader, StreamWriter, _BufferedProtocol
+from .handlers import ConnectionLogger
+from .http1 import Http1Pipeline, encode_server_field
+
+
+_LOGGER = logging.getLogger(__name__)
+
+_EAGER_START = sys.version_info >= (3, 12)
+
+
+class Http1Protocol(asyncio.Protocol):
+    """An asyncio protocol serving HTTP/1.x requests.
+
+    The protocol takes the role of the connection for its pipeline.
+    """
+
+    def __init__(self, server, limit=None):
+        self._server = server
+        self._loop = server.loop
+        self._limit = limit
+        self._server_field = encode_server_field(server.server_agent)
+
+        self._transport = None
+        self._reader = None
+        self._writer = None
+        self._peername = None
+        self._logger = None
+        self._pipeline = None
+        self._header_timer = None
+        self._task = None
+        self._closed = None
+        self._is_lost = False
+
+    @property
+    def server(self):
+        return self._server
+
+    @property
+    def reader(self):
+        return self._reader
+
+    @property
+    def writer(self):
+        return self._writer
+
+    @property
+    def peername(self):
+        return self._peername
+
+    @property
+    def logger(self):
+        return self._logger
+
+    def close(self):
+        """Close the connection."""
+        if not self._transport.is_closing():
+            self._transport.close()
+
+    #--------------------#
+    # Protocol callbacks #
+    #--------------------#
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._peername = transport.get_extra_info("peername")
+        self._logger = ConnectionLogger(_LOGGER, self._peername)
+
+        loop = self._loop
+
+        # registered like the connections served by a coroutine, so that
+        # the server closes it and waits for its last request
+        self._closed = loop.create_future()
+        self._server._connections[self._peername] = (self, self._closed)
+
+        self._reader = StreamReader(transport, limit=self._limit, loop=loop)
+        self._writer = StreamWriter(transport, loop=loop)
+        self._pipeline = Http1Pipeline(self)
+
+        timers = self._server.timers
+        timeout = self._pipeline.timeout
+
+        # the header timer is re-armed after each request, it expires if
+        # the next request header is not received in time.
+        self._header_timer = timers.timer(self._header_timed_out)
+        self._header_timer.start(timeout)
+        self._reader.set_read_timeout(timers, timeout)
+
+        self._logger.info("connection ready")
+
+    def data_received(self, data):
+        self._reader.feed(data)
+
+        if self._task is None:
+            self._next_request()
+
+    def eof_received(self):
+        self._reader.feed_eof()
+
+        if self._task is None:
+            self._next_request()
+
+        # keep the transport open for the response being sent, if any
+        return True
+
+    def connection_lost(self, exception):
+        if exception is None:
+            self._reader.feed_eof()
+        else:
+            self._reader.set_exception(exception)
+
+        self._header_timer.cancel()
+        self._reader.set_read_timeout(None, None)
+        self._logger.info("connection closing")
+        self._is_lost = True
+
+        if self._task is None:
+            self._connection_over()
+        elif exception is not None:
+            # the handler may wait for something else than the reader
+            self._task.cancel()
+
+    def pause_writing(self):
+        self._writer.pause()
+
+    def resume_writing(self):
+        self._writer.resume()
+
+    #--------------------#
+    # Request processing #
+    #--------------------#
+
+    def _next_request(self):
+        """Process the requests whose header is buffered, returns when a
+        request is still in progress, or no more header is buffered."""
+        reader = self._reader
+
+        while not self._transport.is_closing():
+            try:
+                header = reader.read_until_nowait(b"\r\n\r\n")
+            except Exception:
+                self.close()
+                return
+
+            if header is None:
+                if len(reader) >= reader.limit:
+                    self._logger.info("request header too large")
+                    self._send_error(400)
+                return
+
+            if not header:
+                # EOF between requests
+                self.close()
+                return
+
+            coroutine = self._pipeline.process_request(header)
+
+            if _EAGER_START:
+                task = asyncio.Task(coroutine, loop=self._loop, eager_start=True)
+            else:
+                task = self._loop.create_task(coroutine)
+
+            if not task.done():
+                self._task = task
+                task.add_done_callback(self._request_done)
+                return
+
+            if not self._request_over(task):
+                return
+
+    def _request_done(self, task):
+        self._task = None
+        keep_alive = self._request_over(task)
+
+        if self._is_lost:
+            self._header_timer.cancel()
+            self._connection_over()
+        elif keep_alive:
+            self._next_request()
+
+    def _request_over(self, task):
+        """Called when the processing of a request is over. Returns True
+        if the connection is kept alive."""
+        if task.cancelled():
+            self.close()
+            return False
+
+        error = task.exception()
+
+        if error is not None:
+            if not isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+                self._logger.error("request processing failed", exc_info=error)
+
+            self.close()
+            return False
+
+        if not self._pipeline.keep_alive:
+            self.close()
+            return False
+
+        self._header_timer.start(self._pipeline.timeout)
+        return True
+
+    def _connection_over(self):
+        """Called when the connection is lost, and its last request is
+        over."""
+        self._server._connections.pop(self._peername, None)
+        self._closed.set_result(None)
+
+    def _header_timed_out(self):
+        if self._task is None and not self._transport.is_closing():
+            self._logger.info("request header timeout")
+            self._send_error(408)
+
+    def _send_error(self, status):
+        """Send an error response outside of a request, then close the
+        connection."""
+        pipeline = self._pipeline
+        pipeline._keep_alive = False
+        self._writer.write(pipeline._build_response_header(status, None, 0))
+        self.close()
+
+
+if _BufferedProtocol is not None:
+
+    class BufferedHttp1Protocol(Http1Protocol, _BufferedProtocol):
+        """An ``Http1Protocol`` where data is received directly into the
+        reader buffer.
+        """
+
+        def get_buffer(self, sizehint):
+            return self._reader.get_buffer(sizehint)
+
+        def buffer_updated(self, nbytes):
+            self._reader.buffer_updated(nbytes)
+
+            if self._task is None:
+                self._next_request()
+
+else:
+    BufferedHttp1Protocol = None
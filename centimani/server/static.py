@@ -0,0 +1,565 @@
+"""This module defines ``StaticFileHandler``, a request handler serving
+the files of a directory.
+
+The handler is configured with the served directory, and routed with a
+pattern whose first group is the path of a file in this directory:
+
+    routes = [
+        (r"^/static/(.+)$", StaticFileHandler.configure("/var/www")),
+    ]
+
+Responses carry the ETag and Last-Modified validators, conditional
+requests are answered with 304 responses, and byte ranges requests with
+206 responses, as multipart/byteranges when several ranges are asked.
+A file whose ".gz" sibling exists is served compressed from it to the
+clients accepting gzip.
+
+The files are kept in a ``FileCache``, a least recently used cache
+bounded by size, with their response header fields, and revalidated
+against the file status at each request. The content of small files is
+cached too, larger files are sent with ``send_file``.
+"""
+
+import collections
+import mimetypes
+import os
+import stat
+import uuid
+
+from datetime import datetime
+
+from centimani.errors import HttpError
+from centimani.headers import Headers
+from centimani.utils import rfc1123_datetime_decode, rfc1123_datetime_encode
+from .handlers import RequestHandler
+
+
+# total size of the files kept in memory by a handler
+DEFAULT_CACHE_SIZE = 1 << 24
+
+# files larger than this are sent with ``send_file``
+DEFAULT_MAX_CACHED_FILE_SIZE = 1 << 18
+
+# the size accounted for a cached file, in addition to its content
+ENTRY_SIZE = 512
+
+# requests with more ranges are answered with the whole file
+MAX_RANGES = 16
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+
+StaticFile = collections.namedtuple("StaticFile", (
+    "path", "key", "size", "etag", "last_modified", "mtime", "headers",
+    "content",
+))
+StaticFile.__doc__ = """A file served by a ``StaticFileHandler``.
+
+``path`` is the absolute path of the file, ``key`` identifies a version
+of the file, ``headers`` are the header fields of its responses, and
+``content`` is the file content if it is small enough to be cached, or
+None.
+"""
+
+
+def _file_key(file_stat):
+    return (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+
+def _content_size(static_file):
+    # each entry counts for its header fields too, so that the number of
+    # entries is bounded even when the contents are not cached
+    if static_file.content is None:
+        return ENTRY_SIZE
+    return ENTRY_SIZE + len(static_file.content)
+
+
+def parse_range(value, size):
+    """Returns the (start, end) byte positions, ``end`` excluded, of the
+    ranges asked by the range header field ``value`` of a file of
+    ``size`` bytes.
+
+    Returns None if ``value`` is malformed, or asks for too many ranges,
+    in which case the whole file is sent. Returns an empty list if none
+    of the ranges is satisfiable.
+    """
+    unit, _, ranges = value.partition("=")
+
+    if unit.strip().lower() != "bytes":
+        return None
+
+    specs = ranges.split(",")
+
+    if len(specs) > MAX_RANGES:
+        return None
+
+    positions = []
+
+    for spec in specs:
+        first, dash, last = spec.strip().partition("-")
+
+        if not dash:
+            return None
+
+        if not first:
+            # suffix range, the last bytes of the file
+            if not last.isdigit():
+                return None
+
+            suffix = int(last)
+
+            if suffix:
+                positions.append((max(size - suffix, 0), size))
+            continue
+
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+
+        start = int(first)
+        end = int(last) + 1 if last else size
+
+        if end <= start and last:
+            return None
+
+        if start < size:
+            positions.append((start, min(end, size)))
+
+    return positions
+
+
+class FileCache:
+    """A least recently used cache of ``StaticFile``, by request path,
+    bounded by the total size of the cached file contents.
+
+    Attributes:
+    :max_size: The total size of the cached file contents.
+    :max_file_size: The content of larger files is not cached.
+    """
+
+    def __init__(
+            self,
+            max_size=DEFAULT_CACHE_SIZE,
+            max_file_size=DEFAULT_MAX_CACHED_FILE_SIZE):
+        self.max_size = max_size
+        self.max_file_size = max_file_size
+        self._files = collections.OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._files)
+
+    def get(self, path):
+        """Returns the cached ``StaticFile`` of ``path``, or None."""
+        static_file = self._files.get(path)
+
+        if static_file is not None:
+            self._files.move_to_end(path)
+
+        return static_file
+
+    def put(self, path, static_file):
+        """Caches ``static_file`` as the file of ``path``, the least
+        recently used files are evicted if the cache is full."""
+        self.discard(path)
+
+        size = _content_size(static_file)
+
+        if size > self.max_size:
+            return
+
+        while self._size + size > self.max_size:
+            _, evicted = self._files.popitem(last=False)
+            self._size -= _content_size(evicted)
+
+        self._files[path] = static_file
+        self._size += size
+
+    def discard(self, path):
+        static_file = self._files.pop(path, None)
+
+        if static_file is not None:
+            self._size -= _content_size(static_file)
+
+    def clear(self):
+        self._files.clear()
+        self._size = 0
+
+
+class StaticFileHandler(RequestHandler):
+    """Serves the files of the ``root`` directory.
+
+    The first argument captured by the route is the path of the file,
+    relative to ``root``. Use ``configure`` to create a handler serving
+    a directory.
+
+    Attributes:
+    :root: The absolute path of the served directory.
+    :cache: The ``FileCache`` of the handler.
+    :cache_control: The value of the cache-control header field sent
+        with the files, if any.
+    """
+
+    root = None
+    cache = None
+    cache_control = None
+
+    @classmethod
+    def configure(
+            cls,
+            root,
+            *,
+            cache_size=DEFAULT_CACHE_SIZE,
+            max_cached_file_size=DEFAULT_MAX_CACHED_FILE_SIZE,
+            cache_control=None):
+        """Returns a subclass of the handler serving the files of the
+        ``root`` directory.
+
+        Arguments:
+        :cache_size: The total size of the files kept in memory.
+        :max_cached_file_size: The larger size of the files kept in
+            memory, larger files are sent with ``send_file``.
+        :cache_control: The value of the cache-control header field sent
+            with the files, e.g. "public, max-age=3600".
+        """
+        return type(cls.__name__, (cls,), {
+            "root": os.path.realpath(root),
+            "cache": FileCache(cache_size, max_cached_file_size),
+            "cache_control": cache_control,
+        })
+
+    async def get(self, path, *args, **kwargs):
+        static_file = self._open(path)
+
+        if static_file is None:
+            raise HttpError(404)
+
+        if self._accepts_gzip():
+            compressed_file = self._open(path, static_file)
+
+            if compressed_file is not None:
+                static_file = compressed_file
+
+        headers = static_file.headers
+
+        if self._is_not_modified(static_file):
+            await self.send_response(304, headers)
+            return
+
+        ranges = self._ranges(static_file)
+
+        if ranges is None:
+            await self._send_content(200, headers, static_file)
+            return
+
+        if not ranges:
+            headers = Headers()
+            headers.set("content-range", "bytes */%d" % static_file.size)
+            raise HttpError(416, headers)
+
+        # the cached header fields are shared by the responses
+        headers = Headers()
+
+        for name, values in static_file.headers.items():
+            headers.add(name, values)
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            headers.set("content-range", "bytes %d-%d/%d" % (
+                start, end - 1, static_file.size
+            ))
+            await self._send_content(206, headers, static_file, start, end)
+
+        else:
+            await self._send_multipart(headers, static_file, ranges)
+
+    head = get
+
+    def _resolve(self, path):
+        """Returns the absolute path of the file at ``path`` in the
+        root directory, or None if it is outside of it."""
+        if self.root is None:
+            raise Exception("the handler must be configured")
+
+        if "\x00" in path:
+            return None
+
+        file_path = os.path.realpath(os.path.join(self.root, path))
+
+        # the root may end with a separator, e.g. "/"
+        if (file_path == self.root
+                or not file_path.startswith(os.path.join(self.root, ""))):
+            return None
+
+        return file_path
+
+    def _open(self, path, original_file=None):
+        """Returns the ``StaticFile`` at ``path``, or None if there is no
+        regular file at ``path``.
+
+        The cached file is returned if it did not change, otherwise its
+        header fields are built, and its content read if it is small
+        enough to be cached. ``original_file`` is given to open the gzip
+        compressed sibling of the file at ``path``.
+        """
+        if original_file is None:
+            key = path
+        else:
+            # not the key of a request for the ".gz" file itself, that
+            # is served with its own header fields
+            key = (path, "gzip")
+            path += ".gz"
+
+        static_file = self.cache.get(key)
+
+        if static_file is not None:
+            try:
+                file_stat = os.stat(static_file.path)
+            except (OSError, ValueError):
+                file_stat = None
+
+            if (file_stat is not None and
+                    _file_key(file_stat) == static_file.key):
+                return static_file
+
+            self.cache.discard(key)
+
+        file_path = self._resolve(path)
+
+        if file_path is None:
+            return None
+
+        try:
+            file_stat = os.stat(file_path)
+        except (OSError, ValueError):
+            return None
+
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+
+        mtime = datetime.utcfromtimestamp(int(file_stat.st_mtime))
+
+        static_file = StaticFile(
+            path=file_path,
+            key=_file_key(file_stat),
+            size=file_stat.st_size,
+            etag='"%x-%x"' % (file_stat.st_mtime_ns, file_stat.st_size),
+            last_modified=rfc1123_datetime_encode(mtime),
+            mtime=mtime,
+            headers=None,
+            content=None
+        )
+
+        headers = Headers()
+
+        if original_file is None:
+            headers.set("content-type", self._content_type(file_path))
+        else:
+            content_type = original_file.headers["content-type"]
+            headers.set("content-type", content_type)
+            headers.set("content-encoding", "gzip")
+
+        headers.set("accept-ranges", "bytes")
+        # the gzip compressed sibling may be created at any time
+        headers.set("vary", "accept-encoding")
+
+        if self.cache_control:
+            headers.set("cache-control", self.cache_control)
+
+        headers.set("etag", static_file.etag)
+        headers.set("last-modified", static_file.last_modified)
+
+        static_file = static_file._replace(headers=headers)
+
+        if file_stat.st_size <= self.cache.max_file_size:
+            try:
+                with open(file_path, "rb") as file:
+                    content = file.read()
+            except OSError:
+                return None
+
+            if len(content) == static_file.size:
+                static_file = static_file._replace(content=content)
+
+        self.cache.put(key, static_file)
+
+        return static_file
+
+    @staticmethod
+    def _content_type(file_path):
+        content_type, encoding = mimetypes.guess_type(file_path)
+
+        if content_type is None or encoding is not None:
+            return DEFAULT_CONTENT_TYPE
+
+        return content_type
+
+    def _accepts_gzip(self):
+        for value in self.request.headers.get("accept-encoding", ()):
+            coding, _, parameters = value.partition(";")
+
+            if coding.strip().lower() not in ("gzip", "x-gzip"):
+                continue
+
+            name, _, quality = parameters.partition("=")
+
+            if name.strip().lower() == "q":
+                try:
+                    return float(quality) > 0
+                except ValueError:
+                    return False
+
+            return True
+
+        return False
+
+    def _is_not_modified(self, static_file):
+        """Evaluates the conditional request header fields, returns True
+        if a 304 response is sent."""
+        headers = self.request.headers
+        if_none_match = headers.get("if-none-match")
+
+        if if_none_match:
+            # weak comparison
+            for etag in if_none_match:
+                etag = etag.strip()
+
+                if etag.startswith("W/"):
+                    etag = etag[2:]
+
+                if etag == "*" or etag == static_file.etag:
+                    return True
+
+            return False
+
+        if_modified_since = headers.get("if-modified-since")
+
+        if if_modified_since:
+            try:
+                since = rfc1123_datetime_decode(if_modified_since[0].strip())
+            except ValueError:
+                return False
+
+            return static_file.mtime <= since
+
+        return False
+
+    def _ranges(self, static_file):
+        """Returns the ranges to send, or None if the whole file is
+        sent."""
+        headers = self.request.headers
+        range_value = headers.get("range")
+
+        # ranges are defined for GET requests only
+        if not range_value or self.request.method != "GET":
+            return None
+
+        if_range = headers.get("if-range")
+
+        if if_range:
+            # the range is ignored if the file changed
+            validator = ", ".join(if_range).strip()
+
+            if validator.startswith('"'):
+                if validator != static_file.etag:
+                    return None
+            elif validator != static_file.last_modified:
+                return None
+
+        # range values are split on commas by the header fields parser
+        return parse_range(",".join(range_value), static_file.size)
+
+    async def _send_content(self, status, headers, static_file, start=0,
+                            end=None):
+        """Send the bytes from ``start`` to ``end`` of ``static_file``,
+        from the cache, or with ``send_file``."""
+        if end is None:
+            end = static_file.size
+
+        content = static_file.content
+
+        if content is not None:
+            if start or end != static_file.size:
+                content = content[start:end]
+
+            await self.send_response(status, headers, content)
+            return
+
+        try:
+            file = open(static_file.path, "rb")
+        except OSError as error:
+            raise HttpError(404) from error
+
+        with file:
+            await self.send_file(status, headers, file, start, end - start)
+
+    async def _send_multipart(self, headers, static_file, ranges):
+        """Send the ``ranges`` of ``static_file`` in a
+        multipart/byteranges body."""
+        boundary = uuid.uuid4().hex
+        content_type = headers["content-type"][0]
+        content = static_file.content
+        file = None
+
+        parts = []
+
+        for start, end in ranges:
+            part_header = (
+                "\r\n--{}\r\n"
+                "Content-Type: {}\r\n"
+                "Content-Range: bytes {}-{}/{}\r\n"
+                "\r\n"
+            ).format(
+                boundary, content_type, start, end - 1, static_file.size
+            )
+            parts.append((part_header.encode("latin-1"), start, end))
+
+        closing = "\r\n--{}--\r\n".format(boundary).encode("ascii")
+
+        body_size = len(closing) + sum(
+            len(part_header) + end - start
+            for part_header, start, end in parts
+        )
+
+        headers.set(
+            "content-type", "multipart/byteranges; boundary=" + boundary
+        )
+        headers.set("content-length", str(body_size))
+
+        if content is None:
+            try:
+                file = open(static_file.path, "rb")
+            except OSError as error:
+                raise HttpError(404) from error
+
+        try:
+            body_writer = await self.start_response(206, headers)
+
+            for part_header, start, end in parts:
+                await body_writer.write(part_header)
+
+                if content is not None:
+                    await body_writer.write(content[start:end])
+                    continue
+
+                file.seek(start)
+                remaining = end - start
+
+                while remaining:
+                    data = file.read(min(remaining, 1 << 16))
+
+                    if not data:
+                        raise EOFError("file truncated")
+
+                    await body_writer.write(data)
+                    remaining -= len(data)
+
+            await body_writer.write(closing)
+            await body_writer.close()
+
+        finally:
+            if file is not None:
+                file.close()
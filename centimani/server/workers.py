@@ -0,0 +1,290 @@
+"""This module defines the ``Supervisor`` class, that runs a server in
+several worker processes.
+
+Each worker is forked from the supervisor process, and runs the server
+in an event loop of its own. On Linux, every worker listens with its
+own socket bound with ``SO_REUSEPORT``, and the kernel balances the
+connections between them. Elsewhere, the workers share a listening
+socket bound by the supervisor.
+
+The supervisor restarts the workers that exit unexpectedly, and stops
+them when it receives SIGINT or SIGTERM, by sending them SIGTERM. A
+worker stops listening on SIGTERM, closes its connections, and exits.
+Workers ignore SIGINT, that is sent to the whole process group by a
+terminal, the supervisor stops them.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BACKLOG = 1024
+
+# a worker exiting sooner than this after its start is restarted after
+# this delay, in order not to fork continuously a worker that can not
+# run
+MIN_WORKER_LIFETIME = 1.0
+
+# exit status of a worker that could not start listening
+WORKER_STARTUP_FAILURE = 3
+
+# seconds the connections have to end, once the server is stopped
+DEFAULT_SHUTDOWN_TIMEOUT = 10.0
+
+SHUTDOWN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+# SO_REUSEPORT balances the connections between the sockets on Linux
+# only, the last bound socket receives them on other systems
+HAS_REUSE_PORT_BALANCING = (
+    sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT")
+)
+
+
+def bind_socket(host, port, reuse_port=False, listen=True):
+    """Returns a non blocking socket bound to (``host``, ``port``),
+    listening unless ``listen`` is False."""
+    family, type_, proto, _, address = socket.getaddrinfo(
+        host, port,
+        type=socket.SOCK_STREAM,
+        flags=socket.AI_PASSIVE
+    )[0]
+
+    sock = socket.socket(family, type_, proto)
+
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+        sock.bind(address)
+
+        if listen:
+            sock.listen(DEFAULT_BACKLOG)
+
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+
+    return sock
+
+
+def _exit_code(status):
+    """Returns the exit code of a process from its wait status, or the
+    negative signal number if it was killed by a signal."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_server(server, loop, signals=SHUTDOWN_SIGNALS,
+               shutdown_timeout=DEFAULT_SHUTDOWN_TIMEOUT, **kwargs):
+    """Run ``server`` in ``loop`` until one of the ``signals`` is
+    received, then close it and its connections, and wait at most
+    ``shutdown_timeout`` seconds for them to end. The keyword arguments
+    are passed to ``Server.listen``."""
+    for signum in signals:
+        loop.add_signal_handler(signum, loop.stop)
+
+    try:
+        loop.run_until_complete(server.listen(**kwargs))
+        loop.run_forever()
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+
+    server.close()
+    server.close_connections()
+
+    async def wait_closed():
+        await server.wait_closed()
+        await server.wait_connections_closed()
+
+    # lets the closed connections send the data written, and end
+    try:
+        loop.run_until_complete(
+            asyncio.wait_for(wait_closed(), shutdown_timeout)
+        )
+    except asyncio.TimeoutError:
+        _LOGGER.warning(
+            "connections still open after %.1f seconds", shutdown_timeout
+        )
+
+
+class Supervisor:
+    """Runs a server in ``workers`` processes, and restarts them when
+    they exit unexpectedly.
+
+    Attributes:
+    :server: The ``Server`` run by the workers.
+    :workers: The number of worker processes.
+    :reuse_port: True if each worker binds its own socket with
+        ``SO_REUSEPORT``, False if they share a socket.
+    """
+
+    def __init__(self, server, host, port, workers, reuse_port=None):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("worker processes require os.fork")
+
+        if reuse_port is None:
+            reuse_port = HAS_REUSE_PORT_BALANCING
+
+        self.server = server
+        self.workers = workers
+        self.reuse_port = reuse_port
+
+        self._host = host
+        self._port = port
+        self._sock = None
+        self._pids = {}
+        self._started = {}
+        self._stopping = False
+
+    def run(self):
+        """Start the workers, and supervise them until the supervisor
+        receives SIGINT or SIGTERM, and the workers are over."""
+        # with SO_REUSEPORT, the socket of the supervisor is not
+        # listening, it only reserves the address for the workers
+        self._sock = bind_socket(
+            self._host, self._port,
+            reuse_port=self.reuse_port,
+            listen=not self.reuse_port
+        )
+        host, port = self._sock.getsockname()[:2]
+        self._port = port
+
+        previous_handlers = {
+            signum: signal.signal(signum, self._stop)
+            for signum in SHUTDOWN_SIGNALS
+        }
+
+        _LOGGER.info(
+            "supervising %d workers listening on %s:%d",
+            self.workers, host, port
+        )
+
+        try:
+            for worker_id in range(self.workers):
+                self._spawn(worker_id)
+
+            self._supervise()
+        finally:
+            self._stop()
+            self._reap()
+
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+            self._sock.close()
+
+    def _supervise(self):
+        """Wait for the workers to exit, and restart them unless the
+        supervisor is stopping."""
+        while self._pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            worker_id = self._pids.pop(pid, None)
+
+            if worker_id is None:
+                continue
+
+            if self._stopping:
+                continue
+
+            exit_code = _exit_code(status)
+
+            if exit_code == WORKER_STARTUP_FAILURE:
+                raise RuntimeError(
+                    "worker {0} could not start listening".format(worker_id)
+                )
+
+            _LOGGER.error(
+                "worker %d (pid %d) exited with status %d, restarting it",
+                worker_id, pid, exit_code
+            )
+
+            lifetime = time.monotonic() - self._started[worker_id]
+
+            if lifetime < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME - lifetime)
+
+            if not self._stopping:
+                self._spawn(worker_id)
+
+    def _reap(self):
+        """Wait for the stopped workers to exit."""
+        while self._pids:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+
+            self._pids.pop(pid, None)
+
+    def _spawn(self, worker_id):
+        """Fork a worker process."""
+        pid = os.fork()
+
+        if pid:
+            self._pids[pid] = worker_id
+            self._started[worker_id] = time.monotonic()
+            return
+
+        # worker process, it never returns, nor stops the other workers
+        # if it receives SIGTERM before it resets its signal handlers
+        self._pids = {}
+        exit_code = 1
+
+        try:
+            exit_code = self._run_worker(worker_id)
+        except BaseException:
+            _LOGGER.exception("worker %d failed", worker_id)
+        finally:
+            logging.shutdown()
+            os._exit(exit_code)
+
+    def _run_worker(self, worker_id):
+        """Run the server in the worker process, returns its exit
+        status."""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.server._attach_loop(loop)
+
+        try:
+            if self.reuse_port:
+                sock = bind_socket(self._host, self._port, reuse_port=True)
+            else:
+                sock = self._sock
+
+            run_server(self.server, loop, (signal.SIGTERM,), sock=sock)
+        except OSError:
+            _LOGGER.exception("worker %d could not listen", worker_id)
+            return WORKER_STARTUP_FAILURE
+        finally:
+            loop.close()
+
+        return 0
+
+    def _stop(self, signum=None, frame=None):
+        """Stop the workers, they are sent SIGTERM."""
+        self._stopping = True
+
+        for pid in self._pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -3,25 +3,65 @@
 Additionnal features:
 - ``read_until`` method, that can read until a delimiter
   is found.
+- a buffered mode, based on ``asyncio.BufferedProtocol``, where data is
+  received directly into the ``StreamReader`` buffer.
+- ``read`` and ``read_until`` can return ``memoryview`` slices of the
+  reader buffer instead of ``bytes`` copies.
+- ``StreamWriter.writelines`` and corking, that send many buffers with
+  a single transport call.
 """
 
 import asyncio
+import contextlib
+import io
 
 
 # internal StreamReader buffer maximum size
 DEFAULT_READ_BUFFER_LIMIT = 1 << 16
 
+# minimum free space offered to the transport in buffered mode
+DEFAULT_RECEIVE_SIZE = io.DEFAULT_BUFFER_SIZE
 
-async def open_connection(host, port, limit=None, loop=None, **kwargs):
+# buffers written together are joined under this size, instead of being
+# sent with a scatter-gather call
+DEFAULT_COALESCE_SIZE = 1 << 14
+
+# chunk size used to send files when sendfile is not available
+DEFAULT_SENDFILE_CHUNK_SIZE = 1 << 16
+
+# asyncio.BufferedProtocol is only available since python 3.7
+_BufferedProtocol = getattr(asyncio, "BufferedProtocol", None)
+
+
+def _protocol_factory(buffered):
+    """Returns the protocol class to use, falling back to the
+    ``StreamingProtocol`` if buffered protocols are not supported.
+    """
+    if buffered and _BufferedProtocol is not None:
+        return BufferedStreamingProtocol
+    else:
+        return StreamingProtocol
+
+async def open_connection(
+        host, port,
+        limit=None,
+        buffered=False,
+        loop=None,
+        **kwargs):
     """Connect to a remote client and returns a (reader, writer) tuple.
 
+    If ``buffered`` is True, data will be received directly into the
+    reader buffer, if supported by the event loop.
+
     Keyword arguments will be passed to ``EventLoop.create_connection``.
     """
     if loop is None:
         loop = asyncio.get_event_loop()
 
+    protocol_class = _protocol_factory(buffered)
+
     _, protocol = await loop.create_connection(
-        lambda: StreamingProtocol(limit=limit, loop=loop),
+        lambda: protocol_class(limit=limit, loop=loop),
         host, port,
         **kwargs
     )
@@ -32,14 +72,21 @@ async def start_server(
         connection_callback,
         host=None, port=None,
         limit=None,
+        buffered=False,
         loop=None,
         **kwargs):
-    """Start listening connections."""
+    """Start listening connections.
+
+    If ``buffered`` is True, data will be received directly into the
+    readers buffers, if supported by the event loop.
+    """
     if loop is None:
         loop = asyncio.get_event_loop()
 
+    protocol_class = _protocol_factory(buffered)
+
     server = await loop.create_server(
-        lambda: StreamingProtocol(connection_callback, limit=limit, loop=loop),
+        lambda: protocol_class(connection_callback, limit=limit, loop=loop),
         host, port,
         **kwargs
     )
@@ -47,20 +94,48 @@ async def start_server(
     return server
 
 class StreamReader:
+    """Reads data from a transport.
+
+    Received data is stored in a preallocated buffer, between a start and
+    an end offset. Read calls only move the start offset forward, the
+    buffer is compacted lazily, when free space is needed at its end, so
+    consuming N bytes costs O(N) whatever the read sizes are.
+
+    The buffer is never resized in place: when more space is needed, a
+    new buffer is allocated, so that ``memoryview`` slices returned by
+    read calls stay valid until the next read call.
+    """
 
     def __init__(self, transport, limit=None, loop=None):
         self._loop = loop or asyncio.get_event_loop() 
         self._transport = transport
         self._buffer = bytearray()
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._exported = False
+        self._delimiter = None
+        self._searched = 0
         self._eof = False
         self._pending = None
         self._limit = limit or DEFAULT_READ_BUFFER_LIMIT
         self._paused = False
         self._exception = None
+        self._interrupt = None
+        self._read_timer = None
+        self._read_timeout = None
+
+    def __len__(self):
+        """Returns the number of bytes available in the buffer."""
+        return self._end - self._start
+
+    @property
+    def limit(self):
+        return self._limit
 
     @property
     def at_eof(self):
-        return (self._eof and not self._buffer)
+        return (self._eof and self._start == self._end)
 
     async def _wait(self, parameter):
         if self._pending is not None:
@@ -68,16 +143,23 @@ class StreamReader:
             if not event.done():
                 raise RuntimeError("another read call already pending")
 
+        if self._interrupt is not None:
+            exception, self._interrupt = self._interrupt, None
+            raise exception
+
         event = asyncio.Future(loop=self._loop)
         self._pending = (parameter, event)
 
+        if self._read_timer is not None:
+            self._read_timer.start(self._read_timeout)
+
         try:
             await event
         finally:
             self._pending = None
 
     def _maybe_pause(self):
-        if not self._paused and len(self._buffer) > self._limit:
+        if not self._paused and len(self) > self._limit:
             try:
                 self._transport.pause_reading()
             except NotImplementedError:
@@ -91,7 +173,7 @@ class StreamReader:
             self._paused = True
 
     def _maybe_resume(self):
-        if self._paused and len(self._buffer) < self._limit:
+        if self._paused and len(self) < self._limit:
             try:
                 self._transport.resume_reading()
             except NotImplementedError:
@@ -99,6 +181,118 @@ class StreamReader:
 
             self._paused = False
 
+    def _compact(self):
+        """Move buffered data to the beginning of the buffer."""
+        if self._start == 0:
+            return
+
+        size = self._end - self._start
+
+        if size:
+            self._view[:size] = self._view[self._start:self._end]
+
+        self._start = 0
+        self._end = size
+
+    def _reserve(self, size):
+        """Ensures that at least ``size`` bytes can be written after the
+        end of the buffered data.
+        """
+        if self._start == self._end and not self._exported:
+            # empty buffer, rewind for free
+            self._start = self._end = 0
+
+        capacity = len(self._buffer)
+
+        if capacity - self._end >= size:
+            return
+
+        data_size = self._end - self._start
+
+        # compacting only when at most half of the buffer is used bounds
+        # the amortized cost of compaction to one move per byte.
+        can_compact = (
+            not self._exported
+            and data_size <= capacity // 2
+            and capacity - data_size >= size
+        )
+
+        if can_compact:
+            self._compact()
+            return
+
+        # allocate a new buffer, exported views keep the old one alive.
+        # It is sized from the live data, not from the old buffer, that
+        # may be mostly made of consumed data.
+        new_capacity = DEFAULT_RECEIVE_SIZE
+        while new_capacity < data_size + size:
+            new_capacity *= 2
+
+        buffer = bytearray(new_capacity)
+        buffer[:data_size] = self._view[self._start:self._end]
+
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._start = 0
+        self._end = data_size
+
+    def _find(self, delimiter):
+        """Returns the index of ``delimiter`` in the buffer, or -1.
+
+        The number of bytes already searched for the last delimiter is
+        remembered, so the search resumes where the previous one stopped,
+        minus the delimiter length - 1 in order to find delimiters split
+        across received chunks.
+        """
+        if delimiter != self._delimiter:
+            self._delimiter = delimiter
+            self._searched = 0
+
+        start = self._start
+        index = self._buffer.find(delimiter, start + self._searched, self._end)
+
+        if index < 0:
+            searched = self._end - start - len(delimiter) + 1
+            self._searched = max(searched, 0)
+        else:
+            self._searched = index - start
+
+        return index
+
+    def _consume(self, count, view, skip=0):
+        """Returns the ``count`` first bytes of the buffer, and remove
+        them from it, along with the ``skip`` following bytes.
+        """
+        start = self._start
+        self._start = start + count + skip
+        self._searched = max(self._searched - count - skip, 0)
+
+        if view:
+            self._exported = True
+            return self._view[start:start + count]
+        else:
+            return self._view[start:start + count].tobytes()
+
+    def _data_received(self):
+        """Test pending read calls, after data have been appended to
+        the buffer.
+        """
+        if self._pending:
+            parameter, event = self._pending
+
+            if not event.done():
+                # read call
+                if isinstance(parameter, int):
+                    if parameter <= len(self):
+                        event.set_result(None)
+
+                # read_until call
+                elif isinstance(parameter, bytes):
+                    if self._find(parameter) >= 0:
+                        event.set_result(None)
+
+        self._maybe_pause()
+
     def set_exception(self, exception):
         assert isinstance(exception, Exception)
 
@@ -111,33 +305,79 @@ class StreamReader:
             if not event.done():
                 event.set_exception(exception)
 
+    def interrupt(self, exception):
+        """Raise ``exception`` in the read call waiting for data, or in
+        the next one if no read call is waiting.
+
+        Unlike ``set_exception``, the following read calls are not
+        affected.
+        """
+        pending = self._pending
+        if pending is not None and not pending[1].done():
+            pending[1].set_exception(exception)
+        else:
+            self._interrupt = exception
+
+    def clear_interrupt(self):
+        """Discard the exception given to ``interrupt``, if not raised
+        yet."""
+        self._interrupt = None
+
+    def set_read_timeout(self, timer_wheel, timeout):
+        """Interrupt read calls waiting for data more than ``timeout``
+        seconds with ``asyncio.TimeoutError``, using a timer of
+        ``timer_wheel``. The timeout is disabled if ``timeout`` is None.
+        """
+        if self._read_timer is not None:
+            self._read_timer.cancel()
+
+        if timeout is None:
+            self._read_timer = None
+        else:
+            self._read_timer = timer_wheel.timer(self._read_timed_out)
+
+        self._read_timeout = timeout
+
+    def _read_timed_out(self):
+        # the timer is re-armed at each wait, so a read call still
+        # pending started ``timeout`` seconds ago
+        pending = self._pending
+        if pending is not None and not pending[1].done():
+            pending[1].set_exception(asyncio.TimeoutError())
+
     def feed(self, data):
         assert isinstance(data, bytes)
         assert not self._eof
 
-        self._buffer.extend(data)
-        
-        # test pending read calls
-        if self._pending:
-            parameter, event = self._pending
+        size = len(data)
+        self._reserve(size)
+        self._view[self._end:self._end + size] = data
+        self._end += size
 
-            if not event.done():
-                # read call
-                if isinstance(parameter, int):
-                    if parameter <= len(self._buffer):
-                        event.set_result(None)
+        self._data_received()
 
-                # read_until call
-                elif isinstance(parameter, bytes):
-                    search_length = len(data) - len(parameter) - 1
-                    if parameter in self._buffer[-search_length:]:
-                        event.set_result(None)
+    def get_buffer(self, sizehint=-1):
+        """Returns a writable view of the free space of the buffer, used
+        in buffered mode.
+        """
+        assert not self._eof
 
-        self._maybe_pause()
+        self._reserve(max(sizehint, DEFAULT_RECEIVE_SIZE))
+        return self._view[self._end:]
+
+    def buffer_updated(self, size):
+        """Called in buffered mode when ``size`` bytes have been written
+        in the view returned by ``get_buffer``.
+        """
+        self._end += size
+        self._data_received()
 
     def feed_eof(self):
         self._eof = True
 
+        if self._read_timer is not None:
+            self._read_timer.cancel()
+
         if self._pending is None:
             return
 
@@ -149,10 +389,19 @@ class StreamReader:
 
         self._pending = None
 
-    async def read(self, count):
+    async def read(self, count, *, view=False):
+        """Read ``count`` bytes, or less if EOF is reached.
+
+        If ``view`` is True, a ``memoryview`` of the buffer is returned
+        instead of a ``bytes`` copy. The view is valid until the next
+        read call.
+        """
         assert isinstance(count, int)
         assert count >= 0
 
+        # invalidates views returned by the previous read call
+        self._exported = False
+
         if count == 0:
             return b""
 
@@ -162,42 +411,202 @@ class StreamReader:
         if count > self._limit:
             raise ValueError("trying to read more bytes than buffer limit")
 
-        if not self._eof and len(self._buffer) < count:
+        start = self._start
+
+        if not self._eof and self._end - start < count:
             await self._wait(count)
+            start = self._start
 
-        data = bytes(self._buffer[:count])
-        del self._buffer[:count]
+        end = min(start + count, self._end)
+        self._start = end
+        self._searched = max(self._searched - (end - start), 0)
 
-        self._maybe_resume()
+        if view:
+            self._exported = True
+            data = self._view[start:end]
+        else:
+            data = self._view[start:end].tobytes()
+
+        if self._paused:
+            self._maybe_resume()
 
         return data
 
-    async def read_until(self, delimiter=b"\n"):
+    async def read_until(self, delimiter=b"\n", *, view=False):
+        """Read data until ``delimiter`` is found, the delimiter is
+        removed from the buffer but not returned. If EOF is reached
+        before, all the remaining data is returned.
+
+        If ``view`` is True, a ``memoryview`` of the buffer is returned
+        instead of a ``bytes`` copy. The view is valid until the next
+        read call.
+        """
         assert isinstance(delimiter, bytes)
 
+        # invalidates views returned by the previous read call
+        self._exported = False
+
         if self._exception is not None:
             raise self._exception
 
-        if not self._eof and delimiter not in self._buffer:
-            await self._wait(delimiter)
+        index = self._find(delimiter)
 
-        index = self._buffer.find(delimiter)
+        if not self._eof and index < 0:
+            await self._wait(delimiter)
+            index = self._find(delimiter)
 
-        data = None
         if self._eof and index < 0:
             # EOF feeded and delimiter not find
-            data = bytes(self._buffer[:])
-            self._buffer.clear()
+            data = self._consume(len(self), view)
+        else:
+            data = self._consume(index - self._start, view, len(delimiter))
+
+        if self._paused:
+            self._maybe_resume()
+
+        return data
+
+    def read_until_nowait(self, delimiter=b"\n", *, view=False):
+        """Like ``read_until``, without waiting for data: returns None if
+        the delimiter is not in the buffer and EOF is not reached.
+        """
+        assert isinstance(delimiter, bytes)
+
+        # invalidates views returned by the previous read call
+        self._exported = False
+
+        if self._exception is not None:
+            raise self._exception
+
+        index = self._find(delimiter)
+
+        if index < 0:
+            if not self._eof:
+                return None
+
+            data = self._consume(len(self), view)
         else:
-            data = bytes(self._buffer[:index])
-            del self._buffer[:index + len(delimiter)]
+            data = self._consume(index - self._start, view, len(delimiter))
 
-        self._maybe_resume()
+        if self._paused:
+            self._maybe_resume()
 
         return data
 
+    async def readinto(self, buffer):
+        """Read data into ``buffer``, a writable bytes-like object, until
+        it is full or EOF is reached. ``buffer`` may be larger than the
+        buffer limit.
+
+        Returns the number of bytes read.
+        """
+        # invalidates views returned by the previous read call
+        self._exported = False
+
+        if self._exception is not None:
+            raise self._exception
+
+        target = memoryview(buffer).cast("B")
+        size = len(target)
+        filled = 0
+
+        while filled < size:
+            start = self._start
+            available = self._end - start
+
+            if not available:
+                if self._eof:
+                    break
+
+                await self._wait(1)
+                continue
+
+            count = min(size - filled, available)
+            target[filled:filled + count] = self._view[start:start + count]
+
+            self._start = start + count
+            self._searched = max(self._searched - count, 0)
+            filled += count
+
+            if self._paused:
+                self._maybe_resume()
+
+        return filled
+
+    async def skip(self, count):
+        """Discard the next ``count`` bytes, directly from the buffer.
+        ``count`` may be larger than the buffer limit.
+
+        Returns the number of bytes discarded, less than ``count`` if EOF
+        is reached.
+        """
+        assert isinstance(count, int)
+        assert count >= 0
+
+        # invalidates views returned by the previous read call
+        self._exported = False
+
+        if self._exception is not None:
+            raise self._exception
+
+        skipped = 0
+
+        while skipped < count:
+            available = self._end - self._start
+
+            if not available:
+                if self._eof:
+                    break
+
+                await self._wait(1)
+                continue
+
+            size = min(count - skipped, available)
+
+            self._start += size
+            self._searched = max(self._searched - size, 0)
+            skipped += size
+
+            if self._paused:
+                self._maybe_resume()
+
+        return skipped
+
+    async def read_exactly(self, count, buffer=None):
+        """Read exactly ``count`` bytes, ``count`` may be larger than the
+        buffer limit.
+
+        Data is written at the beginning of ``buffer`` if given, else a
+        new ``bytearray`` is allocated. Returns the filled buffer.
+        Raises an ``asyncio.IncompleteReadError`` if EOF is reached
+        before.
+        """
+        assert isinstance(count, int)
+        assert count >= 0
+
+        if buffer is None:
+            buffer = bytearray(count)
+        elif len(buffer) < count:
+            raise ValueError("buffer is smaller than count")
+
+        target = memoryview(buffer).cast("B")[:count]
+        filled = await self.readinto(target)
+
+        if filled < count:
+            partial = target[:filled].tobytes()
+            raise asyncio.IncompleteReadError(partial, count)
+
+        return buffer
+
 
 class StreamWriter:
+    """Writes data to a transport.
+
+    The writer can be corked: data written while corked is kept in a list
+    of buffers, and sent with a single transport call when the writer is
+    uncorked. Written buffers must not be modified until then.
+    """
+
     def __init__(self, transport, loop=None):
         assert transport
 
@@ -205,6 +614,8 @@ class StreamWriter:
         self._transport = transport
         self._pending = None
         self._paused = False
+        self._corked = None
+        self._cork_depth = 0
 
     def is_closing(self):
         return self._transport.is_closing()
@@ -229,14 +640,140 @@ class StreamWriter:
             if not pending.done():
                 pending.set_result(None)
 
+    def _write_buffers(self, buffers):
+        """Send ``buffers`` with a single transport call."""
+        if not buffers:
+            return
+
+        if len(buffers) == 1:
+            self._transport.write(buffers[0])
+            return
+
+        size = sum(len(buffer) for buffer in buffers)
+
+        if size <= DEFAULT_COALESCE_SIZE:
+            self._transport.write(b"".join(buffers))
+        else:
+            # uses sendmsg since python 3.12 when possible
+            self._transport.writelines(buffers)
+
     def write(self, data):
         assert not self.is_closing()
-        self._transport.write(data)
+
+        if self._corked is not None:
+            self._corked.append(data)
+        else:
+            self._transport.write(data)
+
+    def writelines(self, buffers):
+        """Write a sequence of bytes-like objects, with a single
+        transport call.
+
+        Small buffers are joined together, larger ones are sent with a
+        scatter-gather call when the transport supports it.
+        """
+        assert not self.is_closing()
+
+        if self._corked is not None:
+            self._corked.extend(buffers)
+        else:
+            self._write_buffers(list(buffers))
+
+    def cork(self):
+        """Start buffering written data, until ``uncork`` is called.
+
+        Calls to ``cork`` may be nested, data is sent when the outermost
+        ``uncork`` is called.
+        """
+        self._cork_depth += 1
+
+        if self._corked is None:
+            self._corked = []
+
+    def uncork(self):
+        """Send data buffered since ``cork`` was called."""
+        assert self._cork_depth > 0
+
+        self._cork_depth -= 1
+
+        if self._cork_depth == 0:
+            buffers, self._corked = self._corked, None
+
+            if not self.is_closing():
+                self._write_buffers(buffers)
+
+    @contextlib.contextmanager
+    def corked(self):
+        """Context manager that corks the writer in its scope.
+
+        Usage:
+
+            with writer.corked():
+                writer.write(header)
+                writer.write(body)
+            await writer.drain()
+        """
+        self.cork()
+        try:
+            yield self
+        finally:
+            self.uncork()
 
     def write_eof(self):
         assert not self.is_closing()
         self._transport.write_eof()
 
+    async def sendfile(self, file, offset=0, count=None):
+        """Send the content of ``file``, a regular file opened in binary
+        mode, starting at ``offset``. Send ``count`` bytes, or until EOF
+        is reached if ``count`` is None.
+
+        ``EventLoop.sendfile`` is used when available. Over TLS, or on
+        older event loops, the file is read in chunks with ``readinto``.
+
+        Returns the number of bytes sent.
+        """
+        assert not self.is_closing()
+        assert self._corked is None
+
+        # EventLoop.sendfile rejects a count of 0, there is nothing to
+        # send anyway.
+        if count == 0:
+            return 0
+
+        loop_sendfile = getattr(self._loop, "sendfile", None)
+
+        if loop_sendfile is not None:
+            try:
+                return await loop_sendfile(
+                    self._transport, file, offset, count, fallback=False
+                )
+            except asyncio.SendfileNotAvailableError:
+                pass
+
+        file.seek(offset)
+        total = 0
+
+        while count is None or total < count:
+            size = DEFAULT_SENDFILE_CHUNK_SIZE
+            if count is not None:
+                size = min(size, count - total)
+
+            # the transport may keep a reference to written data, so a
+            # new chunk is allocated for each write.
+            chunk = bytearray(size)
+            read = file.readinto(chunk)
+
+            if not read:
+                break
+
+            self._transport.write(memoryview(chunk)[:read])
+            total += read
+
+            await self.drain()
+
+        return total
+
     async def drain(self):
         """Waits until all data is sended to remote peer.
 
@@ -307,3 +844,17 @@ class StreamingProtocol(asyncio.Protocol):
 
     def resume_writing(self):
         self.writer.resume()
+
+
+if _BufferedProtocol is not None:
+
+    class BufferedStreamingProtocol(StreamingProtocol, _BufferedProtocol):
+        """A ``StreamingProtocol`` where data is received directly into
+        the reader buffer, avoiding a copy and an allocation per chunk.
+        """
+
+        def get_buffer(self, sizehint):
+            return self.reader.get_buffer(sizehint)
+
+        def buffer_updated(self, nbytes):
+            self.reader.buffer_updated(nbytes)
@@ -10,12 +10,27 @@ about the encoding or blocking operations.
 :ChunkedBodyReader:
     This class is a wrapper around a stream in order to support the
     chunked encoding used in HTTP.
+
+Body writers are their counterparts, used to send a body incrementally.
+
+:IdentityBodyWriter:
+    Writes data as is, the body length must be known by the remote
+    peer, or delimited by closing the connection.
+
+:ChunkedBodyWriter:
+    Writes data with the chunked encoding used in HTTP.
+
+:DiscardedBodyWriter:
+    Discards written data, for the responses sent without their body,
+    e.g. to HEAD requests.
 """
 import io
+import re
+
+from centimani.headers import Headers, HeaderParseError
 
-from asyncio import coroutine
 
-from centimani.headers import Headers
+CHUNK_SIZE_REGEX = re.compile(rb"[0-9A-Fa-f]+")
 
 
 class InvalidChunkError(Exception):
@@ -49,13 +64,9 @@ class BufferedBodyReader:
         self._reader = reader
         self._body_size = body_size
         self._block_size = block_size
-        self._current_block = 0
+        self._bytes_read = 0
         self._is_complete = False
 
-        if self._body_size is not None:
-            tmp = divmod(self._body_size, self._block_size)
-            self._block_count, self._last_block_size = tmp
-
     @property
     def is_complete(self):
         """Checks if all data was read.
@@ -66,26 +77,33 @@ class BufferedBodyReader:
         """
         return self._is_complete
 
-    async def __aiter__(self):
+    @property
+    def bytes_read(self):
+        return self._bytes_read
+
+    def _next_size(self, size):
+        """Returns the number of bytes to read for a read of at most
+        ``size`` bytes, taking the body size into account.
+        """
+        if self._body_size is not None:
+            size = min(size, self._body_size - self._bytes_read)
+
+        if size == 0:
+            self._is_complete = True
+
+        return size
+
+    def __aiter__(self):
         return self
 
     async def __anext__(self):
         """Returns the next read block."""
         if self._is_complete:
             raise StopAsyncIteration
-        
-        if self._body_size is not None:
-            if self._current_block < self._block_count:
-                block_size = self._block_size
-            elif self._current_block == self._block_count:
-                block_size = self._last_block_size
-            elif self._current_block > self._block_count:
-                block_size = 0
-        else:
-            block_size = self._block_size
+
+        block_size = self._next_size(self._block_size)
 
         if block_size == 0:
-            self._is_complete = True
             raise StopAsyncIteration
 
         block = await self._reader.read(block_size)
@@ -97,27 +115,110 @@ class BufferedBodyReader:
             else:
                 raise EOFError
 
-        self._current_block += 1
+        self._bytes_read += len(block)
 
         return block
 
+    async def readinto(self, buffer):
+        """Read the next bytes of the body into ``buffer``, a writable
+        bytes-like object that may be reused between calls.
+
+        Returns the number of bytes read, 0 when the body is complete.
+        """
+        if self._is_complete:
+            return 0
+
+        target = memoryview(buffer).cast("B")
+
+        if not target:
+            return 0
+
+        size = self._next_size(len(target))
+
+        if size == 0:
+            return 0
+
+        count = await self._reader.readinto(target[:size])
+
+        if count < size:
+            if self._body_size is not None:
+                raise EOFError
+
+            self._is_complete = True
+
+        self._bytes_read += count
+
+        return count
+
+    async def discard(self, budget=None):
+        """Discard the rest of the body, without copying it.
+
+        If more than ``budget`` bytes remain, nothing is read. When the
+        body size is unknown, at most ``budget`` bytes are discarded.
+
+        Returns True if the body is complete.
+        """
+        if self._is_complete:
+            return True
+
+        if self._body_size is not None:
+            remaining = self._body_size - self._bytes_read
+
+            if budget is not None and remaining > budget:
+                return False
+
+            skipped = await self._reader.skip(remaining)
+            self._bytes_read += skipped
+
+            if skipped < remaining:
+                raise EOFError
+
+            self._is_complete = True
+
+        else:
+            # body delimited by the end of the stream
+            discarded = 0
+
+            while not self._reader.at_eof:
+                if budget is not None and discarded > budget:
+                    return False
+
+                size = self._block_size
+                if budget is not None:
+                    size = budget - discarded + 1
+
+                skipped = await self._reader.skip(size)
+                discarded += skipped
+                self._bytes_read += skipped
+
+            self._is_complete = True
+
+        return True
+
 
 class ChunkedBodyReader:
     """This class is used to handle the chunked transfert encoding.
-    
+
+    Chunk data is read according to the chunk sizes, in blocks of at most
+    ``block_size`` bytes, so chunks may be larger than the reader buffer
+    limit and contain any byte sequence. Chunk extensions are ignored.
+
     Attributes:
         :body_size: The current number of bytes read since the beginning.
         :headers: Contains the trailing headers, if any.
     """
 
-    def __init__(self, reader):
+    def __init__(self, reader, block_size=io.DEFAULT_BUFFER_SIZE):
         """Initialize a ``ChunkedBodyReader``.
 
         Parameters:
             :reader: The ``StreamReader`` used to read data.
+            :block_size: The maximum size of the returned blocks.
         """
         self._reader = reader
+        self._block_size = block_size
         self._current_chunk = 0
+        self._chunk_remaining = 0
         self._is_complete = False
 
         self._body_size = 0
@@ -135,37 +236,245 @@ class ChunkedBodyReader:
     def headers(self):
         return self._headers
 
-    async def __aiter__(self):
+    def __aiter__(self):
         return self
 
     async def __anext__(self):
-        """Returns the next chunk of data."""
-        if self._is_complete:
+        """Returns the next block of data."""
+        remaining = await self._next_chunk()
+
+        if remaining == 0:
             raise StopAsyncIteration
 
-        chunk_header = await self._reader.read_until(b"\r\n")
-        chunk_size = int(chunk_header, base=16)
+        block = await self._reader.read(min(remaining, self._block_size))
 
-        if chunk_size == 0:
-            await self._parse_trailer_headers()
-            self._is_complete = True
-            raise StopAsyncIteration
+        if not block:
+            raise EOFError
+
+        self._consumed(len(block))
+
+        return block
+
+    async def readinto(self, buffer):
+        """Read the next bytes of the body into ``buffer``, a writable
+        bytes-like object that may be reused between calls. Data is read
+        from a single chunk.
+
+        Returns the number of bytes read, 0 when the body is complete.
+        """
+        target = memoryview(buffer).cast("B")
+
+        if not target:
+            return 0
+
+        remaining = await self._next_chunk()
+
+        if remaining == 0:
+            return 0
+
+        count = await self._reader.readinto(target[:remaining])
+
+        if count == 0:
+            raise EOFError
 
-        chunk = await self._reader.read_until(b"\r\n")
+        self._consumed(count)
 
-        if len(chunk) != chunk_size:
-            raise InvalidChunkError("chunk has a wrong size")
+        return count
 
-        self._body_size += len(chunk)
-        self._current_chunk += 1
+    async def discard(self, budget=None):
+        """Discard the rest of the body, without copying it.
 
-        return chunk
+        At most ``budget`` bytes of chunk data are discarded, it may be
+        None for no limit.
+
+        Returns True if the body is complete, False if the budget was
+        exceeded.
+        """
+        discarded = 0
+
+        while True:
+            remaining = await self._next_chunk()
+
+            if remaining == 0:
+                return True
+
+            if budget is not None and discarded + remaining > budget:
+                return False
+
+            skipped = await self._reader.skip(remaining)
+
+            if skipped < remaining:
+                raise EOFError
+
+            self._consumed(skipped)
+            discarded += skipped
+
+    def _consumed(self, count):
+        """Updates the chunk state after ``count`` bytes of chunk data
+        have been read.
+        """
+        self._chunk_remaining -= count
+        self._body_size += count
+
+    async def _next_chunk(self):
+        """Reads the chunk delimiters and headers until chunk data is
+        available, and the trailer headers after the last chunk.
+
+        Returns the number of bytes remaining in the current chunk, 0 if
+        the body is complete.
+        """
+        while self._chunk_remaining == 0:
+            if self._is_complete:
+                return 0
+
+            if self._current_chunk > 0:
+                # end of the previous chunk
+                delimiter = await self._reader.read(2)
+
+                if len(delimiter) < 2:
+                    # the connection was closed, the body is truncated
+                    raise EOFError
+
+                if delimiter != b"\r\n":
+                    raise InvalidChunkError("chunk has a wrong size")
+
+            chunk_header = await self._reader.read_until(b"\r\n")
+
+            if not chunk_header:
+                raise EOFError
+
+            chunk_size = self._parse_chunk_size(chunk_header)
+
+            if chunk_size == 0:
+                await self._parse_trailer_headers()
+                self._is_complete = True
+                return 0
+
+            self._chunk_remaining = chunk_size
+            self._current_chunk += 1
+
+        return self._chunk_remaining
+
+    @staticmethod
+    def _parse_chunk_size(chunk_header):
+        """Returns the size of a chunk, from its header line."""
+        size, _, extensions = chunk_header.partition(b";")
+        size = size.strip(b" \t")
+
+        if not CHUNK_SIZE_REGEX.fullmatch(size):
+            raise InvalidChunkError("malformed chunk size")
+
+        return int(size, base=16)
 
     async def _parse_trailer_headers(self):
         """When the last chunk of data is received, this method parse
         the trailing headers, if present.
         """
         trailer_field = await self._reader.read_until(b"\r\n")
+
         while trailer_field:
-            name, content = self._headers.parse_line(trailer_field)
+            try:
+                name, content = self._headers.parse_line(trailer_field)
+            except HeaderParseError as error:
+                raise InvalidChunkError("malformed trailer field") from error
+
             self._headers.add(name, content)
+            trailer_field = await self._reader.read_until(b"\r\n")
+
+
+class IdentityBodyWriter:
+    """This class is used to send a body as is, waiting for the data to
+    be sent between each write.
+    """
+
+    def __init__(self, writer):
+        """Initialize an ``IdentityBodyWriter``.
+
+        Parameters:
+            :writer: The ``StreamWriter`` used to send data.
+        """
+        self._writer = writer
+        self._body_size = 0
+        self._is_complete = False
+
+    @property
+    def is_complete(self):
+        return self._is_complete
+
+    @property
+    def body_size(self):
+        return self._body_size
+
+    async def write(self, data):
+        """Send ``data``, then wait until the writer is drained."""
+        assert not self._is_complete
+
+        if not data:
+            return
+
+        self._writer.write(data)
+        self._body_size += len(data)
+
+        await self._writer.drain()
+
+    async def close(self, headers=None):
+        """Ends the body. Trailing headers are not supported by this
+        encoding, and are ignored.
+        """
+        self._is_complete = True
+
+
+class ChunkedBodyWriter(IdentityBodyWriter):
+    """This class is used to send a body with the chunked transfert
+    encoding, each write call sends a chunk.
+    """
+
+    async def write(self, data):
+        """Send ``data`` as a chunk, then wait until the writer is
+        drained.
+        """
+        assert not self._is_complete
+
+        if not data:
+            # an empty chunk would end the body
+            return
+
+        chunk_header = "{0:x}\r\n".format(len(data)).encode("ascii")
+        self._writer.writelines((chunk_header, data, b"\r\n"))
+        self._body_size += len(data)
+
+        await self._writer.drain()
+
+    async def close(self, headers=None):
+        """Send the last chunk, followed by the trailing ``headers`` if
+        any.
+        """
+        assert not self._is_complete
+
+        self._is_complete = True
+
+        last_chunk = bytearray(b"0\r\n")
+
+        if headers is not None:
+            for name, content in headers.fields():
+                field_line = "{0}: {1}\r\n".format(name.title(), content)
+                last_chunk.extend(field_line.encode("ascii"))
+
+        last_chunk.extend(b"\r\n")
+
+        self._writer.write(last_chunk)
+        await self._writer.drain()
+
+
+class DiscardedBodyWriter(IdentityBodyWriter):
+    """This class is used for a response whose body is not sent, e.g.
+    the response to a HEAD request, written data is only counted.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+
+    async def write(self, data):
+        """Discard ``data``."""
+        assert not self._is_complete
+        self._body_size += len(data)
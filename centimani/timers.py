@@ -0,0 +1,203 @@
+"""This module defines the ``TimerWheel`` class, a hashed timer wheel
+used for the connections and requests timeouts of an event loop.
+
+Each timeout is a ``Timer``, stored in one of the wheel slots, and the
+wheel visits one slot per tick. Timers are armed, re-armed and cancelled
+in constant time, and re-arming a timer to a later deadline, the usual
+case of timeouts refreshed on activity, only updates its deadline: the
+timer is moved to its new slot when its current slot is visited.
+
+Unlike ``loop.call_later``, timers are not ordered in a heap, and are
+fired with a delay up to the wheel resolution, that is fine for
+timeouts.
+"""
+
+import math
+import weakref
+
+
+DEFAULT_RESOLUTION = 0.1
+
+DEFAULT_SIZE = 1024
+
+_TIMER_WHEELS = weakref.WeakKeyDictionary()
+
+
+def get_timer_wheel(loop):
+    """Returns the ``TimerWheel`` of ``loop``, creates it if needed."""
+    timer_wheel = _TIMER_WHEELS.get(loop)
+
+    if timer_wheel is None:
+        timer_wheel = _TIMER_WHEELS[loop] = TimerWheel(loop)
+
+    return timer_wheel
+
+
+class Timer:
+    """A timer of a ``TimerWheel``, that calls ``callback`` with ``args``
+    when it expires.
+
+    A timer can be armed again after it expired or it is cancelled.
+    """
+
+    __slots__ = ("_wheel", "_callback", "_args", "_expires", "_slot")
+
+    def __init__(self, wheel, callback, args):
+        self._wheel = wheel
+        self._callback = callback
+        self._args = args
+        self._expires = None
+        self._slot = None
+
+    def __repr__(self):
+        return "<Timer {0!r} expires={1}>".format(
+            self._callback,
+            self._expires
+        )
+
+    @property
+    def active(self):
+        """True if the timer is armed."""
+        return self._slot is not None
+
+    def start(self, delay):
+        """Arm the timer to expire in ``delay`` seconds, re-arms it if it
+        is already armed."""
+        self._wheel._arm(self, delay)
+
+    def cancel(self):
+        """Disarm the timer, if it is armed."""
+        if self._slot is not None:
+            self._wheel._disarm(self)
+
+
+class TimerWheel:
+    """A hashed timer wheel, of ``size`` slots visited every
+    ``resolution`` seconds.
+
+    The wheel ticks only when timers are armed.
+    """
+
+    def __init__(self, loop, resolution=DEFAULT_RESOLUTION, size=DEFAULT_SIZE):
+        # armed timers reference the objects they timeout, that often
+        # reference the loop, so the wheel only keeps a weak reference
+        # to it.
+        self._loop = weakref.ref(loop)
+        self._resolution = resolution
+        self._slots = [set() for _ in range(size)]
+        self._current = self._now()
+        self._count = 0
+        self._ticking = False
+
+    def __len__(self):
+        """Returns the number of armed timers."""
+        return self._count
+
+    @property
+    def resolution(self):
+        return self._resolution
+
+    def _now(self):
+        """Returns the current tick."""
+        return int(self._loop().time() / self._resolution)
+
+    def timer(self, callback, *args):
+        """Returns a new timer, not armed, that will call ``callback``
+        with ``args`` when it expires."""
+        return Timer(self, callback, args)
+
+    def call_later(self, delay, callback, *args):
+        """Returns a new timer, armed to call ``callback`` with ``args``
+        in ``delay`` seconds."""
+        timer = Timer(self, callback, args)
+        self._arm(timer, delay)
+        return timer
+
+    def _arm(self, timer, delay):
+        loop = self._loop()
+
+        if not self._ticking:
+            # the wheel was stopped, catch up with the loop time
+            self._current = self._now()
+            self._ticking = True
+            loop.call_at(
+                (self._current + 1) * self._resolution,
+                self._tick
+            )
+
+        expires = math.ceil((loop.time() + delay) / self._resolution)
+        scheduled = timer._slot
+
+        if scheduled is None:
+            self._count += 1
+        elif expires >= scheduled:
+            # lazy re-arm, the timer is moved when its slot is visited
+            timer._expires = expires
+            return
+        else:
+            self._slots[scheduled % len(self._slots)].discard(timer)
+
+        timer._expires = expires
+        self._insert(timer)
+
+    def _disarm(self, timer):
+        self._slots[timer._slot % len(self._slots)].discard(timer)
+        timer._slot = None
+        self._count -= 1
+
+    def _insert(self, timer):
+        # timers are never inserted in the slot being visited
+        scheduled = max(timer._expires, self._current + 1)
+        timer._slot = scheduled
+        self._slots[scheduled % len(self._slots)].add(timer)
+
+    def _tick(self):
+        """Visit the slots of the elapsed ticks, and fire the expired
+        timers."""
+        loop = self._loop()
+
+        if loop is None or loop.is_closed():
+            return
+
+        # the loop may run the callback slightly before its time
+        now = max(self._now(), self._current + 1)
+        slots = self._slots
+        size = len(slots)
+        expired = []
+
+        # visit each slot at most once if the loop was late
+        first = max(self._current + 1, now - size + 1)
+        self._current = now
+
+        for tick in range(first, now + 1):
+            index = tick % size
+            timers = slots[index]
+
+            if not timers:
+                continue
+
+            slots[index] = set()
+
+            for timer in timers:
+                if timer._expires <= now:
+                    timer._slot = None
+                    expired.append(timer)
+                else:
+                    self._insert(timer)
+
+        self._count -= len(expired)
+
+        for timer in expired:
+            try:
+                timer._callback(*timer._args)
+            except Exception as error:
+                loop.call_exception_handler({
+                    "message": "exception in timer callback",
+                    "exception": error,
+                    "timer": timer,
+                })
+
+        if self._count:
+            loop.call_at((now + 1) * self._resolution, self._tick)
+        else:
+            self._ticking = False
@@ -25,7 +25,6 @@ the functions to deal with this date format.
 import io
 import re
 
-from asyncio import coroutine
 from datetime import datetime
 
 
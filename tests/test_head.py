@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+
+from centimani.client import Client
+from centimani.headers import Headers
+from centimani.server import RequestHandler, Server
+
+
+BLOCKS = [b"first block, ", b"second block, ", b"last block"]
+
+
+class StreamingHandler(RequestHandler):
+    async def get(self):
+        body_writer = await self.start_response(200)
+
+        for block in BLOCKS:
+            await body_writer.write(block)
+
+        await body_writer.close()
+
+    head = get
+
+
+class IterableHandler(RequestHandler):
+    async def get(self):
+        headers = Headers()
+        headers.set("content-type", "text/plain")
+        await self.send_response(200, headers, iter(BLOCKS))
+
+    head = get
+
+
+ROUTES = [
+    (r"^/writer$", StreamingHandler),
+    (r"^/iterable$", IterableHandler),
+]
+
+
+class Http1HeadTest(unittest.TestCase):
+    def test_streamed_response(self):
+        for options in ({}, {"pipelining": True}, {"callback_protocol": True}):
+            for target in ("/writer", "/iterable"):
+                with self.subTest(target=target, **options):
+                    head, get = asyncio.run(self._fetch(target, **options))
+
+                    self.assertTrue(head.startswith(b"HTTP/1.1 200 "))
+                    self.assertNotIn(b"transfer-encoding", head.lower())
+
+                    self.assertTrue(get.startswith(b"HTTP/1.1 200 "))
+                    self.assertIn(b"transfer-encoding: chunked", get.lower())
+
+    async def _fetch(self, target, **options):
+        server = Server(ROUTES, **options)
+        await server.listen("127.0.0.1", 0)
+        port = server._server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        try:
+            writer.write(
+                b"HEAD %s HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                b"GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                % (target.encode("ascii"), target.encode("ascii"))
+            )
+
+            # the header of the GET response follows the HEAD one
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            get = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+
+            body = await asyncio.wait_for(reader.readuntil(b"0\r\n\r\n"), 5)
+            self.assertIn(BLOCKS[-1], body)
+        finally:
+            writer.close()
+            server.close()
+            server.close_connections()
+            await server.wait_closed()
+
+        return head, get
+
+
+class Http2HeadTest(unittest.TestCase):
+    def test_streamed_response(self):
+        for target in ("/writer", "/iterable"):
+            with self.subTest(target=target):
+                head, get = asyncio.run(self._fetch(target))
+
+                self.assertEqual(head.status, 200)
+                self.assertEqual(head.body, b"")
+
+                self.assertEqual(get.status, 200)
+                self.assertEqual(get.body, b"".join(BLOCKS))
+
+    async def _fetch(self, target):
+        server = Server(ROUTES, h2c=True)
+        await server.listen("127.0.0.1", 0)
+        url = "http://127.0.0.1:%d%s" % (
+            server._server.sockets[0].getsockname()[1], target
+        )
+
+        client = Client(h2c=True)
+
+        try:
+            head = await asyncio.wait_for(
+                client.fetch(url, method="HEAD"), 5
+            )
+            get = await asyncio.wait_for(client.fetch(url), 5)
+        finally:
+            client.close()
+            server.close()
+            server.close_connections()
+            await server.wait_closed()
+
+        return head, get
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from centimani.headers import Headers
+from centimani.server import RequestHandler, Server
+
+
+class EmptyFileHandler(RequestHandler):
+    path = None
+
+    async def get(self):
+        with open(self.path, "rb") as file:
+            await self.send_file(200, Headers(), file)
+
+
+class SendFileTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_empty_file_keep_alive(self):
+        for options in ({}, {"pipelining": True}, {"callback_protocol": True}):
+            with self.subTest(**options):
+                responses = asyncio.run(self._fetch_twice(**options))
+                self.assertEqual(len(responses), 2)
+
+                for response in responses:
+                    self.assertTrue(response.startswith(b"HTTP/1.1 200 "))
+                    self.assertIn(b"\r\ncontent-length: 0\r\n", response.lower())
+
+    async def _fetch_twice(self, **options):
+        handler = type("Handler", (EmptyFileHandler,), {"path": self.path})
+        server = Server([(r"^/$", handler)], **options)
+        await server.listen("127.0.0.1", 0)
+        port = server._server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        request = b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        responses = []
+
+        try:
+            for _ in range(2):
+                writer.write(request)
+                responses.append(await asyncio.wait_for(
+                    reader.readuntil(b"\r\n\r\n"), 5
+                ))
+
+            # nothing is sent after the empty bodies
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(reader.read(1), 0.1)
+        finally:
+            writer.close()
+            server.close()
+            server.close_connections()
+            await server.wait_closed()
+
+        return responses
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import array
+import asyncio
+import unittest
+
+from centimani.client import Client
+from centimani.server import RequestHandler, Server
+
+
+PAYLOAD = bytes(range(256)) * 4
+
+
+class BytearrayHandler(RequestHandler):
+    async def get(self):
+        await self.send_response(200, body=bytearray(PAYLOAD))
+
+
+class MemoryviewHandler(RequestHandler):
+    async def get(self):
+        # a view whose items are larger than a byte
+        body = memoryview(array.array("H", PAYLOAD[:512]))
+        await self.send_response(200, body=body)
+
+
+class StrHandler(RequestHandler):
+    async def get(self):
+        # the handler shortcut encodes str bodies, the protocol does not
+        await self._protocol.send_response(200, None, "not bytes")
+
+
+ROUTES = [
+    (r"^/bytearray$", BytearrayHandler),
+    (r"^/memoryview$", MemoryviewHandler),
+    (r"^/str$", StrHandler),
+]
+
+
+class Http1SendResponseTest(unittest.TestCase):
+    options = ({}, {"pipelining": True}, {"callback_protocol": True})
+
+    def test_bytearray_body(self):
+        for options in self.options:
+            with self.subTest(**options):
+                status, headers, body = asyncio.run(
+                    self._fetch("/bytearray", **options)
+                )
+                self.assertEqual(status, 200)
+                self.assertEqual(headers["content-length"], str(len(PAYLOAD)))
+                self.assertNotIn("transfer-encoding", headers)
+                self.assertEqual(body, PAYLOAD)
+
+    def test_memoryview_body(self):
+        for options in self.options:
+            with self.subTest(**options):
+                status, headers, body = asyncio.run(
+                    self._fetch("/memoryview", **options)
+                )
+                self.assertEqual(status, 200)
+                self.assertEqual(headers["content-length"], "512")
+                self.assertEqual(body, array.array("H", PAYLOAD[:512]).tobytes())
+
+    def test_str_body(self):
+        for options in self.options:
+            with self.subTest(**options):
+                status, headers, body = asyncio.run(
+                    self._fetch("/str", **options)
+                )
+                self.assertEqual(status, 500)
+                self.assertEqual(body, b"")
+
+    async def _fetch(self, target, **options):
+        server = Server(ROUTES, **options)
+        await server.listen("127.0.0.1", 0)
+        port = server._server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        try:
+            writer.write(
+                b"GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                % target.encode("ascii")
+            )
+            header = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+
+            status_line, *lines = header.decode("latin-1").split("\r\n")[:-2]
+            headers = dict(
+                (name.lower(), value.strip())
+                for name, _, value in (line.partition(":") for line in lines)
+            )
+
+            body = await asyncio.wait_for(
+                reader.readexactly(int(headers.get("content-length", 0))), 5
+            )
+        finally:
+            writer.close()
+            server.close()
+            server.close_connections()
+            await server.wait_closed()
+
+        return int(status_line.split()[1]), headers, body
+
+
+class Http2SendResponseTest(unittest.TestCase):
+    def test_bytearray_body(self):
+        response = asyncio.run(self._fetch("/bytearray"))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(
+            response.header_fields["content-length"], [str(len(PAYLOAD))]
+        )
+        self.assertEqual(response.body, PAYLOAD)
+
+    def test_memoryview_body(self):
+        response = asyncio.run(self._fetch("/memoryview"))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.header_fields["content-length"], ["512"])
+        self.assertEqual(
+            response.body, array.array("H", PAYLOAD[:512]).tobytes()
+        )
+
+    def test_str_body(self):
+        response = asyncio.run(self._fetch("/str"))
+        self.assertEqual(response.status, 500)
+        self.assertEqual(response.body, b"")
+
+    async def _fetch(self, target):
+        server = Server(ROUTES, h2c=True)
+        await server.listen("127.0.0.1", 0)
+        port = server._server.sockets[0].getsockname()[1]
+
+        client = Client(h2c=True)
+
+        try:
+            return await asyncio.wait_for(client.fetch(
+                "http://127.0.0.1:%d%s" % (port, target)
+            ), 5)
+        finally:
+            client.close()
+            server.close()
+            server.close_connections()
+            await server.wait_closed()
+
+
+if __name__ == "__main__":
+    unittest.main()